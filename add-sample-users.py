@@ -155,7 +155,7 @@ def create_sample_users():
         }
     ]
     
-    app = create_app()
+    app = create_app(workers=False)
     
     with app.app_context():
         print("🚀 Starting to add sample users...")
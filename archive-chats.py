@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Chat Archive Script for Skill Swap Platform
+Moves cold chat history out of the messages table into compressed per-room
+segment files (server/archive/). Messages older than --age-days are archived,
+and so is all history of rooms with no activity for --inactive-days. The last
+message of every room stays in the table. Archived messages are still served
+by the chat endpoints.
+
+Run it from cron (one instance at a time), e.g. nightly:
+
+    python archive-chats.py --age-days 90 --inactive-days 30
+"""
+
+import os
+import sys
+import argparse
+
+# Add the server directory to the Python path
+server_dir = os.path.join(os.path.dirname(__file__), 'server')
+sys.path.insert(0, server_dir)
+
+
+def archive_chats(args):
+    """Archive cold messages and report how many were moved"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("app_module", os.path.join(server_dir, "app.py"))
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+
+    from app.utils.archive import archive_messages
+
+    app_instance = app_module.create_app(workers=False)
+    with app_instance.app_context():
+        archive_messages(args.age_days, args.inactive_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old chat messages to compressed segment files')
+    parser.add_argument('--age-days', type=int, default=None, help='Archive messages older than this (default: CHAT_ARCHIVE_AGE_DAYS)')
+    parser.add_argument('--inactive-days', type=int, default=None,
+                        help='Archive all messages of rooms idle this long (default: CHAT_ARCHIVE_INACTIVE_DAYS)')
+    args = parser.parse_args()
+
+    print("🚀 Skill Swap Platform - Chat Archive")
+    print("=" * 50)
+
+    try:
+        archive_chats(args)
+    except Exception as e:
+        print(f"❌ Error archiving chats: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compression Benchmark for Skill Swap Platform
+This script builds realistic get_requests and get_chat_room JSON payloads and
+measures the CPU time vs bytes saved for each available response encoding and
+level, to help pick COMPRESS_LEVELS and COMPRESS_MIN_SIZE.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+server_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server')
+sys.path.insert(0, server_dir)
+
+SKILLS = ['Python', 'JavaScript', 'React', 'SQL', 'Guitar', 'Spanish', 'Cooking', 'Photography', 'Yoga']
+
+
+def make_user(User, i, rng, now):
+    return User(
+        id=f'{i:08d}-0000-4000-8000-000000000000',
+        email=f'user{i}@example.com',
+        name=f'Sample User {i}',
+        location=rng.choice(['Lucknow, UP', 'Delhi, DL', 'Patna, BR']),
+        availability='Weekdays 7-9 PM, Weekends',
+        skills_offered=json.dumps(rng.sample(SKILLS, 3)),
+        skills_wanted=json.dumps(rng.sample(SKILLS, 3)),
+        is_public=True, role='user', is_banned=False,
+        created_at=now, updated_at=now
+    )
+
+
+def build_responses(request_count, message_count):
+    """Build callables returning dicts shaped like the get_users, get_requests and get_chat_room responses"""
+    from app.models import User, SwapRequest, ChatRoom, Message
+
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    users = [make_user(User, i, rng, now) for i in range(request_count + 1)]
+
+    requests = []
+    for i in range(request_count):
+        swap_request = SwapRequest(
+            id=f'{i:08d}-1111-4000-8000-000000000000',
+            from_user_id=users[0].id, to_user_id=users[i + 1].id,
+            skill_offered=rng.choice(SKILLS), skill_wanted=rng.choice(SKILLS),
+            status=rng.choice(['pending', 'accepted', 'rejected']),
+            message='Would you like to swap skills?', created_at=now, updated_at=now
+        )
+        swap_request.from_user, swap_request.to_user = users[0], users[i + 1]
+        requests.append(swap_request)
+
+    chat_room = ChatRoom(id='room', user1_id=users[0].id, user2_id=users[1].id,
+                         request_id=requests[0].id, created_at=now)
+    messages = []
+    for i in range(message_count):
+        message = Message(id=f'{i:08d}-2222-4000-8000-000000000000', chat_room_id=chat_room.id,
+                          sender_id=users[i % 2].id, text=f'Message number {i} about {rng.choice(SKILLS)}',
+                          created_at=now + timedelta(seconds=i))
+        message.sender = users[i % 2]
+        messages.append(message)
+
+    return {
+        'get_users': lambda: {'users': [u.to_dict() for u in users[:20]], 'page': 1, 'limit': 20, 'total': 20},
+        'get_requests': lambda: {'requests': [r.to_dict() for r in requests], 'total': len(requests)},
+        'get_chat_room': lambda: {
+            'chat_room': chat_room.to_dict(),
+            'swap_request': requests[0].to_dict(),
+            'messages': [m.to_dict() for m in messages]
+        },
+    }
+
+
+def measure(fn, repeat):
+    """Best-of-N wall time for fn"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark response compression on API payloads')
+    parser.add_argument('--requests', type=int, default=200, help='Swap requests in the get_requests payload')
+    parser.add_argument('--messages', type=int, default=500, help='Messages in the get_chat_room payload')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("app_module", os.path.join(server_dir, "app.py"))
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+
+    from app.utils.compression import available_encodings, compress
+    from app.utils.fastjson import dumps
+
+    levels = {'gzip': [1, 6, 9], 'br': [1, 4, 11], 'zstd': [1, 3, 10]}
+    app_instance = app_module.create_app('testing', workers=False)
+
+    with app_instance.app_context():
+        responses = build_responses(args.requests, args.messages)
+        payloads = {name: dumps(responses[name]()) for name in ('get_requests', 'get_chat_room')}
+
+    print("🚀 Skill Swap Platform - Compression Benchmark")
+    print("=" * 72)
+    for name, data in payloads.items():
+        print(f"\n📦 {name}: {len(data):,} bytes uncompressed")
+        print(f"{'encoding':<10}{'level':>6}{'bytes':>12}{'ratio':>8}{'ms':>10}{'MB/s':>10}")
+        for encoding in available_encodings():
+            for level in levels[encoding]:
+                elapsed, compressed = measure(lambda: compress(data, encoding, level), args.repeat)
+                print(f"{encoding:<10}{level:>6}{len(compressed):>12,}{len(data) / len(compressed):>8.1f}"
+                      f"{elapsed * 1000:>10.2f}{len(data) / elapsed / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
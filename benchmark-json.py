@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Benchmark for Skill Swap Platform
+This script measures to_dict + JSON encoding time per endpoint payload with the
+orjson-backed provider and with the stdlib fallback, and reports the time saved.
+"""
+
+import os
+import sys
+import argparse
+import importlib.util
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
+server_dir = os.path.join(root_dir, 'server')
+sys.path.insert(0, server_dir)
+
+
+def load_script(name, filename):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root_dir, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization per endpoint payload')
+    parser.add_argument('--requests', type=int, default=200, help='Swap requests in the get_requests payload')
+    parser.add_argument('--messages', type=int, default=500, help='Messages in the get_chat_room payload')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app_module = load_script('app_module', os.path.join('server', 'app.py'))
+    payloads = load_script('benchmark_compression', 'benchmark-compression.py')
+
+    from app.utils import fastjson
+    if fastjson.orjson is None:
+        print("❌ orjson is not installed, nothing to compare against the stdlib fallback")
+        sys.exit(1)
+
+    app_instance = app_module.create_app('testing', workers=False)
+    fast_backend = fastjson.orjson
+
+    print("🚀 Skill Swap Platform - JSON Serialization Benchmark")
+    print("=" * 64)
+    print(f"{'endpoint':<16}{'bytes':>10}{'stdlib ms':>12}{'orjson ms':>12}{'saved ms':>10}")
+
+    with app_instance.app_context():
+        responses = payloads.build_responses(args.requests, args.messages)
+        for name, build in responses.items():
+            timings = {}
+            for label, backend in (('stdlib', None), ('orjson', fast_backend)):
+                # Covers both the skill column parsing in to_dict and encoding the response body
+                fastjson.orjson = backend
+                timings[label], body = payloads.measure(
+                    lambda: fastjson.dumps(build(), sort_keys=app_instance.json.sort_keys), args.repeat
+                )
+            fastjson.orjson = fast_backend
+            print(f"{name:<16}{len(body):>10,}{timings['stdlib'] * 1000:>12.2f}"
+                  f"{timings['orjson'] * 1000:>12.2f}{(timings['stdlib'] - timings['orjson']) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Bulk Seeding Script for Skill Swap Platform
+This script loads large test/staging datasets into the database. Passwords are
+hashed in a process pool and rows are written with Core executemany inserts in
+chunked transactions.
+
+Skill names are resolved against the canonical skill dictionary, so users get
+skills/user_skills rows and requests get skill ids just like through the API.
+
+Input is either generated (--users N) or read from a JSONL file (--input FILE)
+where every line is one record with a "type" of user, request or message:
+
+    {"type": "user", "email": "a@example.com", "password": "secret1", "name": "A",
+     "skills_offered": ["Python"], "skills_wanted": ["Guitar"]}
+    {"type": "request", "from": "a@example.com", "to": "b@example.com",
+     "skill_offered": "Python", "skill_wanted": "Guitar", "status": "accepted"}
+    {"type": "message", "from": "a@example.com", "to": "b@example.com", "text": "Hi!",
+     "created_at": "2024-05-01T12:30:00Z"}
+
+Requests and messages reference users by email. A message is attached to the
+chat room of the latest accepted request between the two users; a chat room is
+created for every accepted request.
+
+Any record may carry an ISO 8601 "created_at". Records without one (all
+generated records) get timestamps spread over the last --spread-days, in input
+order, so activity, ranking and archiving see a realistic history.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+server_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server')
+sys.path.insert(0, server_dir)
+
+SAMPLE_SKILLS = [
+    'Python', 'JavaScript', 'React', 'SQL', 'Machine Learning', 'Data Science',
+    'Graphic Design', 'Photography', 'Video Editing', 'Guitar', 'Piano',
+    'Spanish', 'French', 'Cooking', 'Baking', 'Yoga', 'Public Speaking',
+    'Creative Writing', 'Digital Marketing', 'SEO', 'Web Development'
+]
+SAMPLE_CITIES = ['Lucknow, UP', 'Delhi, DL', 'Patna, BR', 'Bhopal, MP', 'Mumbai, MH', 'Bangalore, KA']
+
+
+def _hash_chunk(method, passwords):
+    """Hash a chunk of passwords (runs inside a pool worker)"""
+    from werkzeug.security import generate_password_hash
+    return [generate_password_hash(password, method) for password in passwords]
+
+
+def hash_passwords(passwords, method, workers=None, chunk_size=64):
+    """Hash passwords in parallel, preserving input order"""
+    if not passwords:
+        return []
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_hash_chunk, [method] * len(chunks), chunks)
+        return [password_hash for hashes in results for password_hash in hashes]
+
+
+def generate_records(user_count, requests_per_user=1, messages_per_request=3, seed=42):
+    """Yield synthetic user, request and message records"""
+    rng = random.Random(seed)
+    emails = [f'user{i}@example.com' for i in range(user_count)]
+    for i, email in enumerate(emails):
+        yield {
+            'type': 'user',
+            'email': email,
+            'password': 'password123',
+            'name': f'Sample User {i}',
+            'location': rng.choice(SAMPLE_CITIES),
+            'availability': rng.choice(['Weekends', 'Weekdays 6-8 PM', 'Flexible schedule']),
+            'skills_offered': rng.sample(SAMPLE_SKILLS, 3),
+            'skills_wanted': rng.sample(SAMPLE_SKILLS, 3),
+        }
+    if user_count < 2:
+        return
+    for i, email in enumerate(emails):
+        for _ in range(requests_per_user):
+            other = emails[(i + rng.randrange(1, user_count)) % user_count]
+            status = rng.choice(['pending', 'accepted', 'rejected'])
+            yield {
+                'type': 'request',
+                'from': email,
+                'to': other,
+                'skill_offered': rng.choice(SAMPLE_SKILLS),
+                'skill_wanted': rng.choice(SAMPLE_SKILLS),
+                'status': status,
+                'message': 'Would you like to swap skills?',
+            }
+            if status == 'accepted':
+                for n in range(messages_per_request):
+                    sender, recipient = (email, other) if n % 2 == 0 else (other, email)
+                    yield {'type': 'message', 'from': sender, 'to': recipient, 'text': f'Message {n}'}
+
+
+def read_jsonl(path):
+    """Yield records from a JSONL file, skipping blank lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'{path}:{line_number}: invalid JSON ({e})')
+
+
+def parse_timestamp(value):
+    """Naive UTC datetime from an ISO 8601 string (as stored by the app), or None if missing"""
+    if not value:
+        return None
+    when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return when.astimezone(timezone.utc).replace(tzinfo=None) if when.tzinfo else when
+
+
+def spread_timestamps(rows, now, spread_days):
+    """Give rows without a created_at increasing timestamps over the last spread_days, in order"""
+    if not rows:
+        return
+    start = now - timedelta(days=spread_days)
+    step = (now - start) / len(rows)
+    for i, row in enumerate(rows):
+        row['created_at'] = start + step * (i + 1)
+
+
+def build_rows(records, existing_ids, spread_days=90):
+    """Turn input records into row dicts for each table, resolving emails to ids"""
+    from app.models import generate_uuid
+
+    now = datetime.utcnow()
+    user_ids = dict(existing_ids)
+    rooms_by_pair = {}
+    room_requests = {}  # chat room id -> its request row
+    undated = []        # rows whose record had no created_at, in input order
+    users, passwords, swap_requests, chat_rooms, messages = [], [], [], [], []
+
+    for record in records:
+        kind = record.get('type', 'user')
+        if kind == 'user':
+            if record['email'] in user_ids:
+                continue
+            user_id = generate_uuid()
+            user_ids[record['email']] = user_id
+            users.append({
+                'id': user_id,
+                'email': record['email'],
+                'name': record['name'],
+                'location': record.get('location', ''),
+                'availability': record.get('availability', ''),
+                'skills_offered': json.dumps(record.get('skills_offered', [])),
+                'skills_wanted': json.dumps(record.get('skills_wanted', [])),
+                'is_public': record.get('is_public', True),
+                'role': record.get('role', 'user'),
+                'is_banned': False,
+                'created_at': parse_timestamp(record.get('created_at')),
+            })
+            passwords.append(record['password'])
+            if users[-1]['created_at'] is None:
+                undated.append(users[-1])
+        elif kind == 'request':
+            from_id, to_id = user_ids[record['from']], user_ids[record['to']]
+            request_id = generate_uuid()
+            status = record.get('status', 'pending')
+            swap_requests.append({
+                'id': request_id,
+                'from_user_id': from_id,
+                'to_user_id': to_id,
+                'skill_offered': record['skill_offered'],
+                'skill_wanted': record['skill_wanted'],
+                'status': status,
+                'message': record.get('message', ''),
+                'created_at': parse_timestamp(record.get('created_at')),
+            })
+            if swap_requests[-1]['created_at'] is None:
+                undated.append(swap_requests[-1])
+            if status == 'accepted':
+                room_id = generate_uuid()
+                chat_rooms.append({
+                    'id': room_id,
+                    'user1_id': from_id,
+                    'user2_id': to_id,
+                    'request_id': request_id,
+                    'last_message_id': None,
+                })
+                room_requests[room_id] = swap_requests[-1]
+                rooms_by_pair[frozenset((from_id, to_id))] = chat_rooms[-1]
+        elif kind == 'message':
+            from_id, to_id = user_ids[record['from']], user_ids[record['to']]
+            room = rooms_by_pair.get(frozenset((from_id, to_id)))
+            if not room:
+                raise ValueError(f"No accepted request between {record['from']} and {record['to']}")
+            messages.append({
+                'id': generate_uuid(),
+                'chat_room_id': room['id'],
+                'sender_id': from_id,
+                'text': record['text'],
+                'created_at': parse_timestamp(record.get('created_at')),
+            })
+            if messages[-1]['created_at'] is None:
+                undated.append(messages[-1])
+        else:
+            raise ValueError(f'Unknown record type: {kind}')
+
+    spread_timestamps(undated, now, spread_days)
+    for row in users + swap_requests:
+        row['updated_at'] = row['created_at']
+    rooms = {}
+    for room in chat_rooms:
+        room['created_at'] = room['last_activity_at'] = room_requests[room['id']]['created_at']
+        rooms[room['id']] = room
+    for message in messages:
+        room = rooms[message['chat_room_id']]
+        if message['created_at'] >= room['last_activity_at']:
+            room['last_message_id'], room['last_activity_at'] = message['id'], message['created_at']
+
+    return users, passwords, swap_requests, chat_rooms, messages
+
+
+def build_skill_rows(users, swap_requests):
+    """Resolve skill names to canonical skill ids, creating skills rows for unknown names"""
+    from app.models import db, Skill, SkillAlias
+    from app.utils.skills import canonical_skill_key, canonical_skill_name
+
+    now = datetime.utcnow()
+    ids = dict(db.session.query(Skill.key, Skill.id).all())
+    ids.update(db.session.query(SkillAlias.alias, SkillAlias.skill_id).all())
+    names = dict(db.session.query(Skill.id, Skill.name).all())
+    next_id = max(names, default=0) + 1
+    skills = []
+
+    def resolve(name):
+        nonlocal next_id
+        key = canonical_skill_key(name)
+        if key not in ids:
+            ids[key] = next_id
+            names[next_id] = canonical_skill_name(name)
+            skills.append({'id': next_id, 'name': names[next_id], 'key': key, 'created_at': now})
+            next_id += 1
+        return ids[key]
+
+    user_skills = []
+    for user in users:
+        for kind in ('offered', 'wanted'):
+            column = f'skills_{kind}'
+            skill_ids = list(dict.fromkeys(resolve(name) for name in json.loads(user[column]) if name.strip()))
+            user[column] = json.dumps([names[skill_id] for skill_id in skill_ids])
+            user_skills.extend({'user_id': user['id'], 'skill_id': skill_id, 'kind': kind} for skill_id in skill_ids)
+
+    for swap_request in swap_requests:
+        for kind in ('offered', 'wanted'):
+            skill_id = resolve(swap_request[f'skill_{kind}'])
+            swap_request[f'skill_{kind}'] = names[skill_id]
+            swap_request[f'skill_{kind}_id'] = skill_id
+
+    return skills, user_skills
+
+
+def derive_profile_columns(users):
+    """Attach the geocoded point of each user's location and the parsed availability bitmask"""
+    from app.utils.geo import gazetteer, geohash_encode
+    from app.utils.availability import parse_availability, mask_to_bytes
+
+    for user in users:
+        point = gazetteer.geocode(user['location'])
+        user['latitude'], user['longitude'] = point if point else (None, None)
+        user['geohash'] = geohash_encode(*point) if point else None
+        user['availability_mask'] = mask_to_bytes(parse_availability(user['availability']))
+
+
+def insert_chunked(db, table, rows, chunk_size):
+    """Insert rows with executemany, one transaction per chunk"""
+    for i in range(0, len(rows), chunk_size):
+        with db.engine.begin() as conn:
+            conn.execute(table.insert(), rows[i:i + chunk_size])
+
+
+def bulk_seed(args):
+    """Load records into the database and report throughput"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("app_module", os.path.join(server_dir, "app.py"))
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+
+    from app.models import db, User, SwapRequest, ChatRoom, Message, Skill, UserSkill
+
+    if args.input:
+        records = read_jsonl(args.input)
+    else:
+        records = generate_records(args.users, args.requests_per_user, args.messages_per_request)
+
+    app_instance = app_module.create_app(workers=False)
+
+    with app_instance.app_context():
+        # Seeding a fresh database: create the schema first (same as init-db.py)
+        from app.utils.schema import init_database
+        init_database()
+        existing_ids = dict(db.session.query(User.email, User.id).all())
+
+        started = time.perf_counter()
+        users, passwords, swap_requests, chat_rooms, messages = build_rows(records, existing_ids, args.spread_days)
+        skills, user_skills = build_skill_rows(users, swap_requests)
+        derive_profile_columns(users)
+        print(f"📋 Prepared {len(users)} users, {len(skills)} new skills, {len(swap_requests)} requests, "
+              f"{len(chat_rooms)} chat rooms, {len(messages)} messages")
+
+        hash_started = time.perf_counter()
+        for user, password_hash in zip(users, hash_passwords(passwords, app_instance.config['PASSWORD_HASH_METHOD'], args.workers)):
+            user['password_hash'] = password_hash
+        hash_elapsed = time.perf_counter() - hash_started
+        if users:
+            print(f"🔑 Hashed {len(users)} passwords in {hash_elapsed:.2f}s "
+                  f"({len(users) / max(hash_elapsed, 1e-9):,.0f}/s)")
+
+        total_rows = 0
+        for model, rows in ((Skill, skills), (User, users), (UserSkill, user_skills),
+                            (SwapRequest, swap_requests), (ChatRoom, chat_rooms), (Message, messages)):
+            if not rows:
+                continue
+            insert_started = time.perf_counter()
+            insert_chunked(db, model.__table__, rows, args.chunk_size)
+            elapsed = time.perf_counter() - insert_started
+            total_rows += len(rows)
+            print(f"✅ Inserted {len(rows)} rows into {model.__tablename__} in {elapsed:.2f}s "
+                  f"({len(rows) / max(elapsed, 1e-9):,.0f} rows/s)")
+
+        # Rows written with Core skip the incremental rank updates, compute them for everyone affected
+        from app.utils.ranking import backfill_user_rank
+        backfill_user_rank({user['id'] for user in users} | {row['to_user_id'] for row in swap_requests}
+                           | {row['from_user_id'] for row in swap_requests})
+
+        elapsed = time.perf_counter() - started
+        print(f"\n🎉 Loaded {total_rows} rows in {elapsed:.2f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load users, requests and messages')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='JSONL file with one record per line')
+    source.add_argument('--users', type=int, help='Number of synthetic users to generate')
+    parser.add_argument('--requests-per-user', type=int, default=1)
+    parser.add_argument('--messages-per-request', type=int, default=3)
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per insert transaction')
+    parser.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+    parser.add_argument('--spread-days', type=float, default=90,
+                        help='Days over which records without a created_at are spread')
+    args = parser.parse_args()
+
+    print("🚀 Skill Swap Platform - Bulk Seed")
+    print("=" * 50)
+
+    try:
+        bulk_seed(args)
+    except Exception as e:
+        print(f"❌ Error seeding database: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Import Time Budget Check for Skill Swap Platform
+Starts a fresh interpreter with `python -X importtime`, loads server/app.py and
+calls create_app(), then checks that:
+
+- the imports of the project's own modules (app.*, config) stay within --app-budget-ms
+- all imports together stay within --budget-ms
+- modules that are only needed by some requests (numpy, Pillow, the route
+  modules) are not imported at startup
+
+It exits with status 1 when a check fails, so it can run in CI:
+
+    python check-import-time.py --budget-ms 1500 --app-budget-ms 150
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
+server_dir = os.path.join(root_dir, 'server')
+
+PROBE = """
+import importlib.util, sys
+sys.path.insert(0, {server_dir!r})
+spec = importlib.util.spec_from_file_location('app_module', {app_path!r})
+app_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app_module)
+app_module.create_app({config!r}, workers=False)
+"""
+
+DEFAULT_LAZY = ('numpy', 'PIL', 'app.routes')
+DEFAULT_BUDGET_MS = 1500
+DEFAULT_APP_BUDGET_MS = 150
+
+
+def measure(config_name):
+    """Run the probe under -X importtime; returns [(module, self_us, cumulative_us, depth)]"""
+    probe = PROBE.format(server_dir=server_dir, app_path=os.path.join(server_dir, 'app.py'), config=config_name)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                            cwd=server_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'create_app failed:\n{result.stderr[-2000:]}')
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def is_project_module(name):
+    return name in ('app', 'config') or name.startswith('app.')
+
+
+def summarize(modules, lazy=DEFAULT_LAZY):
+    """(all imports ms, project modules ms, lazy modules that were imported) for measure()'s output"""
+    total_ms = sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+    app_ms = sum(self_us for name, self_us, _, _ in modules if is_project_module(name)) / 1000
+    eager = sorted({name for name, _, _, _ in modules
+                    if any(name == prefix or name.startswith(prefix + '.') for prefix in lazy)})
+    return total_ms, app_ms, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check create_app import time against a budget')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Budget for all imports')
+    parser.add_argument('--app-budget-ms', type=float, default=DEFAULT_APP_BUDGET_MS, help="Budget for the project's own modules")
+    parser.add_argument('--lazy', default=','.join(DEFAULT_LAZY),
+                        help='Comma-separated module prefixes that must not be imported at startup')
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list')
+    args = parser.parse_args()
+
+    print("🚀 Skill Swap Platform - Import Time Budget")
+    print("=" * 50)
+
+    modules = measure(args.config)
+    lazy = tuple(prefix for prefix in args.lazy.split(',') if prefix)
+    total_ms, app_ms, eager = summarize(modules, lazy)
+
+    print(f"{'module':<40}{'cumulative ms':>15}")
+    for name, _, cumulative, _ in sorted((m for m in modules if m[3] == 0), key=lambda m: -m[2])[:args.top]:
+        print(f"{name:<40}{cumulative / 1000:>15.1f}")
+    print()
+
+    failed = False
+    for label, spent, budget in (('All imports', total_ms, args.budget_ms), ('Project modules', app_ms, args.app_budget_ms)):
+        ok = spent <= budget
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {label}: {spent:.1f} ms (budget {budget:.0f} ms)")
+    if eager:
+        failed = True
+        print(f"❌ Imported at startup but should load on demand: {', '.join(eager)}")
+    else:
+        print(f"✅ Not imported at startup: {', '.join(lazy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
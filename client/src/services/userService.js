@@ -72,6 +72,17 @@ export const userService = {
     }
   },
 
+  async getUsersBatch(userIds) {
+    try {
+      const response = await api.get('/users/batch', {
+        params: { ids: userIds.join(',') }
+      });
+      return response.data.users;
+    } catch (error) {
+      throw new Error(error.response?.data?.error || 'Failed to fetch users');
+    }
+  },
+
   async updateUser(userId, userData) {
     try {
       console.log('🔍 userService.updateUser called with:', { userId, userData });
@@ -22,12 +22,13 @@ def create_admin_user():
         
         from app.models import db, User
         from app.utils.auth import hash_password
+        from app.utils.schema import init_database
         
-        app_instance = app_module.create_app()
+        app_instance = app_module.create_app(workers=False)
         
         with app_instance.app_context():
-            # Initialize database (create tables if they don't exist)
-            db.create_all()
+            # Initialize database (create or upgrade tables, same as init-db.py)
+            init_database()
             
             # Check if admin user already exists
             admin_user = User.query.filter_by(email='admin@skillswap.com').first()
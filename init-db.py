@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Database Setup Script for Skill Swap Platform
+Creates missing tables, adds new columns and indexes to existing ones, builds
+the full-text search index and fills derived columns (skill ids, geocoded
+locations, availability masks, inbox activity, directory ranks).
+
+The server no longer does this on every start. Run it once after installing
+and again after every upgrade (it only changes what is missing):
+
+    python init-db.py
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the server directory to the Python path
+server_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server')
+sys.path.insert(0, server_dir)
+
+
+def init_db(args):
+    """Create and upgrade the database schema"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("app_module", os.path.join(server_dir, "app.py"))
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+
+    from app.models import db
+    from app.utils.schema import init_database
+
+    app_instance = app_module.create_app(args.config, workers=False)
+    with app_instance.app_context():
+        started = time.perf_counter()
+        init_database()
+        tables = db.inspect(db.engine).get_table_names()
+        print(f"✅ Database ready ({len(tables)} tables) in {time.perf_counter() - started:.2f}s")
+        print(f"📊 {app_instance.config['SQLALCHEMY_DATABASE_URI']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create or upgrade the database schema')
+    parser.add_argument('--config', default=None, help='Configuration name (default: FLASK_ENV or development)')
+    args = parser.parse_args()
+
+    print("🚀 Skill Swap Platform - Database Setup")
+    print("=" * 50)
+
+    try:
+        init_db(args)
+    except Exception as e:
+        print(f"❌ Error setting up database: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
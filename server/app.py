@@ -1,10 +1,19 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from config import config
 from app.models import db
+from app.utils.ratelimit import init_rate_limiter
+from app.utils.uploads import serve_upload
+from app.utils.compression import init_compression
+from app.utils.fastjson import FastJSONProvider
+from app.utils.cache import init_cache
+from app.utils.blueprints import init_blueprints
+from app.utils.health import readiness
+from app.utils.outbox import init_outbox
+from app.utils.jobs import init_jobs, start_job_workers
 import os
 
-def create_app(config_name=None):
+def create_app(config_name=None, workers=True):
     app = Flask(__name__)
     
     # Load configuration
@@ -13,43 +22,71 @@ def create_app(config_name=None):
     
     app.config.from_object(config[config_name])
     
+    # Serialize responses with orjson when it is installed
+    app.json = FastJSONProvider(app)
+    
     # Disable strict slashes to prevent redirects
     app.url_map.strict_slashes = False
     
     # Initialize database
     db.init_app(app)
     
+    # Initialize rate limiting
+    init_rate_limiter(app)
+    
+    # Select the cache backend shared by cached responses
+    init_cache(app)
+    
+    # Compress large responses
+    init_compression(app)
+    
     # Configure CORS
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
     
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.users import users_bp
-    from app.routes.requests import requests_bp
-    from app.routes.chat import chat_bp
-    from app.routes.admin import admin_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(users_bp, url_prefix='/api/users')
-    app.register_blueprint(requests_bp, url_prefix='/api/requests')
-    app.register_blueprint(chat_bp, url_prefix='/api/chat')
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    # Register blueprints (their modules are imported on the first request when LAZY_BLUEPRINTS is set)
+    init_blueprints(app, [
+        ('app.routes.auth', 'auth_bp', '/api/auth'),
+        ('app.routes.users', 'users_bp', '/api/users'),
+        ('app.routes.requests', 'requests_bp', '/api/requests'),
+        ('app.routes.chat', 'chat_bp', '/api/chat'),
+        ('app.routes.admin', 'admin_bp', '/api/admin'),
+        ('app.routes.skills', 'skills_bp', '/api/skills'),
+    ])
     
     @app.route('/api/health')
     def health_check():
         return {'status': 'healthy', 'message': 'Skill Swap API is running'}
     
+    @app.route('/api/health/ready')
+    def readiness_check():
+        """Check the database, connection pool, queues and cache within strict time budgets"""
+        report = readiness()
+        return report, 200 if report['status'] == 'ready' else 503, {'Cache-Control': 'no-store'}
+    
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
         """Serve uploaded files"""
-        return send_from_directory('uploads', filename)
+        return serve_upload(filename)
+    
+    # The schema is created and upgraded by init-db.py, not on every boot
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Register outbox handlers and background tasks
+    init_outbox(app)
+    init_jobs(app)
+    
+    # Server processes run the job workers; scripts building the app pass workers=False
+    if workers and app.config['JOBS_START_WORKERS']:
+        start_workers(app)
     
     return app
 
+def start_workers(app):
+    """Start the job queue workers (which also handle outbox events) and periodic scheduler in this process"""
+    start_job_workers(app)
+
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(workers=False)
+    # With the reloader, the parent process only watches files; workers run in the serving child
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_workers(app)
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -16,37 +16,78 @@ class User(db.Model):
     name = db.Column(db.String(255), nullable=False)
     photo_url = db.Column(db.Text)
     location = db.Column(db.String(255))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # geocoded from location, for proximity search
     availability = db.Column(db.Text)
+    availability_mask = db.Column(db.LargeBinary(21))  # 168 hourly bits, one per hour of the week
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # maintained with feedback
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    requests_accepted = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # received requests
+    requests_rejected = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_active_at = db.Column(db.DateTime)
+    user_rank = db.Column(db.Float)  # directory order, see app/utils/ranking.py
     skills_offered = db.Column(db.Text)  # JSON string
     skills_wanted = db.Column(db.Text)   # JSON string
     is_public = db.Column(db.Boolean, default=True)
     role = db.Column(db.String(20), default='user')  # 'user' or 'admin'
     is_banned = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     sent_requests = db.relationship('SwapRequest', foreign_keys='SwapRequest.from_user_id', backref='from_user', lazy=True)
     received_requests = db.relationship('SwapRequest', foreign_keys='SwapRequest.to_user_id', backref='to_user', lazy=True)
     sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy=True)
     
-    def to_dict(self):
-        import json
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'photo_url': self.photo_url,
-            'location': self.location,
-            'availability': self.availability,
-            'skills_offered': json.loads(self.skills_offered) if self.skills_offered else [],
-            'skills_wanted': json.loads(self.skills_wanted) if self.skills_wanted else [],
-            'is_public': self.is_public,
-            'role': self.role,
-            'is_banned': self.is_banned,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __table_args__ = (db.Index('ix_users_directory', 'is_public', 'user_rank', 'id'),)
+    
+    # to_dict fields and the columns each one reads (for sparse fieldsets, see app/utils/fields.py)
+    FIELDS = {
+        'id': ('id',),
+        'email': ('email',),
+        'name': ('name',),
+        'photo_url': ('photo_url',),
+        'photo_thumbnail_url': ('photo_url',),
+        'location': ('location',),
+        'availability': ('availability',),
+        'availability_slots': ('availability_mask',),
+        'skills_offered': ('skills_offered',),
+        'skills_wanted': ('skills_wanted',),
+        'rating_count': ('rating_count',),
+        'rating_average': ('rating_count', 'rating_sum'),
+        'is_public': ('is_public',),
+        'role': ('role',),
+        'is_banned': ('is_banned',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    
+    def to_dict(self, fields=None):
+        from app.utils.fastjson import loads
+        from app.utils.uploads import photo_urls
+        from app.utils.availability import mask_from_bytes, mask_to_slots
+        from app.utils.ratings import rating_summary
+        from app.utils.fields import pick
+        return pick(fields, 'users', {
+            'id': lambda: self.id,
+            'email': lambda: self.email,
+            'name': lambda: self.name,
+            'photo_url': lambda: photo_urls(self.photo_url)['photo_url'],
+            'photo_thumbnail_url': lambda: photo_urls(self.photo_url)['photo_thumbnail_url'],
+            'location': lambda: self.location,
+            'availability': lambda: self.availability,
+            'availability_slots': lambda: mask_to_slots(mask_from_bytes(self.availability_mask)),
+            'skills_offered': lambda: loads(self.skills_offered) if self.skills_offered else [],
+            'skills_wanted': lambda: loads(self.skills_wanted) if self.skills_wanted else [],
+            'rating_count': lambda: rating_summary(self.rating_count, self.rating_sum)['rating_count'],
+            'rating_average': lambda: rating_summary(self.rating_count, self.rating_sum)['rating_average'],
+            'is_public': lambda: self.is_public,
+            'role': lambda: self.role,
+            'is_banned': lambda: self.is_banned,
+            'created_at': lambda: self.created_at,
+            'updated_at': lambda: self.updated_at
+        })
 
 class SwapRequest(db.Model):
     __tablename__ = 'swap_requests'
@@ -56,6 +97,8 @@ class SwapRequest(db.Model):
     to_user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     skill_offered = db.Column(db.String(255), nullable=False)
     skill_wanted = db.Column(db.String(255), nullable=False)
+    skill_offered_id = db.Column(db.Integer, db.ForeignKey('skills.id'), index=True)
+    skill_wanted_id = db.Column(db.Integer, db.ForeignKey('skills.id'), index=True)
     status = db.Column(db.String(20), default='pending')  # 'pending', 'accepted', 'rejected'
     message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -64,20 +107,35 @@ class SwapRequest(db.Model):
     # Relationships
     chat_room = db.relationship('ChatRoom', backref='request', uselist=False, lazy=True)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'from_user_id': self.from_user_id,
-            'to_user_id': self.to_user_id,
-            'from_user': self.from_user.to_dict() if self.from_user else None,
-            'to_user': self.to_user.to_dict() if self.to_user else None,
-            'skill_offered': self.skill_offered,
-            'skill_wanted': self.skill_wanted,
-            'status': self.status,
-            'message': self.message,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    FIELDS = {
+        'id': ('id',),
+        'from_user_id': ('from_user_id',),
+        'to_user_id': ('to_user_id',),
+        'from_user': ('from_user_id',),
+        'to_user': ('to_user_id',),
+        'skill_offered': ('skill_offered',),
+        'skill_wanted': ('skill_wanted',),
+        'status': ('status',),
+        'message': ('message',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    
+    def to_dict(self, fields=None):
+        from app.utils.fields import pick
+        return pick(fields, 'requests', {
+            'id': lambda: self.id,
+            'from_user_id': lambda: self.from_user_id,
+            'to_user_id': lambda: self.to_user_id,
+            'from_user': lambda: self.from_user.to_dict(fields) if self.from_user else None,
+            'to_user': lambda: self.to_user.to_dict(fields) if self.to_user else None,
+            'skill_offered': lambda: self.skill_offered,
+            'skill_wanted': lambda: self.skill_wanted,
+            'status': lambda: self.status,
+            'message': lambda: self.message,
+            'created_at': lambda: self.created_at,
+            'updated_at': lambda: self.updated_at
+        })
 
 class ChatRoom(db.Model):
     __tablename__ = 'chat_rooms'
@@ -85,20 +143,36 @@ class ChatRoom(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     user1_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     user2_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    request_id = db.Column(db.String(36), db.ForeignKey('swap_requests.id'), nullable=False)
+    request_id = db.Column(db.String(36), db.ForeignKey('swap_requests.id'), nullable=False, unique=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_message_id = db.Column(db.String(36))  # denormalized for the inbox
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)  # created_at of the last message, or of the room
     
     # Relationships
     messages = db.relationship('Message', backref='chat_room', lazy=True)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user1_id': self.user1_id,
-            'user2_id': self.user2_id,
-            'request_id': self.request_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    __table_args__ = (
+        db.Index('ix_chat_rooms_user1_activity', 'user1_id', 'last_activity_at'),
+        db.Index('ix_chat_rooms_user2_activity', 'user2_id', 'last_activity_at'),
+    )
+    
+    FIELDS = {
+        'id': ('id',),
+        'user1_id': ('user1_id',),
+        'user2_id': ('user2_id',),
+        'request_id': ('request_id',),
+        'created_at': ('created_at',),
+    }
+    
+    def to_dict(self, fields=None):
+        from app.utils.fields import pick
+        return pick(fields, 'chat_rooms', {
+            'id': lambda: self.id,
+            'user1_id': lambda: self.user1_id,
+            'user2_id': lambda: self.user2_id,
+            'request_id': lambda: self.request_id,
+            'created_at': lambda: self.created_at
+        })
 
 class Message(db.Model):
     __tablename__ = 'messages'
@@ -109,14 +183,99 @@ class Message(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_messages_room_created', 'chat_room_id', 'created_at'),)
+    
+    FIELDS = {
+        'id': ('id',),
+        'chat_room_id': ('chat_room_id',),
+        'sender_id': ('sender_id',),
+        'sender': ('sender_id',),
+        'text': ('text',),
+        'created_at': ('created_at',),
+    }
+    
+    def to_dict(self, fields=None):
+        from app.utils.fields import pick
+        return pick(fields, 'messages', {
+            'id': lambda: self.id,
+            'chat_room_id': lambda: self.chat_room_id,
+            'sender_id': lambda: self.sender_id,
+            'sender': lambda: self.sender.to_dict(fields) if self.sender else None,
+            'text': lambda: self.text,
+            'created_at': lambda: self.created_at
+        })
+
+class ChatRead(db.Model):
+    __tablename__ = 'chat_reads'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    chat_room_id = db.Column(db.String(36), db.ForeignKey('chat_rooms.id'), primary_key=True)
+    last_read_message_id = db.Column(db.String(36), nullable=False)
+    last_read_at = db.Column(db.DateTime, nullable=False)  # created_at of the last read message
+    
     def to_dict(self):
         return {
-            'id': self.id,
             'chat_room_id': self.chat_room_id,
-            'sender_id': self.sender_id,
-            'sender': self.sender.to_dict() if self.sender else None,
-            'text': self.text,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'last_read_message_id': self.last_read_message_id,
+            'last_read_at': self.last_read_at
+        }
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    locked_until = db.Column(db.DateTime)  # claimed by a worker, or backing off after a failure
+    
+    __table_args__ = (db.Index('ix_outbox_pending', 'processed_at', 'id'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'payload': self.payload,
+            'created_at': self.created_at,
+            'processed_at': self.processed_at,
+            'attempts': self.attempts,
+            'last_error': self.last_error
+        }
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    name = db.Column(db.String(100), nullable=False)  # registered task name
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'done', 'failed'
+    unique_key = db.Column(db.String(255), unique=True)  # deduplicates scheduled runs across processes
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not before this time
+    locked_until = db.Column(db.DateTime)  # lease of the worker running it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (db.Index('ix_jobs_queue_status_run_at', 'queue', 'status', 'run_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'queue': self.queue,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'run_at': self.run_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
         }
 
 class Feedback(db.Model):
@@ -130,6 +289,13 @@ class Feedback(db.Model):
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    from_user = db.relationship('User', foreign_keys=[from_user_id], lazy=True)
+    
+    __table_args__ = (
+        db.Index('ux_feedback_request_from_user', 'request_id', 'from_user_id', unique=True),  # one per participant
+        db.Index('ix_feedback_to_user_created', 'to_user_id', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -138,5 +304,44 @@ class Feedback(db.Model):
             'to_user_id': self.to_user_id,
             'rating': self.rating,
             'comment': self.comment,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        } 
\ No newline at end of file
+            'created_at': self.created_at
+        }
+
+class Skill(db.Model):
+    __tablename__ = 'skills'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)  # canonical display name
+    key = db.Column(db.String(255), unique=True, nullable=False)  # normalized lowercase name
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    aliases = db.relationship('SkillAlias', backref='skill', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'aliases': [alias.alias for alias in self.aliases]
+        }
+
+class SkillAlias(db.Model):
+    __tablename__ = 'skill_aliases'
+    
+    alias = db.Column(db.String(255), primary_key=True)  # normalized lowercase name
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), nullable=False, index=True)
+
+class UserSkill(db.Model):
+    __tablename__ = 'user_skills'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'offered' or 'wanted'
+    
+    __table_args__ = (db.Index('ix_user_skills_skill_kind', 'skill_id', 'kind'),)
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True)  # schema.SCHEMA_VERSION when init-db.py last ran
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
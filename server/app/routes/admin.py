@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
-from app.models import db, User, SwapRequest
+from app.models import db, User, SwapRequest, Job
 from app.utils.auth import require_admin, get_current_user
+from app.utils.jobs import queue_stats
+from app.utils.ratings import remove_request_feedback
+from app.utils.outbox import emit
+from app.utils.http_cache import listing_cache
 from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
@@ -34,6 +38,8 @@ def ban_user(user_id):
         
         user.is_banned = is_banned
         db.session.commit()
+        # Cached directory pages carry the old ban status
+        listing_cache.clear()
         
         action = 'banned' if is_banned else 'unbanned'
         return jsonify({
@@ -100,6 +106,20 @@ def get_platform_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/jobs', methods=['GET'])
+@require_admin
+def get_job_stats():
+    """Get background job queue depth, latency and recent failures (admin only)"""
+    try:
+        failed = Job.query.filter_by(status='failed').order_by(Job.finished_at.desc()).limit(20).all()
+        
+        return jsonify({
+            'queues': queue_stats(),
+            'recent_failures': [job.to_dict() for job in failed]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/requests', methods=['GET'])
 @require_admin
 def get_all_requests():
@@ -123,6 +143,9 @@ def delete_any_request(request_id):
         if not request_data:
             return jsonify({'error': 'Request not found'}), 404
         
+        remove_request_feedback(request_id)
+        emit('request.deleted', request_id=request_id, from_user_id=request_data.from_user_id,
+             to_user_id=request_data.to_user_id, status=request_data.status)
         db.session.delete(request_data)
         db.session.commit()
         
@@ -1,12 +1,19 @@
 from flask import Blueprint, request, jsonify
 from app.models import db, User
-from app.utils.auth import generate_token, get_current_user, hash_password, verify_password
+from app.utils.auth import generate_token, get_current_user, hash_password, verify_password, password_needs_rehash
+from app.utils.hashing import HashingPoolSaturated
+from app.utils.ratelimit import rate_limit
+from app.utils.http_cache import make_etag, not_modified, with_etag
+from app.utils.skills import skill_suggester, set_user_skills
+from app.utils.geo import set_user_location
+from app.utils.availability import set_user_availability
+from app.utils.ranking import record_profile_change, record_activity
 import re
-import json
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', per_ip='5/minute')
 def register():
     """Register a new user"""
     try:
@@ -38,16 +45,23 @@ def register():
             email=email,
             password_hash=hash_password(password),
             name=data['name'],
-            location=data.get('location', ''),
-            availability=data.get('availability', ''),
-            skills_offered=json.dumps(data.get('skills_offered', [])),
-            skills_wanted=json.dumps(data.get('skills_wanted', [])),
             is_public=data.get('is_public', True),
             role='user'
         )
         
-        db.session.add(user)
+        # Geocode the location against the offline gazetteer for proximity search
+        set_user_location(user, data.get('location', ''))
+        # Weekly hour slots, given explicitly or parsed from the availability text
+        try:
+            set_user_availability(user, data.get('availability', ''), data.get('availability_slots'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Resolve skills against the canonical dictionary
+        set_user_skills(user, data.get('skills_offered', []), data.get('skills_wanted', []))
+        record_profile_change(user)
         db.session.commit()
+        skill_suggester.update(None, None, user.skills_offered, user.skills_wanted)
         
         # Generate token
         token = generate_token(user.id, user.email, user.role)
@@ -63,11 +77,15 @@ def register():
             'token': token
         }), 201
             
+    except HashingPoolSaturated:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', per_ip='10/minute', per_account='5/minute')
 def login():
     """Login user"""
     try:
@@ -89,6 +107,12 @@ def login():
         if user.is_banned:
             return jsonify({'error': 'Account is banned'}), 403
         
+        # Upgrade hashes made with an older method or cost
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = hash_password(data['password'])
+        record_activity(user.id)
+        db.session.commit()
+        
         # Generate token
         token = generate_token(user.id, user.email, user.role)
         
@@ -103,7 +127,11 @@ def login():
             'token': token
         }), 200
             
+    except HashingPoolSaturated:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -125,8 +153,13 @@ def get_current_user_info():
         if not user:
             return jsonify({'error': 'Authentication required'}), 401
         
-        return jsonify({
+        etag = make_etag('me', user.id, user.updated_at)
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        return with_etag(jsonify({
             'user': user.to_dict()
-        }), 200
+        }), etag), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
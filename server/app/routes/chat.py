@@ -1,19 +1,37 @@
 from flask import Blueprint, request, jsonify
 from app.models import db, User, SwapRequest, ChatRoom, Message
 from app.utils.auth import require_auth, get_current_user
+from app.utils.ratelimit import rate_limit
+from app.utils.inbox import inbox_page, mark_read, record_message, encode_cursor, decode_cursor
+from app.utils.archive import message_page, room_messages
+from app.utils.ranking import record_activity
+from app.utils.fields import FieldError, parse_fields, load_only, load_related, pick
+from sqlalchemy.exc import IntegrityError
 
 chat_bp = Blueprint('chat', __name__)
 
 @chat_bp.route('/room/<request_id>', methods=['GET'])
 @require_auth
 def get_chat_room(request_id):
-    """Get chat room for a specific request"""
+    """Get chat room for a specific request.
+    
+    fields= limits each message; fields[users]=, fields[requests]= and fields[chat_rooms]= the other parts.
+    """
     try:
         current_user = get_current_user()
         print(f"🔍 Getting chat room for request ID: {request_id}, user: {current_user.id}")
         
+        try:
+            fields = parse_fields('messages')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Get the request to verify access
-        request_data = SwapRequest.query.get(request_id)
+        request_data = SwapRequest.query.options(
+            *load_only(fields, 'requests', 'from_user_id', 'to_user_id', 'status'),
+            *load_related(fields, SwapRequest.from_user, 'users'),
+            *load_related(fields, SwapRequest.to_user, 'users'),
+        ).get(request_id)
         if not request_data:
             print(f"❌ Request not found: {request_id}")
             return jsonify({'error': 'Request not found'}), 404
@@ -29,30 +47,35 @@ def get_chat_room(request_id):
         # Get or create chat room
         chat_room = ChatRoom.query.filter_by(request_id=request_id).first()
         if not chat_room:
-            # Create chat room if request is accepted
+            # Create chat room if request is accepted (rooms are created on acceptance; this covers older requests)
             if request_data.status == 'accepted':
-                chat_room = ChatRoom(
-                    user1_id=request_data.from_user_id,
-                    user2_id=request_data.to_user_id,
-                    request_id=request_id
-                )
-                db.session.add(chat_room)
-                db.session.commit()
-                print(f"✅ Created new chat room: {chat_room.id}")
+                try:
+                    with db.session.begin_nested():
+                        chat_room = ChatRoom(
+                            user1_id=request_data.from_user_id,
+                            user2_id=request_data.to_user_id,
+                            request_id=request_id
+                        )
+                        db.session.add(chat_room)
+                    db.session.commit()
+                    print(f"✅ Created new chat room: {chat_room.id}")
+                except IntegrityError:
+                    # A concurrent call created it first (chat_rooms.request_id is unique)
+                    chat_room = ChatRoom.query.filter_by(request_id=request_id).one()
             else:
                 print(f"❌ Chat room not available - request status: {request_data.status}")
                 return jsonify({'error': 'Chat room not available for this request'}), 404
         else:
             print(f"✅ Found existing chat room: {chat_room.id}")
         
-        # Get messages for this chat room
-        messages = Message.query.filter_by(chat_room_id=chat_room.id).order_by(Message.created_at).all()
+        # Get messages for this chat room (including archived history)
+        messages = room_messages(chat_room.id, fields)
         print(f"📝 Found {len(messages)} messages")
         
         response_data = {
-            'chat_room': chat_room.to_dict(),
-            'swap_request': request_data.to_dict(),
-            'messages': [msg.to_dict() for msg in messages]
+            'chat_room': chat_room.to_dict(fields),
+            'swap_request': request_data.to_dict(fields),
+            'messages': messages
         }
         print(f"✅ Returning chat data with {len(response_data['messages'])} messages")
         
@@ -65,10 +88,18 @@ def get_chat_room(request_id):
 @chat_bp.route('/<room_id>', methods=['GET'])
 @require_auth
 def get_messages(room_id):
-    """Get messages for a chat room"""
+    """Get messages for a chat room; with limit=, pages backwards from the newest using the before= cursor.
+    
+    fields= limits each message to those fields, fields[users]= the sender.
+    """
     try:
         current_user = get_current_user()
         
+        try:
+            fields = parse_fields('messages')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Get chat room to verify access
         chat_room = ChatRoom.query.get(room_id)
         if not chat_room:
@@ -79,17 +110,32 @@ def get_messages(room_id):
             if current_user.role != 'admin':
                 return jsonify({'error': 'Unauthorized'}), 403
         
-        # Get messages
-        messages = Message.query.filter_by(chat_room_id=room_id).order_by(Message.created_at).all()
+        if 'limit' not in request.args:
+            # Get all messages (including archived history)
+            messages = room_messages(room_id, fields)
+            return jsonify({
+                'messages': messages,
+                'total': len(messages)
+            }), 200
+        
+        limit = min(int(request.args.get('limit', 50)), 200)
+        try:
+            before = decode_cursor(request.args['before']) if request.args.get('before') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        # Newest page first; older pages continue from the table into the archive
+        messages, next_before = message_page(room_id, limit, before, fields)
         return jsonify({
-            'messages': [msg.to_dict() for msg in messages],
-            'total': len(messages)
+            'messages': messages,
+            'total': len(messages),
+            'before': encode_cursor(*next_before) if next_before else None
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @chat_bp.route('/<room_id>', methods=['POST'])
+@rate_limit('send_message', per_ip='120/minute', per_user='60/minute')
 @require_auth
 def send_message(room_id):
     """Send a message in a chat room"""
@@ -118,6 +164,9 @@ def send_message(room_id):
         )
         
         db.session.add(message)
+        db.session.flush()
+        record_message(chat_room, message)
+        record_activity(current_user.id)
         db.session.commit()
         
         return jsonify({
@@ -132,7 +181,7 @@ def send_message(room_id):
 @chat_bp.route('/user/<user_id>', methods=['GET'])
 @require_auth
 def get_user_chat_rooms(user_id):
-    """Get chat rooms for a specific user"""
+    """Get chat rooms for a specific user (fields= limits each room, fields[requests]= and fields[users]= its request)"""
     try:
         current_user = get_current_user()
         
@@ -140,8 +189,20 @@ def get_user_chat_rooms(user_id):
         if current_user.id != user_id and current_user.role != 'admin':
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Get chat rooms where user is a participant
-        chat_rooms = ChatRoom.query.filter(
+        try:
+            fields = parse_fields('chat_rooms')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Get chat rooms where user is a participant, with their requests and both users loaded up front
+        chat_rooms = ChatRoom.query.options(
+            *load_only(fields, 'chat_rooms', 'request_id'),
+            db.joinedload(ChatRoom.request).options(
+                *load_only(fields, 'requests'),
+                *load_related(fields, SwapRequest.from_user, 'users'),
+                *load_related(fields, SwapRequest.to_user, 'users'),
+            )
+        ).filter(
             (ChatRoom.user1_id == user_id) | (ChatRoom.user2_id == user_id)
         ).all()
         
@@ -149,13 +210,15 @@ def get_user_chat_rooms(user_id):
         chat_rooms_data = []
         for chat_room in chat_rooms:
             # Get the associated request
-            request_data = SwapRequest.query.get(chat_room.request_id)
+            request_data = chat_room.request
             if request_data:
                 chat_rooms_data.append({
-                    'id': chat_room.id,
-                    'request_id': chat_room.request_id,
-                    'created_at': chat_room.created_at.isoformat() if chat_room.created_at else None,
-                    'swap_request': request_data.to_dict()
+                    **pick(fields, 'chat_rooms', {
+                        'id': lambda: chat_room.id,
+                        'request_id': lambda: chat_room.request_id,
+                        'created_at': lambda: chat_room.created_at
+                    }),
+                    'swap_request': request_data.to_dict(fields)
                 })
         
         return jsonify({
@@ -164,4 +227,59 @@ def get_user_chat_rooms(user_id):
         }), 200
     except Exception as e:
         print(f"❌ Error in get_user_chat_rooms: {e}")
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@chat_bp.route('/inbox', methods=['GET'])
+@require_auth
+def get_inbox():
+    """Get the current user's chat rooms with last message and unread count, latest activity first"""
+    try:
+        current_user = get_current_user()
+        limit = min(int(request.args.get('limit', 20)), 100)
+        cursor = request.args.get('cursor')
+        
+        try:
+            rooms, next_cursor = inbox_page(current_user.id, limit, cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'chat_rooms': rooms,
+            'next_cursor': next_cursor
+        }), 200
+    except Exception as e:
+        print(f"❌ Error in get_inbox: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@chat_bp.route('/<room_id>/read', methods=['POST'])
+@require_auth
+def mark_room_read(room_id):
+    """Mark messages in a chat room as read up to a message (the latest one by default)"""
+    try:
+        current_user = get_current_user()
+        
+        chat_room = ChatRoom.query.get(room_id)
+        if not chat_room:
+            return jsonify({'error': 'Chat room not found'}), 404
+        if chat_room.user1_id != current_user.id and chat_room.user2_id != current_user.id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        message_id = data.get('message_id') or chat_room.last_message_id
+        if not message_id:
+            return jsonify({'message': 'No messages to mark as read'}), 200
+        
+        message = Message.query.filter_by(id=message_id, chat_room_id=room_id).first()
+        if not message:
+            return jsonify({'error': 'Message not found'}), 404
+        
+        marker = mark_read(current_user.id, message)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Chat room marked as read',
+            'read': marker.to_dict()
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
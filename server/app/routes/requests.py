@@ -1,41 +1,80 @@
 from flask import Blueprint, request, jsonify
 from app.models import db, User, SwapRequest, ChatRoom
 from app.utils.auth import require_auth, get_current_user
+from app.utils.ratelimit import rate_limit
+from app.utils.http_cache import make_etag, not_modified, with_etag, listing_cache
+from app.utils.skills import resolve_skills
+from app.utils.outbox import emit
+from app.utils.ratings import record_feedback, remove_request_feedback
+from app.utils.ranking import record_activity
+from app.utils.fields import FieldError, parse_fields, load_only, load_related
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 
 requests_bp = Blueprint('requests', __name__)
 
 @requests_bp.route('/', methods=['GET'])
 @require_auth
 def get_requests():
-    """Get user's swap requests"""
+    """Get user's swap requests (fields= limits each request, fields[users]= the users embedded in it)"""
     try:
         current_user = get_current_user()
         print(f"🔍 Getting requests for user: {current_user.id}")
         
+        try:
+            fields = parse_fields('requests')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Version the list by its requests and both users embedded in each of them
+        from_user, to_user = db.aliased(User), db.aliased(User)
+        version = db.session.query(
+            db.func.count(SwapRequest.id),
+            db.func.max(SwapRequest.updated_at),
+            db.func.max(from_user.updated_at),
+            db.func.max(to_user.updated_at)
+        ).join(from_user, SwapRequest.from_user_id == from_user.id
+        ).join(to_user, SwapRequest.to_user_id == to_user.id
+        ).filter(
+            (SwapRequest.from_user_id == current_user.id) | (SwapRequest.to_user_id == current_user.id)
+        ).one()
+        etag = make_etag('requests', current_user.id, fields.key(), *version)
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        # Only the columns of the selected fields, with the embedded users joined in
+        options = (
+            *load_only(fields, 'requests'),
+            *load_related(fields, SwapRequest.from_user, 'users'),
+            *load_related(fields, SwapRequest.to_user, 'users'),
+        )
+        
         # Get requests sent by user
-        sent_requests = SwapRequest.query.filter_by(from_user_id=current_user.id).all()
+        sent_requests = SwapRequest.query.options(*options).filter_by(from_user_id=current_user.id).all()
         print(f"📤 Sent requests count: {len(sent_requests)}")
         
         # Get requests received by user
-        received_requests = SwapRequest.query.filter_by(to_user_id=current_user.id).all()
+        received_requests = SwapRequest.query.options(*options).filter_by(to_user_id=current_user.id).all()
         print(f"📥 Received requests count: {len(received_requests)}")
         
         # Combine and convert to dict
         all_requests = sent_requests + received_requests
         print(f"📊 Total requests: {len(all_requests)}")
         
-        requests_data = [req.to_dict() for req in all_requests]
+        requests_data = [req.to_dict(fields) for req in all_requests]
         print(f"✅ Returning {len(requests_data)} requests")
         
-        return jsonify({
+        return with_etag(jsonify({
             'requests': requests_data,
             'total': len(all_requests)
-        }), 200
+        }), etag), 200
     except Exception as e:
         print(f"❌ Error in get_requests: {e}")
         return jsonify({'error': str(e)}), 500
 
 @requests_bp.route('/', methods=['POST'])
+@rate_limit('create_request', per_ip='60/minute', per_user='20/minute')
 @require_auth
 def create_request():
     """Create a new swap request"""
@@ -50,6 +89,9 @@ def create_request():
         for field in required_fields:
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
+        for field in ['skill_offered', 'skill_wanted']:
+            if not isinstance(data[field], str) or not data[field].strip():
+                return jsonify({'error': f'{field} must be a skill name'}), 400
         
         # Check if target user exists
         target_user = User.query.get(data['to_user'])
@@ -60,17 +102,27 @@ def create_request():
         if current_user.id == data['to_user']:
             return jsonify({'error': 'Cannot create request to yourself'}), 400
         
+        # Resolve both skills against the canonical dictionary
+        skill_offered, skill_wanted = resolve_skills([data['skill_offered']])[0], resolve_skills([data['skill_wanted']])[0]
+        
         # Create request
         new_request = SwapRequest(
             from_user_id=current_user.id,
             to_user_id=data['to_user'],
-            skill_offered=data['skill_offered'],
-            skill_wanted=data['skill_wanted'],
+            skill_offered=skill_offered.name,
+            skill_wanted=skill_wanted.name,
+            skill_offered_id=skill_offered.id,
+            skill_wanted_id=skill_wanted.id,
             message=data.get('message', ''),
             status='pending'
         )
         
         db.session.add(new_request)
+        db.session.flush()
+        record_activity(current_user.id)
+        emit('request.created', request_id=new_request.id, from_user_id=new_request.from_user_id,
+             to_user_id=new_request.to_user_id, skill_offered=new_request.skill_offered,
+             skill_wanted=new_request.skill_wanted)
         db.session.commit()
         print(f"✅ Swap request created successfully with ID: {new_request.id}")
         
@@ -87,12 +139,21 @@ def create_request():
 @requests_bp.route('/<request_id>', methods=['GET'])
 @require_auth
 def get_request(request_id):
-    """Get specific swap request"""
+    """Get specific swap request (fields= limits it to those fields, fields[users]= the embedded users)"""
     try:
         current_user = get_current_user()
         
+        try:
+            fields = parse_fields('requests')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Get the request
-        request_data = SwapRequest.query.get(request_id)
+        request_data = SwapRequest.query.options(
+            *load_only(fields, 'requests', 'from_user_id', 'to_user_id'),
+            *load_related(fields, SwapRequest.from_user, 'users'),
+            *load_related(fields, SwapRequest.to_user, 'users'),
+        ).get(request_id)
         if not request_data:
             return jsonify({'error': 'Request not found'}), 404
         
@@ -101,7 +162,7 @@ def get_request(request_id):
             if current_user.role != 'admin':
                 return jsonify({'error': 'Unauthorized'}), 403
         
-        return jsonify({'request': request_data.to_dict()}), 200
+        return jsonify({'request': request_data.to_dict(fields)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -128,19 +189,36 @@ def update_request(request_id):
         if new_status not in valid_statuses:
             return jsonify({'error': 'Invalid status'}), 400
         
-        # Update the request
         old_status = request_data.status
-        request_data.status = new_status
-        db.session.commit()
-        
-        # If request is accepted, create a chat room
-        if new_status == 'accepted' and old_status == 'pending':
-            chat_room = ChatRoom(
-                user1_id=request_data.from_user_id,
-                user2_id=request_data.to_user_id,
-                request_id=request_id
-            )
-            db.session.add(chat_room)
+        if new_status != old_status:
+            # Compare-and-set, so of two concurrent updates only one applies
+            updated = db.session.execute(
+                db.update(SwapRequest).where(
+                    SwapRequest.id == request_id, SwapRequest.status == old_status
+                ).values(status=new_status, updated_at=datetime.utcnow())
+            ).rowcount
+            if not updated:
+                db.session.rollback()
+                return jsonify({'error': 'Request was updated concurrently, please retry'}), 409
+            
+            record_activity(current_user.id)
+            
+            # If request is accepted, create its chat room in the same transaction
+            chat_room = ChatRoom.query.filter_by(request_id=request_id).first()
+            if new_status == 'accepted' and not chat_room:
+                chat_room = ChatRoom(
+                    user1_id=request_data.from_user_id,
+                    user2_id=request_data.to_user_id,
+                    request_id=request_id
+                )
+                db.session.add(chat_room)
+                db.session.flush()
+            
+            # Side effects (notification, the receiver's acceptance counters and rank,
+            # the directory cache) run from the outbox after commit
+            emit('request.status_changed', request_id=request_id, from_user_id=request_data.from_user_id,
+                 to_user_id=request_data.to_user_id, old_status=old_status, status=new_status,
+                 chat_room_id=chat_room.id if chat_room else None)
             db.session.commit()
         
         return jsonify({
@@ -148,6 +226,10 @@ def update_request(request_id):
             'request': request_data.to_dict()
         }), 200
             
+    except IntegrityError:
+        # Another transaction created the chat room first
+        db.session.rollback()
+        return jsonify({'error': 'Request was updated concurrently, please retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -172,7 +254,10 @@ def delete_request(request_id):
         if request_data.status != 'pending' and current_user.role != 'admin':
             return jsonify({'error': 'Can only delete pending requests'}), 400
         
-        # Delete the request
+        # Delete the request (and any feedback on it, out of the ratings and acceptance counts)
+        remove_request_feedback(request_id)
+        emit('request.deleted', request_id=request_id, from_user_id=request_data.from_user_id,
+             to_user_id=request_data.to_user_id, status=request_data.status)
         db.session.delete(request_data)
         db.session.commit()
         
@@ -180,4 +265,45 @@ def delete_request(request_id):
             
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500 
+
+@requests_bp.route('/<request_id>/feedback', methods=['POST'])
+@rate_limit('feedback', per_ip='60/minute', per_user='20/minute')
+@require_auth
+def leave_feedback(request_id):
+    """Rate the other participant of an accepted swap request (posting again replaces the rating)"""
+    try:
+        current_user = get_current_user()
+        data = request.get_json() or {}
+        
+        request_data = SwapRequest.query.get(request_id)
+        if not request_data:
+            return jsonify({'error': 'Request not found'}), 404
+        
+        if current_user.id not in (request_data.from_user_id, request_data.to_user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        if request_data.status != 'accepted':
+            return jsonify({'error': 'Can only leave feedback on accepted requests'}), 400
+        
+        rating = data.get('rating')
+        if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5:
+            return jsonify({'error': 'rating must be an integer from 1 to 5'}), 400
+        
+        # The feedback and the rated user's aggregates are committed together
+        feedback, created = record_feedback(request_data, current_user.id, rating, data.get('comment'))
+        db.session.commit()
+        listing_cache.clear()
+        
+        return jsonify({
+            'message': 'Feedback saved successfully',
+            'feedback': feedback.to_dict()
+        }), 201 if created else 200
+            
+    except IntegrityError:
+        # A concurrent request created this participant's feedback first
+        db.session.rollback()
+        return jsonify({'error': 'Feedback was saved concurrently, please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,18 @@
+from flask import Blueprint, request, jsonify
+from app.utils.skills import skill_suggester
+
+skills_bp = Blueprint('skills', __name__)
+
+@skills_bp.route('/suggest', methods=['GET'])
+def suggest_skills():
+    """Suggest skills starting with a prefix, most popular first"""
+    try:
+        prefix = request.args.get('prefix', '')
+        limit = min(int(request.args.get('limit', 10)), 50)
+        
+        return jsonify({
+            'prefix': prefix,
+            'suggestions': skill_suggester.suggest(prefix, limit)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
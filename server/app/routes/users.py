@@ -1,84 +1,222 @@
-from flask import Blueprint, request, jsonify
-from app.models import db, User
-from app.utils.auth import require_auth, get_current_user
-import os
-import json
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, current_app
+from app.models import db, User, Feedback
+from app.utils.auth import require_auth, get_current_user, hash_password, verify_password
+from app.utils.hashing import HashingPoolSaturated
+from app.utils.ratelimit import rate_limit
+from app.utils.uploads import PHOTO_URL_RE, upload_folder, store_upload, schedule_thumbnails, schedule_photo_cleanup, photo_urls
+from app.utils.http_cache import make_etag, not_modified, with_etag, listing_cache
+from app.utils.matching import match_index
+from app.utils.skills import skill_suggester, set_user_skills, skill_names_list, skill_user_ids, check_skill_names
+from app.utils.search import apply_text_search
+from app.utils.geo import parse_near, near_filter, haversine_km, set_user_location
+from app.utils.availability import availability_index, set_user_availability, mask_from_bytes, mask_to_slots
+from app.utils.ratings import rating_summary
+from app.utils.ranking import record_profile_change, decode_rank_cursor, encode_rank_cursor, after_rank
+from app.utils.fields import FieldError, parse_fields, load_only
 
 users_bp = Blueprint('users', __name__)
 
 @users_bp.route('/', methods=['GET'])
 def get_users():
-    """Get public users with pagination and search"""
+    """Get public users with pagination, skill search, full-text search and proximity search.
+    
+    Without q or near, users are listed by directory rank; pass next_cursor back as cursor for the next page.
+    fields= limits each user to those fields.
+    """
     try:
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         search = request.args.get('search', '')
+        q = request.args.get('q', '')
+        near = request.args.get('near', '')
+        radius_km = min(float(request.args.get('radius_km', 25)), 1000)
+        cursor = request.args.get('cursor', '')
         
         offset = (page - 1) * limit
         
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        after = None
+        if cursor:
+            try:
+                after = decode_rank_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        center = None
+        next_cursor = None
+        if near:
+            center = parse_near(near)
+            if center is None:
+                return jsonify({'error': 'Unknown location for near'}), 400
+            if radius_km <= 0:
+                return jsonify({'error': 'radius_km must be positive'}), 400
+        
         # Get current user if authenticated
         current_user = get_current_user()
         current_user_id = current_user.id if current_user else None
         
+        # Anonymous pages are shared by every visitor, serve them from the short-lived cache
+        cache_key = (page, limit, search, q, center, radius_km, cursor, fields.key()) if not current_user_id else None
+        cached = listing_cache.get(cache_key) if cache_key else None
+        if cached:
+            etag, body = cached
+            return not_modified(etag) or with_etag(current_app.response_class(body, mimetype='application/json'), etag)
+        
+        # Any change to a visible user bumps the count or the latest updated_at, rank changes move the rank total
+        visible = (User.is_public == True, User.role != 'admin', User.id != current_user_id)
+        user_count, last_updated, rank_total = db.session.query(
+            db.func.count(User.id), db.func.max(User.updated_at), db.func.sum(User.user_rank)
+        ).filter(*visible).one()
+        etag = make_etag('users', current_user_id, page, limit, search, q, center, radius_km, cursor, fields.key(),
+                         user_count, last_updated, rank_total)
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        # Full-text search over name, location, availability and skills, ranked by relevance
+        query = User.query.filter(*visible)
+        if q:
+            query = apply_text_search(query, q)
+        
         if search:
-            # Search by skills - exclude admin users and current user
-            skills = [skill.strip() for skill in search.split(',')]
-            users = User.query.filter(
-                User.is_public == True,
-                User.role != 'admin',
-                User.id != current_user_id
-            ).all()
-            
-            # Filter by skills
-            filtered_users = []
-            for user in users:
-                user_skills = user.to_dict()['skills_offered'] + user.to_dict()['skills_wanted']
-                if any(skill.lower() in [s.lower() for s in user_skills] for skill in skills):
-                    filtered_users.append(user)
-            
-            users = filtered_users[offset:offset + limit]
-            
-            users_data = [user.to_dict() for user in users]
-            print(f"✅ Returning {len(users_data)} users from search (excluded admin users and current user)")
-            print(f"🔍 Current user ID: {current_user_id}")
-            print(f"🔍 Users returned: {[u['name'] for u in users_data]}")
+            # Search by skills through the skill id index (names and aliases resolve to canonical skills)
+            matching_ids = skill_user_ids([skill.strip() for skill in search.split(',')])
+            query = query.filter(User.id.in_(matching_ids)) if matching_ids is not None else query.filter(db.false())
+        
+        if center:
+            # Geohash range scans narrow the candidates, exact distances filter and order them
+            candidates = query.filter(near_filter(*center, radius_km)).with_entities(User.id, User.latitude, User.longitude).all()
+            distances = sorted(
+                (distance, user_id) for user_id, lat, lon in candidates
+                if (distance := haversine_km(*center, lat, lon)) <= radius_km
+            )[offset:offset + limit]
+            by_id = {user.id: user for user in User.query.options(*load_only(fields, 'users')).filter(
+                User.id.in_([user_id for _, user_id in distances])
+            ).all()}
+            users = [by_id[user_id] for _, user_id in distances if user_id in by_id]
+            users_data = [{**by_id[user_id].to_dict(fields), 'distance_km': round(distance, 1)} for distance, user_id in distances if user_id in by_id]
+        elif q:
+            # Get public users - exclude admin users and current user
+            users = query.options(*load_only(fields, 'users')).offset(offset).limit(limit).all()
+            users_data = [user.to_dict(fields) for user in users]
         else:
-            # Get all public users - exclude admin users and current user
-            users = User.query.filter(
-                User.is_public == True,
-                User.role != 'admin',
-                User.id != current_user_id
-            ).offset(offset).limit(limit).all()
+            # Directory order: precomputed rank over the (is_public, user_rank, id) index, keyset paginated
+            query = query.options(*load_only(fields, 'users', 'user_rank')).order_by(User.user_rank.desc(), User.id.desc())
+            query = query.filter(after_rank(*after)) if after else query.offset(offset)
+            users = query.limit(limit + 1).all()
+            if len(users) > limit:
+                users = users[:limit]
+                next_cursor = encode_rank_cursor(users[-1].user_rank, users[-1].id)
+            users_data = [user.to_dict(fields) for user in users]
         
-        users_data = [user.to_dict() for user in users]
         print(f"✅ Returning {len(users_data)} users (excluded admin users and current user)")
         print(f"🔍 Current user ID: {current_user_id}")
-        print(f"🔍 Users returned: {[u['name'] for u in users_data]}")
+        print(f"🔍 Users returned: {[u.get('name') for u in users_data]}")
         
-        return jsonify({
+        response = jsonify({
             'users': users_data,
             'page': page,
             'limit': limit,
-            'total': len(users)
-        }), 200
+            'total': len(users),
+            'next_cursor': next_cursor
+        })
+        if cache_key:
+            listing_cache.set(cache_key, etag, response.get_data())
+        return with_etag(response, etag), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@users_bp.route('/batch', methods=['GET', 'POST'])
+def get_users_batch():
+    """Get several user profiles in one query (?ids=a,b,c or a JSON body {"ids": [...]}), keyed by id.
+    
+    Each id follows the same rules as GET /<user_id>: ids that don't exist are listed in
+    not_found, private profiles other than the caller's own in private. fields= limits each profile to those fields.
+    """
+    try:
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            ids = data.get('ids') if isinstance(data, dict) else data
+            if not isinstance(ids, list) or not all(isinstance(user_id, str) for user_id in ids):
+                return jsonify({'error': 'ids must be a list of user ids'}), 400
+        else:
+            ids = request.args.get('ids', '').split(',')
+        
+        # Keep the requested order, without blanks or repeats
+        ids = list(dict.fromkeys(user_id.strip() for user_id in ids if user_id.strip()))
+        if not ids:
+            return jsonify({'error': 'ids is required'}), 400
+        limit = current_app.config['USERS_BATCH_LIMIT']
+        if len(ids) > limit:
+            return jsonify({'error': f'At most {limit} ids per request'}), 400
+        
+        current_user = get_current_user()
+        current_user_id = current_user.id if current_user else None
+        
+        found = {user.id: user for user in User.query.options(*load_only(fields, 'users', 'is_public', 'updated_at')).filter(
+            User.id.in_(ids)
+        ).all()}
+        
+        # The response changes when any requested profile is added, edited or changes visibility
+        etag = make_etag('users-batch', current_user_id, fields.key(), *(
+            (user_id, found[user_id].updated_at, found[user_id].is_public) if user_id in found else user_id
+            for user_id in ids
+        ))
+        if request.method == 'GET':
+            response = not_modified(etag)
+            if response:
+                return response
+        
+        users, not_found, private = {}, [], []
+        for user_id in ids:
+            user = found.get(user_id)
+            if not user:
+                not_found.append(user_id)
+            elif not user.is_public and user_id != current_user_id:
+                private.append(user_id)
+            else:
+                users[user_id] = user.to_dict(fields)
+        
+        response = jsonify({'users': users, 'not_found': not_found, 'private': private})
+        return (with_etag(response, etag) if request.method == 'GET' else response), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @users_bp.route('/<user_id>', methods=['GET'])
 def get_user(user_id):
-    """Get specific user profile"""
+    """Get specific user profile (fields= limits it to those fields)"""
     try:
-        user = User.query.get(user_id)
-        if not user:
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Load only the version columns first so unchanged profiles are answered without hydrating the user
+        row = db.session.query(User.is_public, User.updated_at).filter(User.id == user_id).first()
+        if not row:
             return jsonify({'error': 'User not found'}), 404
         
         # Check if user is public or if current user is requesting their own profile
         current_user = get_current_user()
-        if not user.is_public and (not current_user or current_user.id != user_id):
+        if not row.is_public and (not current_user or current_user.id != user_id):
             return jsonify({'error': 'User profile is private'}), 403
         
-        return jsonify({'user': user.to_dict()}), 200
+        etag = make_etag('user', user_id, row.updated_at, fields.key())
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        user = User.query.options(*load_only(fields, 'users')).get(user_id)
+        return with_etag(jsonify({'user': user.to_dict(fields)}), etag), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -98,24 +236,47 @@ def update_user(user_id):
         
         data = request.get_json()
         print(f"🔧 Updating user {user_id} with data: {data}")
+        old_skills = (user.skills_offered, user.skills_wanted)
+        
+        # Skill lists (a list or a JSON string) must hold non-blank names before anything is resolved
+        skill_lists = {}
+        for field in ['skills_offered', 'skills_wanted']:
+            if field in data:
+                try:
+                    value = data[field]
+                    skill_lists[field] = check_skill_names(skill_names_list(value) if isinstance(value, str) else value)
+                except ValueError as e:
+                    return jsonify({'error': f'{field}: {e}'}), 400
         
         # Fields that can be updated
-        allowed_fields = ['name', 'location', 'availability', 'skills_offered', 'skills_wanted', 'is_public']
+        allowed_fields = ['name', 'location', 'skills_offered', 'skills_wanted', 'is_public']
         
         for field in allowed_fields:
             if field in data:
-                if field in ['skills_offered', 'skills_wanted']:
-                    # Ensure skills are stored as JSON string
-                    if isinstance(data[field], list):
-                        setattr(user, field, json.dumps(data[field]))
-                    else:
-                        setattr(user, field, data[field])
+                if field == 'location':
+                    set_user_location(user, data[field])
+                    print(f"🔧 Updated {field}: {data[field]}")
+                elif field in ['skills_offered', 'skills_wanted']:
+                    # Resolve skills against the canonical dictionary
+                    set_user_skills(user, **{field: skill_lists[field]})
                     print(f"🔧 Updated {field}: {data[field]}")
                 else:
                     setattr(user, field, data[field])
                     print(f"🔧 Updated {field}: {data[field]}")
         
+        # Weekly hour slots, given explicitly or parsed from the availability text
+        if 'availability' in data or 'availability_slots' in data:
+            try:
+                set_user_availability(user, data.get('availability'), data.get('availability_slots'))
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+            print(f"🔧 Updated availability: {data.get('availability')} {data.get('availability_slots')}")
+        
+        record_profile_change(user)
         db.session.commit()
+        listing_cache.clear()
+        skill_suggester.update(*old_skills, user.skills_offered, user.skills_wanted)
         print(f"✅ User {user_id} updated successfully")
         
         return jsonify({
@@ -152,34 +313,37 @@ def upload_photo(user_id):
         print(f"🔧 Uploading photo for user {user_id}: {file.filename}")
         
         # Validate file type
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-        if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+        ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+        if ext not in current_app.config['ALLOWED_EXTENSIONS']:
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Create uploads directory if it doesn't exist
-        upload_folder = 'uploads'
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-            print(f"📁 Created uploads directory: {upload_folder}")
-        
-        # Save file
-        filename = secure_filename(f"{user_id}_{file.filename}")
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        print(f"💾 Saved file: {file_path}")
+        # Stream the file to disk under its content hash (identical uploads are stored once)
+        filename = store_upload(file, upload_folder(), ext)
+        print(f"💾 Stored file: {filename}")
+        schedule_thumbnails(filename)
         
         # Update user profile with photo URL
         # Use the API base URL instead of request.host_url
+        old_photo_url = user.photo_url
         photo_url = f"http://localhost:5000/uploads/{filename}"
         user.photo_url = photo_url
+        
+        # Remove the previous photo and its variants once nobody references it (checked again when the job runs)
+        if old_photo_url and old_photo_url != photo_url and PHOTO_URL_RE.match(old_photo_url):
+            schedule_photo_cleanup(old_photo_url.rsplit('/', 1)[1])
+        
+        record_profile_change(user)
+        # The profile change and its jobs are committed together
         db.session.commit()
+        listing_cache.clear()
         
         print(f"✅ Photo uploaded successfully for user {user_id}")
         
+        user_data = user.to_dict()
         return jsonify({
             'message': 'Photo uploaded successfully',
-            'photo_url': photo_url,
-            'user': user.to_dict()
+            'photo_url': user_data['photo_url'],
+            'user': user_data
         }), 200
             
     except Exception as e:
@@ -187,6 +351,122 @@ def upload_photo(user_id):
         print(f"❌ Error uploading photo for user {user_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@users_bp.route('/<user_id>/matches', methods=['GET'])
+@require_auth
+def get_matches(user_id):
+    """Get users who offer what this user wants and want what they offer"""
+    try:
+        current_user = get_current_user()
+        if current_user.id != user_id and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = min(int(request.args.get('limit', 20)), 100)
+        
+        match_index.refresh()
+        matches = match_index.matches(user_id, limit)
+        
+        # Hydrate only the ranked page of users
+        users = {user.id: user for user in User.query.options(*load_only(fields, 'users')).filter(
+            User.id.in_([m['user_id'] for m in matches])
+        ).all()}
+        matches_data = []
+        for match in matches:
+            user = users.get(match.pop('user_id'))
+            if user:
+                matches_data.append({'user': user.to_dict(fields), **match})
+        
+        return jsonify({
+            'matches': matches_data,
+            'total': len(matches_data)
+        }), 200
+    except Exception as e:
+        print(f"❌ Error getting matches for user {user_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@users_bp.route('/<user_id>/availability-matches', methods=['GET'])
+@require_auth
+def get_availability_matches(user_id):
+    """Get users whose weekly availability overlaps this user's, most shared hours first"""
+    try:
+        current_user = get_current_user()
+        if current_user.id != user_id and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = min(int(request.args.get('limit', 20)), 100)
+        min_hours = int(request.args.get('min_hours', 1))
+        
+        availability_index.refresh()
+        matches = availability_index.matches(user_id, limit, min_hours)
+        
+        # Hydrate only the ranked page of users, with the hours they share
+        me = User.query.get(user_id)
+        my_mask = mask_from_bytes(me.availability_mask) if me else 0
+        users = {user.id: user for user in User.query.options(*load_only(fields, 'users', 'availability_mask')).filter(
+            User.id.in_([m['user_id'] for m in matches])
+        ).all()}
+        matches_data = []
+        for match in matches:
+            user = users.get(match.pop('user_id'))
+            if user:
+                shared = mask_to_slots(my_mask & mask_from_bytes(user.availability_mask))
+                matches_data.append({'user': user.to_dict(fields), **match, 'shared_slots': shared})
+        
+        return jsonify({
+            'matches': matches_data,
+            'total': len(matches_data)
+        }), 200
+    except Exception as e:
+        print(f"❌ Error getting availability matches for user {user_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@users_bp.route('/<user_id>/feedback', methods=['GET'])
+def get_user_feedback(user_id):
+    """Get feedback received by a user, newest first, with the rating aggregates from the profile row"""
+    try:
+        page = int(request.args.get('page', 1))
+        limit = min(int(request.args.get('limit', 20)), 100)
+        
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        current_user = get_current_user()
+        if not user.is_public and (not current_user or current_user.id != user_id):
+            return jsonify({'error': 'User profile is private'}), 403
+        
+        feedback = Feedback.query.options(db.joinedload(Feedback.from_user)).filter_by(to_user_id=user_id).order_by(
+            Feedback.created_at.desc(), Feedback.id.desc()
+        ).offset((page - 1) * limit).limit(limit).all()
+        
+        feedback_data = []
+        for entry in feedback:
+            entry_data = entry.to_dict()
+            entry_data['from_user'] = {
+                'id': entry.from_user.id,
+                'name': entry.from_user.name,
+                **photo_urls(entry.from_user.photo_url)
+            } if entry.from_user else None
+            feedback_data.append(entry_data)
+        
+        return jsonify({
+            'feedback': feedback_data,
+            **rating_summary(user.rating_count, user.rating_sum),
+            'page': page,
+            'limit': limit
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @users_bp.route('/search', methods=['GET'])
 def search_users():
     """Search users by skills"""
@@ -195,28 +475,30 @@ def search_users():
         if not skills:
             return jsonify({'error': 'Skills parameter is required'}), 400
         
+        try:
+            fields = parse_fields('users')
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Get current user if authenticated
         current_user = get_current_user()
         current_user_id = current_user.id if current_user else None
         
         skill_list = [skill.strip() for skill in skills.split(',')]
-        users = User.query.filter(
-            User.is_public == True,
-            User.role != 'admin',
-            User.id != current_user_id
-        ).all()
-        
-        # Filter by skills
+        matching_ids = skill_user_ids(skill_list)
         filtered_users = []
-        for user in users:
-            user_skills = user.to_dict()['skills_offered'] + user.to_dict()['skills_wanted']
-            if any(skill.lower() in [s.lower() for s in user_skills] for skill in skill_list):
-                filtered_users.append(user)
+        if matching_ids is not None:
+            filtered_users = User.query.options(*load_only(fields, 'users')).filter(
+                User.is_public == True,
+                User.role != 'admin',
+                User.id != current_user_id,
+                User.id.in_(matching_ids)
+            ).all()
         
-        users_data = [user.to_dict() for user in filtered_users]
+        users_data = [user.to_dict(fields) for user in filtered_users]
         print(f"✅ Search returning {len(users_data)} users (excluded admin users and current user)")
         print(f"🔍 Current user ID: {current_user_id}")
-        print(f"🔍 Users returned: {[u['name'] for u in users_data]}")
+        print(f"🔍 Users returned: {[u.get('name') for u in users_data]}")
         
         return jsonify({
             'users': users_data,
@@ -226,6 +508,7 @@ def search_users():
         return jsonify({'error': str(e)}), 500
 
 @users_bp.route('/<user_id>/password', methods=['PUT'])
+@rate_limit('change_password', per_ip='10/minute', per_user='5/minute')
 @require_auth
 def change_password(user_id):
     """Change user password"""
@@ -247,12 +530,10 @@ def change_password(user_id):
             return jsonify({'error': 'Current password and new password are required'}), 400
         
         # Verify current password
-        from app.utils.auth import verify_password
         if not verify_password(current_password, user.password_hash):
             return jsonify({'error': 'Current password is incorrect'}), 400
         
         # Hash new password
-        from app.utils.auth import hash_password
         user.password_hash = hash_password(new_password)
         
         db.session.commit()
@@ -262,6 +543,9 @@ def change_password(user_id):
             'message': 'Password changed successfully'
         }), 200
             
+    except HashingPoolSaturated:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         print(f"❌ Error changing password for user {user_id}: {str(e)}")
@@ -0,0 +1,230 @@
+from flask import current_app
+from app.models import db, User, ChatRoom, Message
+from app.utils.fastjson import loads, dumps
+from app.utils.jobs import task
+from app.utils.fields import load_only, load_related, select
+from datetime import datetime, timedelta
+import mmap
+import os
+import struct
+import zlib
+
+# Per-room segment file: compressed blocks of messages, appended in (created_at, id) order.
+# Per-room index file: one fixed-size entry per block (offset, length, count, first/last created_at in µs).
+INDEX_ENTRY = struct.Struct('<QIIqq')
+EPOCH = datetime(1970, 1, 1)
+BLOCK_MESSAGES = 256
+ARCHIVE_BATCH = 5000  # messages read, appended and deleted per transaction
+DELETE_BATCH = 500    # ids per DELETE ... IN (...) statement
+
+
+def _micros(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def archive_folder() -> str:
+    """Absolute path of the chat archive directory"""
+    return os.path.join(current_app.root_path, current_app.config['CHAT_ARCHIVE_FOLDER'])
+
+
+def _paths(room_id: str):
+    base = os.path.join(archive_folder(), room_id[:2], room_id)
+    return base + '.seg', base + '.idx'
+
+
+def read_index(room_id: str) -> list:
+    """Block entries of a room's archive, oldest first (a torn trailing entry is ignored)"""
+    _, index_path = _paths(room_id)
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+
+def append_blocks(room_id: str, messages: list):
+    """Append messages (oldest first) to the room's segment as compressed blocks, then index them.
+
+    Both files are fsynced before returning, so the caller may delete the rows.
+    Bytes written without an index entry (a crash in between) are never read.
+    """
+    segment_path, index_path = _paths(room_id)
+    os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+    entries = []
+    with open(segment_path, 'ab') as segment:
+        offset = segment.seek(0, os.SEEK_END)
+        for i in range(0, len(messages), BLOCK_MESSAGES):
+            block = messages[i:i + BLOCK_MESSAGES]
+            payload = zlib.compress(dumps([
+                [message.id, message.sender_id, message.text, message.created_at] for message in block
+            ]))
+            segment.write(payload)
+            entries.append(INDEX_ENTRY.pack(offset, len(payload), len(block),
+                                            _micros(block[0].created_at), _micros(block[-1].created_at)))
+            offset += len(payload)
+        segment.flush()
+        os.fsync(segment.fileno())
+    with open(index_path, 'ab') as index:
+        index.write(b''.join(entries))
+        index.flush()
+        os.fsync(index.fileno())
+
+
+def read_archived(room_id: str, before=None, limit=None, since=None) -> list:
+    """Archived messages older than the (created_at, id) key `before`, newest first, at most limit.
+
+    With since, stops at messages created before that time.
+
+    The segment is memory-mapped and only the blocks that can hold matching
+    messages are decompressed, starting from the newest.
+    """
+    entries = read_index(room_id)
+    if not entries:
+        return []
+    segment_path, _ = _paths(room_id)
+    before_micros = _micros(before[0]) if before else None
+    since_micros = _micros(since) if since else None
+    found = []
+    with open(segment_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+        for offset, length, count, first_micros, last_micros in reversed(entries):
+            if before_micros is not None and first_micros > before_micros:
+                continue
+            if since_micros is not None and last_micros < since_micros:
+                break
+            rows = loads(zlib.decompress(segment[offset:offset + length]))
+            for message_id, sender_id, text, created_at in reversed(rows):
+                created_at = datetime.fromisoformat(created_at)
+                if before and (created_at, message_id) >= before:
+                    continue
+                if since and created_at < since:
+                    break
+                found.append({
+                    'id': message_id,
+                    'chat_room_id': room_id,
+                    'sender_id': sender_id,
+                    'text': text,
+                    'created_at': created_at
+                })
+            if limit is not None and len(found) >= limit:
+                break
+    return found[:limit] if limit is not None else found
+
+
+def with_senders(messages: list, fields=None) -> list:
+    """Attach sender profiles to archived message dicts with one query, keeping only the selected fields"""
+    if fields and not fields.wants('messages', 'sender'):
+        return [select(fields, 'messages', message) for message in messages]
+    senders = {user.id: user.to_dict(fields) for user in User.query.options(*load_only(fields, 'users')).filter(
+        User.id.in_({message['sender_id'] for message in messages})
+    ).all()} if messages else {}
+    for message in messages:
+        message['sender'] = senders.get(message['sender_id'])
+    return [select(fields, 'messages', message) for message in messages]
+
+
+def message_page(room_id: str, limit: int, before=None, fields=None):
+    """Newest messages older than `before` across the table and the archive, oldest first.
+
+    Returns (messages, next_before): the (created_at, id) key to pass as before
+    for the previous page, or None when there are no older messages. Archived
+    messages are always older than the ones left in the table, so the archive
+    is only read once the table runs out.
+    """
+    query = Message.query.options(
+        *load_only(fields, 'messages', 'created_at'), *load_related(fields, Message.sender, 'users')
+    ).filter_by(chat_room_id=room_id)
+    if before:
+        query = query.filter(db.or_(
+            Message.created_at < before[0],
+            db.and_(Message.created_at == before[0], Message.id < before[1]),
+        ))
+    live = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    keys = [(message.created_at, message.id) for message in live]
+    page = [message.to_dict(fields) for message in live]
+    if len(page) <= limit:
+        oldest = keys[-1] if keys else before
+        archived = read_archived(room_id, oldest, limit + 1 - len(page))
+        keys += [(message['created_at'], message['id']) for message in archived]
+        page += with_senders(archived, fields)
+    next_before = keys[limit - 1] if len(page) > limit else None
+    return page[:limit][::-1], next_before
+
+
+def room_messages(room_id: str, fields=None) -> list:
+    """Every message of a room, archived and live, oldest first"""
+    archived = with_senders(read_archived(room_id), fields)[::-1]
+    live = Message.query.options(
+        *load_only(fields, 'messages'), *load_related(fields, Message.sender, 'users')
+    ).filter_by(chat_room_id=room_id).order_by(Message.created_at, Message.id).all()
+    return archived + [message.to_dict(fields) for message in live]
+
+
+def _delete_messages(ids: list):
+    for i in range(0, len(ids), DELETE_BATCH):
+        Message.query.filter(Message.id.in_(ids[i:i + DELETE_BATCH])).delete(synchronize_session=False)
+
+
+def archive_room(room: ChatRoom, cutoff: datetime) -> int:
+    """Move a room's messages created before cutoff into its archive; returns how many were moved.
+
+    The room's last message always stays in the table for the inbox.
+    """
+    # Rows that an interrupted run appended to the archive but did not delete
+    oldest = db.session.query(db.func.min(Message.created_at)).filter(Message.chat_room_id == room.id).scalar()
+    if oldest is not None:
+        leftover = [message['id'] for message in read_archived(room.id, since=oldest)]
+        if leftover:
+            _delete_messages(leftover)
+            db.session.commit()
+
+    keep_last = Message.id != room.last_message_id if room.last_message_id else db.true()
+    moved = 0
+    while True:
+        batch = Message.query.filter(
+            Message.chat_room_id == room.id,
+            Message.created_at < cutoff,
+            keep_last,
+        ).order_by(Message.created_at, Message.id).limit(ARCHIVE_BATCH).all()
+        if not batch:
+            break
+        append_blocks(room.id, batch)
+        _delete_messages([message.id for message in batch])
+        db.session.commit()
+        moved += len(batch)
+        if len(batch) < ARCHIVE_BATCH:
+            break
+    return moved
+
+
+@task('chat.archive', queue='maintenance')
+def archive_messages(age_days: int = None, inactive_days: int = None, now: datetime = None) -> int:
+    """Archive messages older than age_days, and all messages of rooms inactive for inactive_days"""
+    config = current_app.config
+    age_days = config['CHAT_ARCHIVE_AGE_DAYS'] if age_days is None else age_days
+    inactive_days = config['CHAT_ARCHIVE_INACTIVE_DAYS'] if inactive_days is None else inactive_days
+    now = now or datetime.utcnow()
+    age_cutoff = now - timedelta(days=age_days)
+    inactive_cutoff = now - timedelta(days=inactive_days)
+
+    def archivable(cutoff):
+        # The room has a message before cutoff other than its last one
+        return db.exists().where(
+            Message.chat_room_id == ChatRoom.id,
+            Message.created_at < cutoff,
+            db.or_(ChatRoom.last_message_id.is_(None), Message.id != ChatRoom.last_message_id),
+        )
+
+    rooms = ChatRoom.query.filter(db.or_(
+        archivable(age_cutoff),
+        db.and_(ChatRoom.last_activity_at < inactive_cutoff, archivable(ChatRoom.last_activity_at)),
+    )).all()
+    moved = 0
+    for room in rooms:
+        # Idle rooms archive everything before their last message; messages sent meanwhile are newer.
+        # Rooms without last_activity_at (from before it was backfilled) only match on age
+        idle = room.last_activity_at is not None and room.last_activity_at < inactive_cutoff
+        moved += archive_room(room, max(room.last_activity_at, age_cutoff) if idle else age_cutoff)
+    print(f"📦 Archived {moved} messages from {len(rooms)} chat rooms")
+    return moved
@@ -2,8 +2,8 @@ from functools import wraps
 from flask import request, jsonify, current_app
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, User
+from app.utils.hashing import pool_hash, pool_verify, hash_method
 
 def generate_token(user_id: str, email: str, role: str = 'user') -> str:
     """Generate JWT token for user"""
@@ -66,9 +66,14 @@ def require_admin(f):
     return decorated_function
 
 def hash_password(password: str) -> str:
-    """Hash a password"""
-    return generate_password_hash(password)
+    """Hash a password with the configured method and cost"""
+    return pool_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify a password against its hash"""
-    return check_password_hash(password_hash, password) 
\ No newline at end of file
+    return pool_verify(password, password_hash)
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """Check whether a hash was made with a different method or cost than configured"""
+    # Werkzeug stores the method and cost in front of the salt, e.g. 'scrypt:32768:8:1$salt$hash'
+    return hash_method(password_hash.split('$', 1)[0]) != hash_method(current_app.config['PASSWORD_HASH_METHOD']) 
\ No newline at end of file
@@ -0,0 +1,294 @@
+from app.models import db, User
+from app.utils.matching import _popcount
+import re
+import threading
+import time
+import numpy as np
+
+# One bit per hour of the week: bit = day * 24 + hour, Monday = day 0 (in the user's local time)
+HOURS_PER_WEEK = 7 * 24
+MASK_BYTES = HOURS_PER_WEEK // 8
+MASK_WORDS = (HOURS_PER_WEEK + 63) // 64
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DAY_ALIASES = {
+    'mon': 0, 'tue': 1, 'tues': 1, 'wed': 2, 'thu': 3, 'thur': 3, 'thurs': 3,
+    'fri': 4, 'sat': 5, 'sun': 6, **{name: day for day, name in enumerate(DAY_NAMES)},
+}
+DAY_GROUPS = {
+    'weekday': range(0, 5),
+    'weeknight': range(0, 5),
+    'weekend': range(5, 7),
+    'daily': range(7),
+    'everyday': range(7),
+    'every day': range(7),
+}
+
+# Hours used when a phrase names days but no time, or a time of day but no hours
+DAYTIME = (8, 22)
+PERIODS = [
+    ('early morning', (5, 8)),
+    ('morning', (8, 12)),
+    ('lunch', (12, 14)),
+    ('afternoon', (12, 17)),
+    ('evening', (17, 22)),
+    ('night', (20, 24)),
+]
+ANYTIME_WORDS = ('flexible', 'anytime', 'any time', 'all day')
+
+DAY_RE = re.compile(r'\b(' + '|'.join(sorted(DAY_ALIASES, key=len, reverse=True)) + r')s?\b')
+DAY_RANGE_RE = re.compile(DAY_RE.pattern + r'\s*(?:-|–|to|through)\s*' + DAY_RE.pattern)
+TIME = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
+TIME_RANGE_RE = re.compile(TIME + r'\s*(?:-|–|to|until|till)\s*' + TIME)
+AFTER_RE = re.compile(r'\b(?:after|from)\s+' + TIME)
+BEFORE_RE = re.compile(r'\b(?:before|until|till)\s+' + TIME)
+SEGMENT_SPLIT_RE = re.compile(r'[,;&+]|\band\b|\bor\b|\bplus\b')
+
+
+def _hour(hour, meridiem):
+    hour = int(hour)
+    if meridiem == 'pm' and hour < 12:
+        return hour + 12
+    if meridiem == 'am' and hour == 12:
+        return 0
+    return hour
+
+
+def _days(segment):
+    """Days named in a phrase ("weekdays", "mon-fri", "saturday"), or None if there are none"""
+    days = set()
+    for match in DAY_RANGE_RE.finditer(segment):
+        start, end = DAY_ALIASES[match.group(1)], DAY_ALIASES[match.group(2)]
+        days.update(day % 7 for day in range(start, end + (7 if end < start else 0) + 1))
+    segment = DAY_RANGE_RE.sub(' ', segment)
+    for name, group in DAY_GROUPS.items():
+        if name in segment:
+            days.update(group)
+    days.update(DAY_ALIASES[match.group(1)] for match in DAY_RE.finditer(segment))
+    return days or None
+
+
+def _hours(segment):
+    """(start, end) hour ranges in a phrase ("6-9 PM", "after 7 PM", "mornings"), or None if there are none"""
+    ranges = []
+    for match in TIME_RANGE_RE.finditer(segment):
+        start_meridiem, end_meridiem = match.group(3), match.group(6)
+        start = _hour(match.group(1), start_meridiem or end_meridiem)
+        end = _hour(match.group(4), end_meridiem)
+        if not start_meridiem and end_meridiem == 'pm' and start > end:
+            start -= 12  # "11-1 PM" starts in the morning
+        ranges.append((start, end + (1 if match.group(5) and match.group(5) != '00' else 0)))
+    segment = TIME_RANGE_RE.sub(' ', segment)
+    for match in AFTER_RE.finditer(segment):
+        ranges.append((_hour(match.group(1), match.group(3)), DAYTIME[1]))
+    for match in BEFORE_RE.finditer(segment):
+        ranges.append((DAYTIME[0], _hour(match.group(1), match.group(3))))
+    if not ranges:
+        for name, hours in PERIODS:
+            if name in segment:
+                ranges.append(hours)
+                segment = segment.replace(name, ' ')
+    return [(start % 24, end) for start, end in ranges if 0 <= start <= 24 and 0 <= end <= 24] or None
+
+
+def _set_hours(mask, days, start, end):
+    # Ranges past midnight ("10 PM - 2 AM") continue into the next day
+    length = (end - start) % 24 or 24
+    for day in days:
+        for hour in range(start, start + length):
+            mask |= 1 << ((day * 24 + hour) % HOURS_PER_WEEK)
+    return mask
+
+
+def parse_availability(text) -> int:
+    """Weekly hour bitmask from free text like "Weekdays 6-9 PM, Weekends" (0 if nothing is recognized)"""
+    segments = [
+        (segment, _days(segment), _hours(segment))
+        for segment in SEGMENT_SPLIT_RE.split((text or '').lower().replace('.', ''))
+    ]
+    mask = 0
+    for i, (segment, days, hours) in enumerate(segments):
+        if days is None and hours is None:
+            if not any(word in segment for word in ANYTIME_WORDS):
+                continue
+        if days is not None and hours is None and i + 1 < len(segments):
+            # "Tuesday and Thursday 6-8 PM": a bare day list shares the hours of the days that follow
+            _, next_days, next_hours = segments[i + 1]
+            if next_days is not None:
+                hours = next_hours
+        for start, end in hours or [DAYTIME]:
+            mask = _set_hours(mask, days if days is not None else range(7), start, end)
+    return mask
+
+
+def slots_to_mask(slots) -> int:
+    """Weekly hour bitmask from [{"day": 0-6 or name, "start": 0-23, "end": 1-24}, ...]"""
+    if not isinstance(slots, list) or not all(isinstance(slot, dict) for slot in slots):
+        raise ValueError('availability_slots must be a list of {day, start, end} objects')
+    mask = 0
+    for slot in slots:
+        day = slot.get('day')
+        if isinstance(day, str):
+            day = DAY_ALIASES.get(day.strip().lower())
+        start, end = slot.get('start'), slot.get('end')
+        if not isinstance(day, int) or not 0 <= day < 7:
+            raise ValueError(f"Invalid slot day: {slot.get('day')!r}")
+        if not isinstance(start, int) or not isinstance(end, int) or not 0 <= start < end <= 24:
+            raise ValueError(f"Invalid slot hours: {start!r}-{end!r}")
+        mask = _set_hours(mask, [day], start, end)
+    return mask
+
+
+def mask_to_slots(mask: int) -> list:
+    """Merge set hours into [{"day", "start", "end"}] ranges, one list entry per day and range"""
+    slots = []
+    for day in range(7):
+        hour = 0
+        while hour < 24:
+            if mask >> (day * 24 + hour) & 1:
+                start = hour
+                while hour < 24 and mask >> (day * 24 + hour) & 1:
+                    hour += 1
+                slots.append({'day': day, 'start': start, 'end': hour})
+            hour += 1
+    return slots
+
+
+def mask_to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(MASK_BYTES, 'little')
+
+
+def mask_from_bytes(data) -> int:
+    return int.from_bytes(data, 'little') if data else 0
+
+
+def set_user_availability(user, availability=None, slots=None):
+    """Store availability text and its hour bitmask; explicit slots take precedence over parsing the text"""
+    if availability is not None:
+        user.availability = availability
+    mask = slots_to_mask(slots) if slots is not None else parse_availability(user.availability)
+    user.availability_mask = mask_to_bytes(mask)
+
+
+def backfill_user_availability():
+    """Parse the availability text of users that have no bitmask yet"""
+    users = User.query.filter(User.availability_mask.is_(None)).all()
+    for user in users:
+        set_user_availability(user)
+    if users:
+        db.session.commit()
+        print(f"🔧 Parsed availability for {len(users)} users")
+
+
+def _words(data) -> np.ndarray:
+    return np.frombuffer((data or b'').ljust(MASK_WORDS * 8, b'\0'), dtype='<u8')
+
+
+class AvailabilityIndex:
+    """Weekly hour bitmasks of every user as rows of a uint64 matrix.
+
+    Overlap with one user is an AND and a popcount over the whole matrix, so
+    thousands of candidates are scored in one vectorized pass. Kept current by
+    re-reading only users whose updated_at moved past the last seen value.
+    Deleted users and changes that don't move updated_at are dropped when the
+    index is rebuilt after max_age seconds; until then, matches() checks its
+    results against the users table.
+    """
+
+    def __init__(self, max_age: float = 600):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.built_at = None
+        self._reset()
+
+    def _reset(self):
+        self.user_ids = []       # row -> user id
+        self.rows = {}           # user id -> row
+        self.masks = np.zeros((0, MASK_WORDS), dtype=np.uint64)
+        self.eligible = np.zeros(0, dtype=bool)
+        self.watermark = None
+
+    def _ensure_capacity(self, rows):
+        capacity = self.masks.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 64)
+        masks = np.zeros((new_capacity, MASK_WORDS), dtype=np.uint64)
+        masks[:capacity] = self.masks
+        self.masks = masks
+        eligible = np.zeros(new_capacity, dtype=bool)
+        eligible[:capacity] = self.eligible
+        self.eligible = eligible
+
+    def _set_row(self, user):
+        row = self.rows.get(user.id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids.append(user.id)
+            self.rows[user.id] = row
+        self._ensure_capacity(row + 1)
+        self.masks[row] = _words(user.availability_mask)
+        self.eligible[row] = bool(user.is_public) and user.role != 'admin' and not user.is_banned
+
+    def refresh(self):
+        """Apply profile changes made since the last refresh (by any worker), or rebuild after max_age"""
+        rebuild = self.built_at is None or time.monotonic() - self.built_at > self.max_age
+        query = db.session.query(
+            User.id, User.availability_mask, User.is_public, User.role, User.is_banned, User.updated_at
+        )
+        if not rebuild and self.watermark is not None:
+            query = query.filter(User.updated_at >= self.watermark)
+        changed = query.all()
+        if not changed and not rebuild:
+            return
+        with self.lock:
+            if rebuild:
+                # Replaced in one step, so matches() never sees a half-loaded index
+                self._reset()
+                self.built_at = time.monotonic()
+            for user in changed:
+                self._set_row(user)
+                if user.updated_at and (self.watermark is None or user.updated_at > self.watermark):
+                    self.watermark = user.updated_at
+
+    def matches(self, user_id: str, limit: int = 20, min_hours: int = 1) -> list:
+        """Users whose weekly availability overlaps the given user's, most shared hours first.
+
+        Results are checked against the users table; users deleted, hidden or
+        banned since the last refresh are marked ineligible and replaced.
+        """
+        while True:
+            ranked = self._rank(user_id, limit, min_hours)
+            ranked_ids = [match['user_id'] for match in ranked]
+            listed = {listed_id for (listed_id,) in db.session.query(User.id).filter(
+                User.id.in_(ranked_ids), User.is_public.is_(True), User.role != 'admin', User.is_banned.isnot(True)
+            )} if ranked_ids else set()
+            stale = [ranked_id for ranked_id in ranked_ids if ranked_id not in listed]
+            if not stale:
+                return ranked
+            with self.lock:
+                for stale_id in stale:
+                    row = self.rows.get(stale_id)
+                    if row is not None:
+                        self.eligible[row] = False
+
+    def _rank(self, user_id: str, limit: int, min_hours: int) -> list:
+        with self.lock:
+            row = self.rows.get(user_id)
+            if row is None:
+                return []
+            n = len(self.user_ids)
+            overlap = _popcount(self.masks[:n] & self.masks[row]).sum(axis=1, dtype=np.int32)
+            candidates = self.eligible[:n] & (overlap >= max(min_hours, 1))
+            candidates[row] = False
+            overlap = np.where(candidates, overlap, -1)
+
+            limit = min(limit, int(candidates.sum()))
+            if limit <= 0:
+                return []
+            top = np.argpartition(-overlap, limit - 1)[:limit]
+            top = top[np.argsort(-overlap[top], kind='stable')]
+            return [{'user_id': self.user_ids[i], 'overlap_hours': int(overlap[i])} for i in top]
+
+
+availability_index = AvailabilityIndex()
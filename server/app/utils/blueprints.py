@@ -0,0 +1,46 @@
+import importlib
+import threading
+
+
+class LazyBlueprints:
+    """WSGI wrapper that imports the route modules and registers their blueprints on the first request.
+
+    Keeps create_app (and forking workers) from paying for the route modules'
+    imports (numpy, image and search helpers) until a request needs them.
+    """
+
+    def __init__(self, app, blueprints):
+        self.app = app
+        self.blueprints = blueprints
+        self.wsgi_app = app.wsgi_app
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            for module_name, attribute, url_prefix in self.blueprints:
+                blueprint = getattr(importlib.import_module(module_name), attribute)
+                self.app.register_blueprint(blueprint, url_prefix=url_prefix)
+            self.loaded = True
+
+    def __call__(self, environ, start_response):
+        if not self.loaded:
+            self.load()
+        return self.wsgi_app(environ, start_response)
+
+
+def init_blueprints(app, blueprints):
+    """Register (module, blueprint attribute, url_prefix) blueprints, on the first request if LAZY_BLUEPRINTS"""
+    loader = LazyBlueprints(app, blueprints)
+    app.extensions['lazy_blueprints'] = loader
+    if app.config['LAZY_BLUEPRINTS']:
+        app.wsgi_app = loader
+    else:
+        loader.load()
+
+
+def load_blueprints(app):
+    """Register the blueprints now (for tools that inspect app.url_map before any request)"""
+    app.extensions['lazy_blueprints'].load()
@@ -0,0 +1,333 @@
+from app.utils.fastjson import loads, dumps
+from collections import OrderedDict
+import pickle
+import threading
+import time
+import traceback
+import uuid
+
+# Every entry carries this tag, so clear() is a tag invalidation on every backend
+ALL = '*'
+
+
+class Cache:
+    """Common API of the cache backends.
+
+    Entries have a TTL (seconds, None for the backend default) and optional
+    tags; invalidate_tags() drops every entry written with one of the tags.
+    Subclasses implement get_entries, set_many, delete_many and invalidate_tags.
+    """
+
+    def get_entries(self, keys) -> dict:
+        """{key: (value, tags)} for the keys that are cached"""
+        raise NotImplementedError
+
+    def set_many(self, mapping: dict, ttl: float = None, tags=()):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags):
+        raise NotImplementedError
+
+    def get(self, key, default=None):
+        entry = self.get_entries([key]).get(key)
+        return entry[0] if entry else default
+
+    def get_many(self, keys) -> dict:
+        """{key: value} for the keys that are cached"""
+        return {key: value for key, (value, _) in self.get_entries(keys).items()}
+
+    def set(self, key, value, ttl: float = None, tags=()):
+        self.set_many({key: value}, ttl, tags)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def clear(self):
+        self.invalidate_tags(ALL)
+
+    def ping(self):
+        """Raise if the backend can't be reached"""
+
+
+class LocalCache(Cache):
+    """In-process LRU cache with per-entry TTL and a tag index"""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.tagged = {}              # tag -> {key, ...}
+        self.lock = threading.Lock()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            for tag in entry[2]:
+                keys = self.tagged.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.tagged[tag]
+
+    def get_entries(self, keys) -> dict:
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    self._remove(key)
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = (entry[1], entry[2])
+        return found
+
+    def set_many(self, mapping: dict, ttl: float = None, tags=()):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        tags = frozenset(tags) | {ALL}
+        with self.lock:
+            for key, value in mapping.items():
+                self._remove(key)
+                self.entries[key] = (expires_at, value, tags)
+                for tag in tags:
+                    self.tagged.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def invalidate_tags(self, *tags):
+        with self.lock:
+            if ALL in tags:
+                self.entries.clear()
+                self.tagged.clear()
+                return
+            for tag in tags:
+                for key in list(self.tagged.get(tag, ())):
+                    self._remove(key)
+
+
+class RedisCache(Cache):
+    """Cache shared by all workers through Redis (requires the redis package).
+
+    Tags are version counters: an entry stores the versions of its tags when
+    it was written and is stale once any of them has been incremented, so
+    invalidating a tag is one INCR however many entries carry it.
+    """
+
+    def __init__(self, url: str, prefix: str = 'skillswap:', default_ttl: float = 300):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.channel = f'{prefix}invalidate'
+
+    def _key(self, key) -> str:
+        return f'{self.prefix}k:{key}'
+
+    def _tag_key(self, tag) -> str:
+        return f'{self.prefix}t:{tag}'
+
+    def _tag_versions(self, tags) -> dict:
+        tags = list(tags)
+        if not tags:
+            return {}
+        versions = self.client.mget([self._tag_key(tag) for tag in tags])
+        return {tag: int(version or 0) for tag, version in zip(tags, versions)}
+
+    def get_entries(self, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        payloads = self.client.mget([self._key(key) for key in keys])
+        entries = {key: pickle.loads(payload) for key, payload in zip(keys, payloads) if payload is not None}
+        current = self._tag_versions({tag for _, versions in entries.values() for tag in versions})
+        return {
+            key: (value, frozenset(versions))
+            for key, (value, versions) in entries.items()
+            if all(current[tag] == version for tag, version in versions.items())
+        }
+
+    def set_many(self, mapping: dict, ttl: float = None, tags=()):
+        if not mapping:
+            return
+        # Read before writing: an invalidation in between leaves the entry already stale
+        versions = self._tag_versions(set(tags) | {ALL})
+        ttl_ms = max(int((self.default_ttl if ttl is None else ttl) * 1000), 1)
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(self._key(key), pickle.dumps((value, versions), pickle.HIGHEST_PROTOCOL), px=ttl_ms)
+        pipe.execute()
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            self.client.delete(*[self._key(key) for key in keys])
+
+    def invalidate_tags(self, *tags):
+        if tags:
+            pipe = self.client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(self._tag_key(tag))
+            pipe.execute()
+
+    def ping(self):
+        self.client.ping()
+
+    def publish(self, message: dict):
+        self.client.publish(self.channel, dumps(message))
+
+    def subscribe(self, callback, on_reconnect=None):
+        """Call callback(message) for every message published on the invalidation channel (daemon thread)"""
+        def listen():
+            while True:
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            callback(loads(message['data']))
+                except Exception:
+                    print("❌ Cache invalidation subscriber error, reconnecting")
+                    traceback.print_exc()
+                    # Messages may have been missed while disconnected
+                    if on_reconnect:
+                        on_reconnect()
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name='cache-invalidation', daemon=True).start()
+
+
+class TieredCache(Cache):
+    """A local L1 in front of a shared L2, kept coherent across processes through pub/sub.
+
+    Writes go to both tiers and announce the changed keys or tags; other
+    processes drop them from their L1. L1 entries also expire after l1_ttl,
+    which bounds staleness if an announcement is missed.
+    """
+
+    def __init__(self, local: LocalCache, shared: RedisCache, l1_ttl: float = 5):
+        self.local = local
+        self.shared = shared
+        self.l1_ttl = l1_ttl
+        self.node = uuid.uuid4().hex
+        shared.subscribe(self._on_message, on_reconnect=local.clear)
+
+    def _on_message(self, message: dict):
+        if message.get('node') == self.node:
+            return
+        if message.get('keys'):
+            self.local.delete_many(message['keys'])
+        if message.get('tags'):
+            self.local.invalidate_tags(*message['tags'])
+
+    def _l1_ttl(self, ttl):
+        return self.l1_ttl if ttl is None else min(ttl, self.l1_ttl)
+
+    def get_entries(self, keys) -> dict:
+        keys = list(keys)
+        found = self.local.get_entries(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.shared.get_entries(missing)
+            for key, (value, tags) in fetched.items():
+                self.local.set(key, value, self.l1_ttl, tags)
+            found.update(fetched)
+        return found
+
+    def set_many(self, mapping: dict, ttl: float = None, tags=()):
+        self.shared.set_many(mapping, ttl, tags)
+        self.local.set_many(mapping, self._l1_ttl(ttl), tags)
+        self.shared.publish({'node': self.node, 'keys': list(mapping)})
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        self.shared.delete_many(keys)
+        self.local.delete_many(keys)
+        self.shared.publish({'node': self.node, 'keys': keys})
+
+    def invalidate_tags(self, *tags):
+        self.shared.invalidate_tags(*tags)
+        self.local.invalidate_tags(*tags)
+        self.shared.publish({'node': self.node, 'tags': list(tags)})
+
+    def ping(self):
+        self.shared.ping()
+
+
+class CacheProxy(Cache):
+    """Module-level handle on the configured backend, so callers can import it before the app exists.
+
+    Counts hits and misses per namespace (the key up to its last ':') in this process.
+    """
+
+    def __init__(self, backend: Cache):
+        self.backend = backend
+        self.counts = {}  # namespace -> [hits, misses]
+        self.lock = threading.Lock()
+
+    def get_entries(self, keys) -> dict:
+        keys = list(keys)
+        found = self.backend.get_entries(keys)
+        with self.lock:
+            for key in keys:
+                counts = self.counts.setdefault(str(key).rpartition(':')[0] or str(key), [0, 0])
+                counts[0 if key in found else 1] += 1
+        return found
+
+    def set_many(self, mapping: dict, ttl: float = None, tags=()):
+        self.backend.set_many(mapping, ttl, tags)
+
+    def delete_many(self, keys):
+        self.backend.delete_many(keys)
+
+    def invalidate_tags(self, *tags):
+        self.backend.invalidate_tags(*tags)
+
+    def ping(self):
+        self.backend.ping()
+
+    def stats(self) -> dict:
+        """Hits, misses and hit rate since startup, overall and per namespace"""
+        with self.lock:
+            counts = {namespace: tuple(values) for namespace, values in self.counts.items()}
+
+        def summary(hits, misses):
+            lookups = hits + misses
+            return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / lookups, 3) if lookups else None}
+
+        return {
+            'backend': type(self.backend).__name__,
+            **summary(sum(hits for hits, _ in counts.values()), sum(misses for _, misses in counts.values())),
+            'namespaces': {namespace: summary(*values) for namespace, values in sorted(counts.items())},
+        }
+
+
+cache = CacheProxy(LocalCache())
+
+
+def create_cache(config) -> Cache:
+    """Build the backend selected by CACHE_BACKEND ('local', 'redis' or 'tiered')"""
+    backend = config['CACHE_BACKEND']
+    local = LocalCache(config['CACHE_LOCAL_MAX_ENTRIES'], config['CACHE_DEFAULT_TTL'])
+    if backend == 'local':
+        return local
+    shared = RedisCache(config['CACHE_URL'], config['CACHE_KEY_PREFIX'], config['CACHE_DEFAULT_TTL'])
+    if backend == 'redis':
+        return shared
+    if backend == 'tiered':
+        return TieredCache(local, shared, config['CACHE_L1_TTL'])
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+
+def init_cache(app):
+    """Point the shared cache handle at the backend configured for this app"""
+    cache.backend = create_cache(app.config)
@@ -0,0 +1,100 @@
+from flask import request
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_encodings() -> list:
+    """Encodings this server can produce, in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def choose_encoding(accept_encoding, enabled) -> str:
+    """Pick the best encoding the client accepts, or None"""
+    for encoding in enabled:
+        if accept_encoding.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete body"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level)
+
+
+def compress_stream(chunks, encoding: str, level: int):
+    """Compress a streamed body chunk by chunk, flushing after each one so clients see data early"""
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    elif encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def init_compression(app):
+    """Compress eligible responses according to the client's Accept-Encoding"""
+    enabled = [encoding for encoding in available_encodings() if encoding in app.config['COMPRESS_ENCODINGS']]
+    levels = app.config['COMPRESS_LEVELS']
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    mimetypes = app.config['COMPRESS_MIMETYPES']
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough  # files from send_file, e.g. uploads
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings, enabled)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, levels[encoding])
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress(data, encoding, levels[encoding]))
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
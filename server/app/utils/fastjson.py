@@ -0,0 +1,61 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Encode datetimes as ISO 8601 (like orjson does) and defer everything else to Flask"""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+def loads(s):
+    """Parse JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def dumps(obj, sort_keys=False, indent=False) -> bytes:
+    """Serialize to UTF-8 JSON bytes with orjson when available"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    separators = None if indent else (',', ':')
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, indent=2 if indent else None,
+                      separators=separators, ensure_ascii=False).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib json module"""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs:
+            return dumps(obj, sort_keys=self.sort_keys).decode()
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys, indent=indent) + b'\n',
+                                       mimetype=self.mimetype)
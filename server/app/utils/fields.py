@@ -0,0 +1,96 @@
+from flask import request
+from app.models import db, User, SwapRequest, ChatRoom, Message
+
+# Resource types that can be named in fields[type]=, and their models
+TYPES = {
+    'users': User,
+    'requests': SwapRequest,
+    'chat_rooms': ChatRoom,
+    'messages': Message,
+}
+
+
+class FieldError(ValueError):
+    """Raised for an unknown resource type or field in a fields parameter"""
+
+
+class Fields:
+    """Sparse fieldsets: the to_dict fields requested per resource type.
+
+    Types that weren't mentioned get every field, so Fields() selects everything.
+    """
+
+    def __init__(self, selected: dict = None):
+        self.selected = selected or {}
+
+    def of(self, kind: str):
+        """The selected field names for a type, or None for all of them"""
+        return self.selected.get(kind)
+
+    def wants(self, kind: str, name: str) -> bool:
+        names = self.selected.get(kind)
+        return names is None or name in names
+
+    def key(self) -> tuple:
+        """Stable representation, for ETags and cache keys"""
+        return tuple(sorted((kind, tuple(sorted(names))) for kind, names in self.selected.items()))
+
+
+def parse_fields(primary: str) -> Fields:
+    """Read fields= (for the endpoint's primary type) and fields[type]= from the query string"""
+    selected = {}
+    for param, value in request.args.items(multi=True):
+        if param == 'fields':
+            kind = primary
+        elif param.startswith('fields[') and param.endswith(']'):
+            kind = param[len('fields['):-1]
+        else:
+            continue
+        if kind not in TYPES:
+            raise FieldError(f'Unknown resource type in {param}')
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        if not names:
+            continue
+        unknown = names - TYPES[kind].FIELDS.keys()
+        if unknown:
+            raise FieldError(f'Unknown {kind} fields: {", ".join(sorted(unknown))}')
+        selected[kind] = selected.get(kind, frozenset()) | names
+    return Fields(selected)
+
+
+def pick(fields, kind: str, getters: dict) -> dict:
+    """Build a to_dict result, calling only the getters of the selected fields"""
+    names = fields.of(kind) if fields else None
+    return {name: get() for name, get in getters.items() if names is None or name in names}
+
+
+def select(fields, kind: str, data: dict) -> dict:
+    """Restrict an already built dict to the selected fields"""
+    names = fields.of(kind) if fields else None
+    return data if names is None else {name: value for name, value in data.items() if name in names}
+
+
+def _columns(fields, kind: str, always=()) -> list:
+    """Model attributes read by the selected fields of a type, or None when every field is selected"""
+    names = fields.of(kind) if fields else None
+    if names is None:
+        return None
+    model = TYPES[kind]
+    columns = {column for name in names for column in model.FIELDS[name]} | set(always)
+    return [getattr(model, column) for column in sorted(columns)]
+
+
+def load_only(fields, kind: str, *always) -> list:
+    """Query options that SELECT only the columns the selected fields read, plus always"""
+    columns = _columns(fields, kind, always)
+    return [db.load_only(*columns)] if columns is not None else []
+
+
+def load_related(fields, relationship, kind: str) -> list:
+    """Eager-load a relationship of kind resources if its field is selected, with only the columns it needs"""
+    owner = next(name for name, model in TYPES.items() if model is relationship.class_)
+    if fields and not fields.wants(owner, relationship.key):
+        return []
+    columns = _columns(fields, kind)
+    loader = db.joinedload(relationship)
+    return [loader.load_only(*columns) if columns is not None else loader]
@@ -0,0 +1,179 @@
+from app.models import db, User
+import csv
+import math
+import os
+import threading
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv')
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+MAX_COVER_CELLS = 16
+
+
+def normalize_place(text: str) -> str:
+    """Lookup key for place names: lowercase, single-spaced, without dots"""
+    return ' '.join(text.replace('.', '').split()).lower()
+
+
+class Gazetteer:
+    """Offline place-name lookup loaded from the bundled CSV on first use.
+
+    Locations are free text such as "Lucknow, UP". The first part is looked up
+    as a city name (or alias); any further parts pick between cities sharing a
+    name by matching their region, region code, country or country code.
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.places = None   # normalized name/alias -> [place, ...] in file order (largest first)
+
+    def _load(self):
+        places = {}
+        with open(self.path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                place = {
+                    'name': row['name'],
+                    'lat': float(row['lat']),
+                    'lon': float(row['lon']),
+                    'qualifiers': {normalize_place(row[field]) for field in ('region', 'region_code', 'country', 'country_code')},
+                }
+                names = [row['name']] + [alias for alias in row['aliases'].split('|') if alias]
+                for name in names:
+                    places.setdefault(normalize_place(name), []).append(place)
+        return places
+
+    def geocode(self, text):
+        """(lat, lon) for a free-text location, or None if the place is unknown"""
+        if not text:
+            return None
+        if self.places is None:
+            with self.lock:
+                if self.places is None:
+                    self.places = self._load()
+        parts = [normalize_place(part) for part in text.split(',')]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+        candidates = self.places.get(parts[0]) or self.places.get(' '.join(parts))
+        if not candidates:
+            return None
+        qualifiers = set(parts[1:])
+        place = next((place for place in candidates if qualifiers & place['qualifiers']), candidates[0])
+        return place['lat'], place['lon']
+
+
+gazetteer = Gazetteer()
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        coordinate, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            bounds[0] = middle
+        else:
+            value = value * 2
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision: int):
+    """(height, width) in degrees of a geohash cell of the given length"""
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lon_bits = total_bits - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) around a circle; longitudes may pass ±180"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, lat - lat_delta), min(90.0, lat + lat_delta)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    if lon_delta >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lon - lon_delta, lon + lon_delta
+
+
+def geohash_cover(lat, lon, radius_km) -> list:
+    """Geohash prefixes whose cells together cover the circle, at the finest precision needing few cells"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        lat_cells, lon_cells = round(180.0 / height), round(360.0 / width)
+        first_row = math.floor((min_lat + 90.0) / height)
+        last_row = min(math.floor((max_lat + 90.0) / height), lat_cells - 1)
+        first_col = math.floor((min_lon + 180.0) / width)
+        last_col = min(math.floor((max_lon + 180.0) / width), first_col + lon_cells - 1)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) <= MAX_COVER_CELLS:
+            break
+    return sorted({
+        geohash_encode(-90.0 + (row + 0.5) * height, -180.0 + ((col % lon_cells) + 0.5) * width, precision)
+        for row in range(first_row, last_row + 1)
+        for col in range(first_col, last_col + 1)
+    })
+
+
+def near_filter(lat, lon, radius_km):
+    """SQL filter selecting users inside the circle's covering geohash cells (an index range scan per cell)"""
+    return db.or_(*[
+        db.and_(User.geohash >= prefix, User.geohash < prefix + '~')
+        for prefix in geohash_cover(lat, lon, radius_km)
+    ])
+
+
+def parse_near(value):
+    """Center point from a "lat,lon" pair or a place name, or None if it can't be resolved"""
+    parts = value.split(',')
+    if len(parts) == 2:
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+        else:
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return lat, lon
+            return None
+    return gazetteer.geocode(value)
+
+
+def set_user_location(user, location):
+    """Store the location text along with its geocoded point (cleared when the place is unknown)"""
+    user.location = location
+    point = gazetteer.geocode(location)
+    user.latitude, user.longitude = point if point else (None, None)
+    user.geohash = geohash_encode(*point) if point else None
+
+
+def backfill_user_locations():
+    """Geocode users with a location that has not been geocoded yet"""
+    users = User.query.filter(User.geohash.is_(None), User.location.isnot(None), User.location != '').all()
+    located = 0
+    for user in users:
+        set_user_location(user, user.location)
+        located += user.geohash is not None
+    if located:
+        db.session.commit()
+        print(f"🔧 Geocoded locations for {located} users")
+    else:
+        db.session.rollback()
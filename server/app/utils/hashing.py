@@ -0,0 +1,87 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many hash jobs are already queued, or one isn't done in time"""
+
+# Parameters werkzeug fills in when a method names only the algorithm (e.g. 'scrypt')
+METHOD_DEFAULTS = {
+    'scrypt': ['32768', '8', '1'],
+    'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+}
+
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_pool():
+    """Return this process's hashing pool, creating it on first use (and after fork)"""
+    global _pool, _pool_pid, _slots
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config['PASSWORD_HASH_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_QUEUE_LIMIT'])
+    return _pool
+
+
+def _run(fn, *args):
+    """Run fn in the hashing pool, failing fast if the queue is full"""
+    if current_app.config['PASSWORD_HASH_WORKERS'] <= 0:
+        return fn(*args)
+
+    pool = _get_pool()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise HashingPoolSaturated('Password hashing queue is full')
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeoutError as e:
+        # The job keeps its slot until it finishes, so the queue limit still holds
+        raise HashingPoolSaturated('Password hashing timed out') from e
+
+
+def hash_method(method: str) -> tuple:
+    """A werkzeug hashing method with its defaults filled in, e.g. 'scrypt' -> ('scrypt', '32768', '8', '1')"""
+    name, *params = method.split(':')
+    defaults = METHOD_DEFAULTS.get(name, [])
+    return (name, *params, *defaults[len(params):])
+
+
+def pool_hash(password: str, method: str) -> str:
+    """Hash a password off the request thread"""
+    return _run(generate_password_hash, password, method)
+
+
+def pool_verify(password: str, password_hash: str) -> bool:
+    """Verify a password off the request thread"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def shutdown_pool():
+    """Stop the hashing pool (used on shutdown and in scripts)"""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
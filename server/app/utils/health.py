@@ -0,0 +1,169 @@
+from flask import current_app
+from app.models import db, User, Job, OutboxEvent
+from app.utils.cache import cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import threading
+import time
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def pool_status() -> dict:
+    """Connection pool size and checked-in/out counts (whatever the pool class reports)"""
+    pool = db.engine.pool
+    status = {'class': type(pool).__name__}
+    for name, method in (('size', 'size'), ('checked_in', 'checkedin'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        if callable(getattr(pool, method, None)):
+            status[name] = getattr(pool, method)()
+    max_overflow = getattr(pool, '_max_overflow', None)
+    if 'size' in status and max_overflow is not None and max_overflow >= 0:
+        status['capacity'] = status['size'] + max_overflow
+    return status
+
+
+def _pool_exhausted(status: dict) -> bool:
+    return 'capacity' in status and status.get('checked_out', 0) >= status['capacity']
+
+
+@contextmanager
+def _bounded_connection(budget: float):
+    """A pooled connection whose lock waits give up after the budget (SQLite's busy timeout)"""
+    if _pool_exhausted(pool_status()):
+        # Checking out would wait for the pool timeout instead of failing within the budget
+        raise RuntimeError('Connection pool exhausted')
+    with db.engine.connect() as conn:
+        if conn.dialect.name != 'sqlite':
+            yield conn
+            return
+        previous = conn.exec_driver_sql('PRAGMA busy_timeout').scalar()
+        conn.exec_driver_sql(f'PRAGMA busy_timeout = {max(int(budget * 1000), 1)}')
+        try:
+            yield conn
+        finally:
+            conn.exec_driver_sql(f'PRAGMA busy_timeout = {previous}')
+
+
+def check_database(budget: float) -> dict:
+    """Read a row from users; fails if the database is locked for longer than the budget"""
+    with _bounded_connection(budget) as conn:
+        conn.execute(db.select(User.id).limit(1)).first()
+    return {}
+
+
+def check_pool(budget: float) -> dict:
+    status = pool_status()
+    if _pool_exhausted(status):
+        status['status'] = 'degraded'
+    return status
+
+
+def check_queues(budget: float) -> dict:
+    """Due jobs per queue and pending outbox events, with the wait of the oldest"""
+    now = datetime.utcnow()
+    max_wait = current_app.config['HEALTH_QUEUE_MAX_WAIT']
+    with _bounded_connection(budget) as conn:
+        jobs = conn.execute(
+            db.select(Job.queue, db.func.count(), db.func.min(Job.run_at))
+            .where(Job.status == 'queued', Job.run_at <= now).group_by(Job.queue)
+        ).all()
+        outbox_depth, outbox_oldest = conn.execute(
+            db.select(db.func.count(), db.func.min(OutboxEvent.created_at)).where(
+                OutboxEvent.processed_at.is_(None),
+                OutboxEvent.attempts < current_app.config['OUTBOX_MAX_ATTEMPTS'],
+                db.or_(OutboxEvent.locked_until.is_(None), OutboxEvent.locked_until < now),
+            )
+        ).one()
+
+    def wait_seconds(oldest):
+        return round((now - oldest).total_seconds(), 3) if oldest else 0.0
+
+    queues = {queue: {'depth': 0, 'oldest_wait_seconds': 0.0} for queue in current_app.config['JOB_QUEUES']}
+    for queue, depth, oldest in jobs:
+        queues[queue] = {'depth': depth, 'oldest_wait_seconds': wait_seconds(oldest)}
+    queues['outbox'] = {'depth': outbox_depth, 'oldest_wait_seconds': wait_seconds(outbox_oldest)}
+    result = {'queues': queues}
+    if any(queue['oldest_wait_seconds'] > max_wait for queue in queues.values()):
+        result['status'] = 'degraded'
+    return result
+
+
+def check_cache(budget: float) -> dict:
+    """Round trip to the cache backend, with this process's hit rates"""
+    cache.ping()
+    return cache.stats()
+
+
+CHECKS = {
+    'database': check_database,
+    'pool': check_pool,
+    'queues': check_queues,
+    'cache': check_cache,
+}
+
+
+def _get_executor():
+    """Return this process's probe threads, creating them on first use (and after fork)"""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=len(CHECKS), thread_name_prefix='health')
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def _run_check(app, check, budget: float) -> dict:
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            result = check(budget)
+        result.setdefault('status', 'ok')
+    except Exception as e:
+        result = {'status': 'error', 'error': str(e)}
+    elapsed = time.perf_counter() - started
+    if result['status'] == 'ok' and elapsed > budget:
+        result['status'] = 'timeout'
+    result['latency_ms'] = round(elapsed * 1000, 2)
+    return result
+
+
+def readiness() -> dict:
+    """Run the checks concurrently, each within its budget from HEALTH_CHECK_BUDGETS.
+
+    Stops at the first failed check listed in HEALTH_REQUIRED_CHECKS; checks
+    still running then are reported as 'skipped'.
+    """
+    app = current_app._get_current_object()
+    budgets = app.config['HEALTH_CHECK_BUDGETS']
+    required = app.config['HEALTH_REQUIRED_CHECKS']
+    started = time.perf_counter()
+    executor = _get_executor()
+    futures = {executor.submit(_run_check, app, CHECKS[name], budget): name for name, budget in budgets.items()}
+    deadlines = {future: started + budgets[name] for future, name in futures.items()}
+
+    checks = {}
+    ready = True
+    pending = set(futures)
+    while pending and ready:
+        done, pending = wait(pending, timeout=max(min(deadlines[f] for f in pending) - time.perf_counter(), 0),
+                             return_when=FIRST_COMPLETED)
+        for future in done:
+            checks[futures[future]] = future.result()
+        now = time.perf_counter()
+        for future in [f for f in pending if deadlines[f] <= now]:
+            pending.discard(future)
+            # The thread finishes on its own; its result is dropped
+            checks[futures[future]] = {'status': 'timeout', 'latency_ms': round(budgets[futures[future]] * 1000, 2)}
+        ready = all(checks[name]['status'] == 'ok' for name in required if name in checks)
+    for future in pending:
+        checks[futures[future]] = {'status': 'skipped'}
+
+    return {
+        'status': 'ready' if ready else 'unavailable',
+        'checks': {name: checks[name] for name in budgets},
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
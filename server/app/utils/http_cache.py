@@ -0,0 +1,56 @@
+from flask import request, current_app
+from app.utils.cache import cache
+from app.utils.outbox import handler
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """Build an ETag from version markers such as ids, counts and updated_at values"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def with_etag(response, etag: str):
+    """Attach an ETag and ask clients to revalidate before reusing the response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Authorization')
+    return response
+
+
+def not_modified(etag: str):
+    """Return a 304 response if the client already has this version, otherwise None"""
+    # Weak comparison, compressed responses carry a weak version of the same ETag
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(current_app.response_class(status=304), etag)
+    return None
+
+
+class ResponseCache:
+    """Serialized responses kept in the configured cache under a namespace, with a fixed TTL"""
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key) -> str:
+        return f'{self.namespace}:{hashlib.sha1(repr(key).encode()).hexdigest()}'
+
+    def get(self, key):
+        """Return (etag, body) if cached and fresh"""
+        return cache.get(self._key(key))
+
+    def set(self, key, etag: str, body: bytes):
+        cache.set(self._key(key), (etag, body), self.ttl, tags=(self.namespace,))
+
+    def clear(self):
+        cache.invalidate_tags(self.namespace)
+
+
+# Anonymous GET /api/users pages, cleared whenever a profile changes
+listing_cache = ResponseCache('users:listing', ttl=10)
+
+
+@handler('users.listing_changed')
+def clear_listing_cache(payload):
+    # Its own event, so the cache is cleared after the change that emitted it is committed
+    listing_cache.clear()
@@ -0,0 +1,128 @@
+from app.models import db, User, SwapRequest, ChatRoom, Message, ChatRead
+from app.utils.uploads import photo_urls
+from datetime import datetime
+import base64
+
+
+def encode_cursor(last_activity_at, room_id) -> str:
+    """Opaque keyset cursor for the room after which the next page starts"""
+    return base64.urlsafe_b64encode(f'{last_activity_at.isoformat()}|{room_id}'.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """(last_activity_at, room_id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        activity, room_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(activity), room_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def after_message(created_at, message_id, read_at, read_message_id):
+    """SQL condition: the message at (created_at, id) comes after the read marker"""
+    return db.or_(
+        read_at.is_(None),
+        created_at > read_at,
+        db.and_(created_at == read_at, message_id > read_message_id),
+    )
+
+
+def inbox_page(user_id: str, limit: int = 20, cursor: str = None):
+    """One page of a user's chat rooms, latest activity first, as (rooms, next_cursor).
+
+    Each room comes with its counterpart, request summary, last message and
+    unread count from a single query; unread counts are a correlated count
+    over the (chat_room_id, created_at) index past the user's read marker.
+    """
+    other = db.aliased(User)
+    last = db.aliased(Message)
+    read = db.aliased(ChatRead)
+    other_id = db.case((ChatRoom.user1_id == user_id, ChatRoom.user2_id), else_=ChatRoom.user1_id)
+    unread = db.select(db.func.count(Message.id)).where(
+        Message.chat_room_id == ChatRoom.id,
+        Message.sender_id != user_id,
+        after_message(Message.created_at, Message.id, read.last_read_at, read.last_read_message_id),
+    ).correlate(ChatRoom, read).scalar_subquery()
+
+    query = db.session.query(
+        ChatRoom.id, ChatRoom.request_id, ChatRoom.created_at, ChatRoom.last_activity_at,
+        other.id.label('other_id'), other.name.label('other_name'), other.photo_url.label('other_photo_url'),
+        SwapRequest.skill_offered, SwapRequest.skill_wanted, SwapRequest.status,
+        last.id.label('last_id'), last.sender_id.label('last_sender_id'), last.text.label('last_text'),
+        last.created_at.label('last_created_at'),
+        read.last_read_message_id,
+        unread.label('unread_count'),
+    ).join(other, other.id == other_id
+    ).outerjoin(SwapRequest, SwapRequest.id == ChatRoom.request_id
+    ).outerjoin(last, last.id == ChatRoom.last_message_id
+    ).outerjoin(read, db.and_(read.chat_room_id == ChatRoom.id, read.user_id == user_id)
+    ).filter(db.or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id))
+
+    if cursor:
+        activity, room_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            ChatRoom.last_activity_at < activity,
+            db.and_(ChatRoom.last_activity_at == activity, ChatRoom.id < room_id),
+        ))
+
+    rows = query.order_by(ChatRoom.last_activity_at.desc(), ChatRoom.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].last_activity_at, rows[limit - 1].id) if len(rows) > limit else None
+
+    rooms = [{
+        'id': row.id,
+        'request_id': row.request_id,
+        'created_at': row.created_at,
+        'last_activity_at': row.last_activity_at,
+        'counterpart': {'id': row.other_id, 'name': row.other_name, **photo_urls(row.other_photo_url)},
+        'swap_request': {
+            'skill_offered': row.skill_offered,
+            'skill_wanted': row.skill_wanted,
+            'status': row.status
+        },
+        'last_message': {
+            'id': row.last_id,
+            'sender_id': row.last_sender_id,
+            'text': row.last_text,
+            'created_at': row.last_created_at
+        } if row.last_id else None,
+        'last_read_message_id': row.last_read_message_id,
+        'unread_count': row.unread_count
+    } for row in rows[:limit]]
+    return rooms, next_cursor
+
+
+def mark_read(user_id: str, message):
+    """Move the user's read marker for the message's room forward to the message (never backwards)"""
+    marker = ChatRead.query.get((user_id, message.chat_room_id))
+    if marker is None:
+        marker = ChatRead(user_id=user_id, chat_room_id=message.chat_room_id)
+        db.session.add(marker)
+    elif (marker.last_read_at, marker.last_read_message_id) >= (message.created_at, message.id):
+        return marker
+    marker.last_read_message_id = message.id
+    marker.last_read_at = message.created_at
+    return marker
+
+
+def record_message(chat_room, message):
+    """Update the room's denormalized last message and mark it read for the sender"""
+    chat_room.last_message_id = message.id
+    chat_room.last_activity_at = message.created_at
+    mark_read(message.sender_id, message)
+
+
+def backfill_room_activity():
+    """Fill last_message_id/last_activity_at for rooms created before they were tracked"""
+    latest = db.select(Message.id).where(Message.chat_room_id == ChatRoom.id).order_by(
+        Message.created_at.desc(), Message.id.desc()
+    ).limit(1).scalar_subquery()
+    latest_at = db.select(db.func.max(Message.created_at)).where(Message.chat_room_id == ChatRoom.id).scalar_subquery()
+    result = db.session.execute(
+        db.update(ChatRoom).where(ChatRoom.last_activity_at.is_(None)).values(
+            last_message_id=latest,
+            last_activity_at=db.func.coalesce(latest_at, ChatRoom.created_at),
+        )
+    )
+    db.session.commit()
+    if result.rowcount:
+        print(f"🔧 Backfilled last activity for {result.rowcount} chat rooms")
@@ -0,0 +1,275 @@
+from flask import current_app
+from app.models import db, Job
+from app.utils.fastjson import loads, dumps
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import os
+import threading
+import time
+import traceback
+
+_tasks = {}      # task name -> (function, queue, max_attempts)
+_wakeups = {}    # queue -> threading.Event set when jobs are committed to it
+_runner_pid = None
+_scheduled = {}  # periodic task name -> interval number this process last scheduled
+
+
+def task(name: str, queue: str = 'default', max_attempts: int = 3):
+    """Register a function as a background task; it is called with the job payload as keyword arguments"""
+    def decorator(fn):
+        _tasks[name] = (fn, queue, max_attempts)
+        return fn
+    return decorator
+
+
+def _wakeup(queue: str) -> threading.Event:
+    return _wakeups.setdefault(queue, threading.Event())
+
+
+def enqueue(name: str, delay: float = 0, unique_key: str = None, **payload) -> Job:
+    """Add a job to the current transaction; it becomes visible to workers on commit"""
+    fn, queue, max_attempts = _tasks[name]
+    job = Job(
+        queue=queue,
+        name=name,
+        payload=dumps(payload).decode(),
+        unique_key=unique_key,
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    db.session.info.setdefault('jobs_enqueued', set()).add(queue)
+    return job
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers(session):
+    for queue in session.info.pop('jobs_enqueued', ()):
+        _wakeup(queue).set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_jobs(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+def _runnable(queue: str, now: datetime):
+    # Queued and due, or running on a worker whose lease ran out (it crashed or hung)
+    return db.and_(Job.queue == queue, db.or_(
+        db.and_(Job.status == 'queued', Job.run_at <= now),
+        db.and_(Job.status == 'running', Job.locked_until < now),
+    ))
+
+
+def claim(queue: str):
+    """Reserve the next due job of a queue for this worker; returns its id or None"""
+    now = datetime.utcnow()
+    while True:
+        job_id = db.session.query(Job.id).filter(_runnable(queue, now)).order_by(Job.run_at, Job.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            db.update(Job).where(Job.id == job_id, _runnable(queue, now)).values(
+                status='running',
+                attempts=Job.attempts + 1,
+                started_at=now,
+                locked_until=now + timedelta(seconds=current_app.config['JOB_LEASE'])
+            )
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+
+
+class _Heartbeat:
+    """Extends a running job's lease every third of JOB_LEASE until stopped.
+
+    A claim is identified by the job's attempt number, which every claim
+    increments; the lease is only extended while that claim still holds it.
+    """
+
+    def __init__(self, app, job_id: int, attempt: int):
+        self.app = app
+        self.job_id = job_id
+        self.attempt = attempt
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'jobs-heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        lease = self.app.config['JOB_LEASE']
+        while not self.stopped.wait(lease / 3):
+            try:
+                with self.app.app_context(), db.engine.begin() as conn:
+                    extended = conn.execute(
+                        db.update(Job).where(_held(self.job_id, self.attempt)).values(
+                            locked_until=datetime.utcnow() + timedelta(seconds=lease)
+                        )
+                    ).rowcount
+                if not extended:
+                    self.lost = True
+                    return
+            except Exception:
+                print(f"⚠️  Could not extend the lease of job {self.job_id}")
+                traceback.print_exc()
+
+
+def _held(job_id: int, attempt: int):
+    # The job is still running under the claim that made this attempt
+    return db.and_(Job.id == job_id, Job.attempts == attempt, Job.status == 'running')
+
+
+def run_job(job_id: int):
+    """Run a claimed job and record the outcome, scheduling a retry with backoff on failure.
+
+    The lease is extended while the task runs. If another worker took the job
+    over anyway (this one stalled past its lease), the outcome is dropped.
+    """
+    job = db.session.get(Job, job_id)
+    name, attempt, max_attempts = job.name, job.attempts, job.max_attempts
+    outcome = {'status': 'done', 'last_error': None}
+    with _Heartbeat(current_app._get_current_object(), job_id, attempt):
+        try:
+            fn, _, _ = _tasks[name]
+            fn(**loads(job.payload))
+        except Exception as e:
+            db.session.rollback()
+            outcome['last_error'] = str(e) or type(e).__name__
+            if attempt >= max_attempts:
+                outcome['status'] = 'failed'
+                print(f"❌ Job {job_id} ({name}) failed after {attempt} attempts: {e}")
+            else:
+                backoff = min(current_app.config['JOB_RETRY_BACKOFF'] * 2 ** (attempt - 1), 3600)
+                outcome.update(status='queued', run_at=datetime.utcnow() + timedelta(seconds=backoff))
+                print(f"⚠️  Job {job_id} ({name}) failed, retrying in {backoff}s: {e}")
+    # Written with whatever the task left uncommitted, and only if this claim still holds the job
+    recorded = db.session.execute(
+        db.update(Job).where(_held(job_id, attempt)).values(
+            finished_at=datetime.utcnow(), locked_until=None, **outcome
+        )
+    ).rowcount
+    if not recorded:
+        db.session.rollback()
+        print(f"⚠️  Job {job_id} ({name}) lost its lease to another worker, dropping this run's outcome")
+        return
+    db.session.commit()
+
+
+def schedule_periodic():
+    """Enqueue every periodic task whose interval has started since its last run (once across processes).
+
+    Each process only tries the INSERT when a new interval starts, so polls in
+    between don't touch the database.
+    """
+    now = time.time()
+    for name, every in current_app.config['JOB_PERIODIC'].items():
+        if not every or name not in _tasks:
+            continue
+        slot = int(now // every)
+        if _scheduled.get(name) == slot:
+            continue
+        try:
+            enqueue(name, unique_key=f'{name}:{slot}')
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # another process scheduled this interval
+        _scheduled[name] = slot
+
+
+@task('jobs.purge', queue='maintenance')
+def purge_jobs():
+    """Delete finished jobs older than the retention period"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['JOB_RETENTION_DAYS'])
+    Job.query.filter(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def queue_stats(window: timedelta = timedelta(hours=1)) -> dict:
+    """Depth, state counts and latency per queue (latency: due until started, over the last window)"""
+    now = datetime.utcnow()
+    stats = {}
+    counts = db.session.query(Job.queue, Job.status, db.func.count()).group_by(Job.queue, Job.status).all()
+    for queue, status, count in counts:
+        stats.setdefault(queue, {'queued': 0, 'running': 0, 'done': 0, 'failed': 0})[status] = count
+    due = db.session.query(Job.queue, db.func.count(), db.func.min(Job.run_at)).filter(
+        Job.status == 'queued', Job.run_at <= now
+    ).group_by(Job.queue).all()
+    for queue in stats:
+        stats[queue].update({'depth': 0, 'oldest_wait_seconds': 0.0})
+    for queue, count, oldest in due:
+        stats[queue].update({'depth': count, 'oldest_wait_seconds': round((now - oldest).total_seconds(), 3)})
+
+    recent = db.session.query(Job.queue, Job.run_at, Job.started_at, Job.finished_at).filter(
+        Job.status == 'done', Job.finished_at >= now - window
+    ).all()
+    latencies, durations = {}, {}
+    for queue, run_at, started_at, finished_at in recent:
+        latencies.setdefault(queue, []).append(max((started_at - run_at).total_seconds(), 0.0))
+        durations.setdefault(queue, []).append((finished_at - started_at).total_seconds())
+    for queue, values in latencies.items():
+        values.sort()
+        stats[queue]['latency_seconds'] = {
+            'avg': round(sum(values) / len(values), 3),
+            'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            'max': round(values[-1], 3),
+        }
+        stats[queue]['run_seconds_avg'] = round(sum(durations[queue]) / len(durations[queue]), 3)
+    for queue, limit in current_app.config['JOB_QUEUES'].items():
+        stats.setdefault(queue, {'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'depth': 0, 'oldest_wait_seconds': 0.0})
+        stats[queue]['concurrency'] = limit
+    return stats
+
+
+def _run_worker(app, queue: str):
+    wakeup = _wakeup(queue)
+    while True:
+        try:
+            with app.app_context():
+                job_id = claim(queue)
+                if job_id is not None:
+                    run_job(job_id)
+                    continue
+        except Exception:
+            print(f"❌ Job worker error on queue {queue}")
+            traceback.print_exc()
+        wakeup.wait(app.config['JOB_POLL_INTERVAL'])
+        wakeup.clear()
+
+
+def _run_scheduler(app):
+    while True:
+        try:
+            with app.app_context():
+                schedule_periodic()
+        except Exception:
+            print("❌ Job scheduler error")
+            traceback.print_exc()
+        time.sleep(app.config['JOB_POLL_INTERVAL'])
+
+
+def init_jobs(app):
+    """Register the tasks defined across the app (workers are started by start_job_workers)"""
+    from app.utils import uploads, archive, outbox  # noqa: F401
+
+
+def start_job_workers(app):
+    """Start the worker threads and scheduler (once per process, server processes only)"""
+    global _runner_pid
+    if _runner_pid == os.getpid():
+        return
+    _runner_pid = os.getpid()
+    for queue, concurrency in app.config['JOB_QUEUES'].items():
+        for i in range(concurrency):
+            threading.Thread(target=_run_worker, args=(app, queue), name=f'jobs-{queue}-{i}', daemon=True).start()
+    threading.Thread(target=_run_scheduler, args=(app,), name='jobs-scheduler', daemon=True).start()
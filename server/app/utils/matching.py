@@ -0,0 +1,175 @@
+from app.models import db, User, Skill, UserSkill
+import threading
+import time
+import numpy as np
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _BYTE_COUNTS[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1)
+
+
+class SkillMatchIndex:
+    """Offered/wanted skills of every user (from user_skills) as bitset rows over interned skill ids.
+
+    Scoring a user against all candidates is two ANDs and a popcount over the
+    whole matrix. The index is loaded once per process and then kept current by
+    re-reading only users whose updated_at moved past the last seen value.
+    Deleted users and changes that don't move updated_at are dropped when the
+    index is rebuilt after max_age seconds; until then, matches() checks its
+    results against the users table.
+    """
+
+    def __init__(self, max_age: float = 600):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.built_at = None
+        self._reset()
+
+    def _reset(self):
+        self.skill_bits = {}     # skill id -> bit position
+        self.skill_names = []    # bit position -> canonical skill name
+        self.user_ids = []       # row -> user id
+        self.rows = {}           # user id -> row
+        self.bits = {}           # user id -> (offered bit positions, wanted bit positions)
+        self.offered = np.zeros((0, 1), dtype=np.uint64)
+        self.wanted = np.zeros((0, 1), dtype=np.uint64)
+        self.eligible = np.zeros(0, dtype=bool)
+        self.watermark = None
+
+    def _skill_bit(self, skill_id: int, name: str) -> int:
+        """Intern a skill id and return its bit position"""
+        bit = self.skill_bits.get(skill_id)
+        if bit is None:
+            bit = self.skill_bits[skill_id] = len(self.skill_names)
+            self.skill_names.append(name)
+        return bit
+
+    def _ensure_capacity(self, rows, words):
+        """Grow the matrices (doubling rows) so they fit the given shape"""
+        capacity, width = self.offered.shape
+        if rows <= capacity and words <= width:
+            return
+        new_capacity = max(rows, capacity * 2, 64) if rows > capacity else capacity
+        new_width = max(words, width)
+        for name in ('offered', 'wanted'):
+            grown = np.zeros((new_capacity, new_width), dtype=np.uint64)
+            grown[:capacity, :width] = getattr(self, name)
+            setattr(self, name, grown)
+        eligible = np.zeros(new_capacity, dtype=bool)
+        eligible[:capacity] = self.eligible
+        self.eligible = eligible
+
+    def _set_row(self, user, offered_bits, wanted_bits):
+        row = self.rows.get(user.id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids.append(user.id)
+            self.rows[user.id] = row
+        self._ensure_capacity(row + 1, len(self.skill_names) // 64 + 1)
+
+        for matrix, bits in ((self.offered, offered_bits), (self.wanted, wanted_bits)):
+            matrix[row] = 0
+            for bit in bits:
+                matrix[row, bit // 64] |= np.uint64(1 << (bit % 64))
+        self.eligible[row] = bool(user.is_public) and user.role != 'admin' and not user.is_banned
+        self.bits[user.id] = (offered_bits, wanted_bits)
+
+    def refresh(self):
+        """Apply profile changes made since the last refresh (by any worker), or rebuild after max_age"""
+        rebuild = self.built_at is None or time.monotonic() - self.built_at > self.max_age
+        watermark = None if rebuild else self.watermark
+        changed_users = db.session.query(User.id, User.is_public, User.role, User.is_banned, User.updated_at)
+        user_skills = db.session.query(UserSkill.user_id, UserSkill.kind, Skill.id, Skill.name).join(
+            Skill, Skill.id == UserSkill.skill_id)
+        if watermark is not None:
+            # >= so rows sharing the last timestamp are never missed; re-applying them is harmless
+            changed_users = changed_users.filter(User.updated_at >= watermark)
+            user_skills = user_skills.filter(UserSkill.user_id.in_(
+                db.select(User.id).where(User.updated_at >= watermark)))
+        changed = changed_users.all()
+        if not changed and not rebuild:
+            return
+        skill_rows = user_skills.all()
+        with self.lock:
+            if rebuild:
+                # Replaced in one step, so matches() never sees a half-loaded index
+                self._reset()
+                self.built_at = time.monotonic()
+            skills = {}  # user id -> (offered bit positions, wanted bit positions)
+            for user_id, kind, skill_id, name in skill_rows:
+                skills.setdefault(user_id, ([], []))[0 if kind == 'offered' else 1].append(self._skill_bit(skill_id, name))
+            for user in changed:
+                self._set_row(user, *skills.get(user.id, ([], [])))
+                if user.updated_at and (self.watermark is None or user.updated_at > self.watermark):
+                    self.watermark = user.updated_at
+
+    def _vector(self, bits, width):
+        vector = np.zeros(width, dtype=np.uint64)
+        for bit in bits:
+            vector[bit // 64] |= np.uint64(1 << (bit % 64))
+        return vector
+
+    def _names(self, row_bits, query_bits):
+        return [self.skill_names[bit] for bit in query_bits if row_bits[bit // 64] & np.uint64(1 << (bit % 64))]
+
+    def matches(self, user_id: str, limit: int = 20) -> list:
+        """Rank users by how well their skills complement the given user's.
+
+        Results are checked against the users table; users deleted, hidden or
+        banned since the last refresh are marked ineligible and replaced.
+        """
+        while True:
+            ranked = self._rank(user_id, limit)
+            ranked_ids = [match['user_id'] for match in ranked]
+            listed = {listed_id for (listed_id,) in db.session.query(User.id).filter(
+                User.id.in_(ranked_ids), User.is_public.is_(True), User.role != 'admin', User.is_banned.isnot(True)
+            )} if ranked_ids else set()
+            stale = [ranked_id for ranked_id in ranked_ids if ranked_id not in listed]
+            if not stale:
+                return ranked
+            with self.lock:
+                for stale_id in stale:
+                    row = self.rows.get(stale_id)
+                    if row is not None:
+                        self.eligible[row] = False
+
+    def _rank(self, user_id: str, limit: int) -> list:
+        with self.lock:
+            row = self.rows.get(user_id)
+            if row is None:
+                return []
+            n = len(self.user_ids)
+            width = self.offered.shape[1]
+            offered, wanted = self.offered[:n], self.wanted[:n]
+            my_offered, my_wanted = self.bits[user_id]
+
+            # gives: how many of my wanted skills they offer; takes: how many of my offered skills they want
+            gives = _popcount(offered & self._vector(my_wanted, width)).sum(axis=1, dtype=np.int32)
+            takes = _popcount(wanted & self._vector(my_offered, width)).sum(axis=1, dtype=np.int32)
+
+            # Mutual matches first (both sides get something), then by total overlap
+            score = np.minimum(gives, takes) * 1000 + gives + takes
+            candidates = self.eligible[:n] & ((gives > 0) | (takes > 0))
+            candidates[row] = False
+            score = np.where(candidates, score, -1)
+
+            count = int(candidates.sum())
+            limit = min(limit, count)
+            if limit <= 0:
+                return []
+            top = np.argpartition(-score, limit - 1)[:limit]
+            top = top[np.argsort(-score[top], kind='stable')]
+            return [{
+                'user_id': self.user_ids[i],
+                'score': int(score[i]),
+                'reciprocal': bool(gives[i] and takes[i]),
+                'they_offer': self._names(offered[i], my_wanted),
+                'they_want': self._names(wanted[i], my_offered),
+            } for i in top]
+
+
+match_index = SkillMatchIndex()
@@ -0,0 +1,22 @@
+from app.models import User
+from app.utils.outbox import handler
+
+
+def notify(user_id: str, text: str):
+    """Deliver a notification to a user (logged until an email/push channel is configured)"""
+    user = User.query.get(user_id)
+    if user:
+        print(f"🔔 Notification for {user.email}: {text}")
+
+
+@handler('request.created')
+def notify_request_created(payload):
+    notify(payload['to_user_id'], f"New swap request: {payload['skill_offered']} for {payload['skill_wanted']}")
+
+
+@handler('request.status_changed')
+def notify_request_status(payload):
+    if payload['status'] == 'accepted':
+        notify(payload['from_user_id'], f"Your swap request was accepted, chat room {payload['chat_room_id']} is open")
+    elif payload['status'] == 'rejected':
+        notify(payload['from_user_id'], "Your swap request was declined")
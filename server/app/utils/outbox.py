@@ -0,0 +1,109 @@
+from flask import current_app
+from app.models import db, OutboxEvent
+from app.utils.fastjson import loads, dumps
+from app.utils.jobs import task, enqueue
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LEASE = timedelta(seconds=60)  # how long a claimed event is reserved for the worker handling it
+
+_handlers = {}  # topic -> [handler, ...]
+
+
+def handler(topic: str):
+    """Register a function to run with the payload of every event on topic (at least once)"""
+    def decorator(fn):
+        _handlers.setdefault(topic, []).append(fn)
+        return fn
+    return decorator
+
+
+def emit(topic: str, **payload):
+    """Record an event in the current transaction; it is handled after commit by an outbox.drain job"""
+    db.session.add(OutboxEvent(topic=topic, payload=dumps(payload).decode()))
+    if not db.session.info.get('outbox_drain_queued'):
+        # One drain job per transaction, committed with its events
+        enqueue('outbox.drain')
+        db.session.info['outbox_drain_queued'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _reset_drain(session):
+    session.info.pop('outbox_drain_queued', None)
+
+
+def _claim(event_id: int, now: datetime) -> bool:
+    """Reserve an event for this worker; False if another worker holds it"""
+    claimed = db.session.execute(
+        db.update(OutboxEvent).where(
+            OutboxEvent.id == event_id,
+            OutboxEvent.processed_at.is_(None),
+            db.or_(OutboxEvent.locked_until.is_(None), OutboxEvent.locked_until < now),
+        ).values(locked_until=now + LEASE)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def drain(limit: int = 100) -> int:
+    """Handle pending events in order; returns how many were attempted.
+
+    An event's handlers run in one transaction with marking it processed, so
+    their database writes are applied exactly once; anything else they do
+    (notifications, cache invalidation) may be repeated by a retry.
+    """
+    max_attempts = current_app.config['OUTBOX_MAX_ATTEMPTS']
+    now = datetime.utcnow()
+    pending = db.session.query(OutboxEvent.id).filter(
+        OutboxEvent.processed_at.is_(None),
+        OutboxEvent.attempts < max_attempts,
+        db.or_(OutboxEvent.locked_until.is_(None), OutboxEvent.locked_until < now),
+    ).order_by(OutboxEvent.id).limit(limit).all()
+
+    attempted = 0
+    for (event_id,) in pending:
+        if not _claim(event_id, now):
+            continue
+        attempted += 1
+        outbox_event = OutboxEvent.query.get(event_id)
+        try:
+            payload = loads(outbox_event.payload)
+            for fn in _handlers.get(outbox_event.topic, []):
+                fn(payload)
+            outbox_event.processed_at = datetime.utcnow()
+            outbox_event.locked_until = None
+        except Exception as e:
+            db.session.rollback()
+            outbox_event = OutboxEvent.query.get(event_id)
+            outbox_event.attempts += 1
+            outbox_event.last_error = str(e)
+            # Exponential backoff: 2, 4, 8, ... seconds
+            backoff = 2 ** outbox_event.attempts
+            outbox_event.locked_until = datetime.utcnow() + timedelta(seconds=backoff)
+            if outbox_event.attempts < max_attempts:
+                enqueue('outbox.drain', delay=backoff)
+            print(f"❌ Outbox event {event_id} ({outbox_event.topic}) failed: {e}")
+        db.session.commit()
+    return attempted
+
+
+@task('outbox.drain')
+def drain_pending():
+    """Handle every pending event (queued by emit and retries, and periodically for leftovers)"""
+    while drain():
+        pass
+
+
+@task('outbox.purge', queue='maintenance')
+def purge_processed():
+    """Delete processed events older than the retention period"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['OUTBOX_RETENTION_DAYS'])
+    OutboxEvent.query.filter(OutboxEvent.processed_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def init_outbox(app):
+    """Register event handlers (events are handled by outbox.drain jobs on the job workers)"""
+    from app.utils import notifications, ranking, http_cache  # noqa: F401 (registers handlers)
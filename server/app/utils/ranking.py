@@ -0,0 +1,174 @@
+from flask import current_app
+from app.models import db, User, SwapRequest, Message
+from app.utils.outbox import handler, emit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import base64
+
+RANK_EPOCH = datetime(2024, 1, 1)
+ACTIVITY_RESOLUTION = timedelta(hours=1)  # last_active_at is only rewritten once it is this old
+
+# Profile fields counted for completeness
+PROFILE_FIELDS = ('photo_url', 'location', 'availability_mask', 'skills_offered', 'skills_wanted')
+
+# Columns rank_score reads
+RANK_COLUMNS = (User.id, User.last_active_at, User.rating_count, User.rating_sum,
+                User.requests_accepted, User.requests_rejected) + tuple(getattr(User, field) for field in PROFILE_FIELDS)
+
+
+def rank_score(user) -> float:
+    """Directory rank of a user (a model or a row with RANK_COLUMNS); higher ranks list first.
+
+    Profile quality (completeness, a rating and an acceptance rate shrunk
+    towards neutral priors, so a few reviews don't dominate) is added to the
+    time of last activity in units of USER_RANK_ACTIVITY_DAYS. The score never
+    needs recomputing as time passes: a newer activity simply scores higher,
+    and one unit of quality is worth being active that many days more recently.
+    """
+    config = current_app.config
+    weights = config['USER_RANK_WEIGHTS']
+    completeness = sum(1 for field in PROFILE_FIELDS if getattr(user, field) not in (None, '', '[]')) / len(PROFILE_FIELDS)
+    rating = ((user.rating_sum or 0) + 3.0 * 5) / ((user.rating_count or 0) + 5) / 5  # prior: five 3-star ratings
+    accepted, rejected = user.requests_accepted or 0, user.requests_rejected or 0
+    acceptance = (accepted + 1.0) / (accepted + rejected + 2)  # prior: one accepted, one rejected
+    active_at = user.last_active_at or RANK_EPOCH
+    activity = (active_at - RANK_EPOCH) / timedelta(days=config['USER_RANK_ACTIVITY_DAYS'])
+    return (weights['completeness'] * completeness + weights['rating'] * rating
+            + weights['acceptance'] * acceptance + activity)
+
+
+def record_profile_change(user):
+    """Mark a user being edited in the session as active and recompute their rank"""
+    user.last_active_at = datetime.utcnow()
+    user.user_rank = rank_score(user)
+
+
+def refresh_user_rank(*user_ids):
+    """Recompute stored ranks after their inputs changed in the current transaction.
+
+    Ranks are not part of the profile, so updated_at is left alone.
+    """
+    rows = db.session.query(*RANK_COLUMNS).filter(User.id.in_(user_ids)).all()
+    if rows:
+        users = User.__table__
+        db.session.execute(
+            db.update(users).where(users.c.id == db.bindparam('user_id')).values(
+                user_rank=db.bindparam('rank'), updated_at=users.c.updated_at
+            ),
+            [{'user_id': row.id, 'rank': rank_score(row)} for row in rows]
+        )
+
+
+def record_activity(user_id: str, when: datetime = None):
+    """Note that a user was active (at most one write per ACTIVITY_RESOLUTION)"""
+    when = when or datetime.utcnow()
+    touched = db.session.execute(
+        db.update(User).where(
+            User.id == user_id,
+            db.or_(User.last_active_at.is_(None), User.last_active_at < when - ACTIVITY_RESOLUTION),
+        ).values(last_active_at=when, updated_at=User.updated_at)
+    ).rowcount
+    if touched:
+        refresh_user_rank(user_id)
+
+
+def record_request_status(to_user_id: str, old_status: str, new_status: str):
+    """Move the receiver's accepted/rejected counters with a request's status change"""
+    deltas = {'accepted': 0, 'rejected': 0}
+    if old_status in deltas:
+        deltas[old_status] -= 1
+    if new_status in deltas:
+        deltas[new_status] += 1
+    if not any(deltas.values()):
+        return
+    db.session.execute(
+        db.update(User).where(User.id == to_user_id).values(
+            requests_accepted=User.requests_accepted + deltas['accepted'],
+            requests_rejected=User.requests_rejected + deltas['rejected'],
+            updated_at=User.updated_at,
+        )
+    )
+    refresh_user_rank(to_user_id)
+    emit('users.listing_changed')
+
+
+@handler('request.status_changed')
+def count_request_status(payload):
+    record_request_status(payload['to_user_id'], payload['old_status'], payload['status'])
+
+
+@handler('request.deleted')
+def count_request_deleted(payload):
+    record_request_status(payload['to_user_id'], payload['status'], None)
+
+
+def encode_rank_cursor(user_rank: float, user_id: str) -> str:
+    """Opaque keyset cursor for the directory entry after which the next page starts"""
+    return base64.urlsafe_b64encode(f'{user_rank!r}|{user_id}'.encode()).decode()
+
+
+def decode_rank_cursor(cursor: str):
+    """(user_rank, user_id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        user_rank, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return float(user_rank), user_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def after_rank(user_rank: float, user_id: str):
+    """SQL condition: the user lists after (user_rank, user_id) in directory order"""
+    return db.or_(
+        User.user_rank < user_rank,
+        db.and_(User.user_rank == user_rank, User.id < user_id),
+    )
+
+
+def backfill_user_rank(user_ids=None):
+    """Compute counters, last activity and rank from scratch for users without a rank (or the given users)"""
+    if user_ids is None:
+        missing = [user_id for (user_id,) in db.session.query(User.id).filter(User.user_rank.is_(None)).all()]
+    else:
+        missing = list(user_ids)
+    if not missing:
+        return
+    counts = {}
+    for user_id, status, count in db.session.query(SwapRequest.to_user_id, SwapRequest.status, db.func.count()).filter(
+        SwapRequest.status.in_(('accepted', 'rejected'))
+    ).group_by(SwapRequest.to_user_id, SwapRequest.status).all():
+        counts[(user_id, status)] = count
+    # Latest sign of life: a sent message, a sent request, or the profile itself
+    last_message = dict(db.session.query(Message.sender_id, db.func.max(Message.created_at)).group_by(Message.sender_id).all())
+    last_request = dict(db.session.query(SwapRequest.from_user_id, db.func.max(SwapRequest.created_at)).group_by(SwapRequest.from_user_id).all())
+
+    users = User.__table__
+    for i in range(0, len(missing), 500):
+        rows = db.session.query(*RANK_COLUMNS, User.created_at, User.updated_at).filter(
+            User.id.in_(missing[i:i + 500])
+        ).all()
+        params = []
+        for row in rows:
+            user = SimpleNamespace(**row._asdict())
+            user.requests_accepted = counts.get((user.id, 'accepted'), 0)
+            user.requests_rejected = counts.get((user.id, 'rejected'), 0)
+            user.last_active_at = max(filter(None, (last_message.get(user.id), last_request.get(user.id),
+                                                    user.updated_at, user.created_at)), default=None)
+            params.append({
+                'user_id': user.id,
+                'accepted': user.requests_accepted,
+                'rejected': user.requests_rejected,
+                'active': user.last_active_at,
+                'rank': rank_score(user),
+            })
+        db.session.execute(
+            db.update(users).where(users.c.id == db.bindparam('user_id')).values(
+                requests_accepted=db.bindparam('accepted'),
+                requests_rejected=db.bindparam('rejected'),
+                last_active_at=db.bindparam('active'),
+                user_rank=db.bindparam('rank'),
+                updated_at=users.c.updated_at,
+            ),
+            params
+        )
+        db.session.commit()
+    print(f"🔧 Computed directory rank for {len(missing)} users")
@@ -0,0 +1,141 @@
+from functools import wraps
+from collections import OrderedDict
+from flask import request, jsonify, current_app
+import hashlib
+import math
+import threading
+import time
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit: str) -> tuple:
+    """Parse '10/minute' into (capacity, tokens refilled per second)"""
+    count, period = limit.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip()]
+
+
+class MemoryBackend:
+    """Token buckets held in this process, evicting the least recently used keys"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Take one token; return 0 if allowed, otherwise seconds until a token is available"""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                self.buckets.move_to_end(key)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self.buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class RedisBackend:
+    """Token buckets shared by all workers through Redis (requires the redis package)"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+    end
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Take one token; return 0 if allowed, otherwise seconds until a token is available"""
+        return float(self.script(keys=[f'ratelimit:{key}'], args=[capacity, rate, time.time()]))
+
+
+def init_rate_limiter(app):
+    """Attach the configured rate limit backend to the app"""
+    if app.config['RATELIMIT_BACKEND'] == 'redis':
+        backend = RedisBackend(app.config['RATELIMIT_REDIS_URL'])
+    else:
+        backend = MemoryBackend()
+    app.extensions['ratelimit'] = backend
+
+
+def _token_user_id():
+    """Read the user id from the bearer token without touching the database"""
+    from app.utils.auth import verify_token
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    payload = verify_token(auth_header.split(' ')[1])
+    return payload['user_id'] if payload else None
+
+
+def _body_account():
+    """Key for the account named by the email in the JSON body, normalized so case and spacing don't matter"""
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    # Hashed, so addresses aren't stored in the backend
+    return hashlib.sha1(email.strip().lower().encode()).hexdigest()
+
+
+def rate_limit(scope: str, per_ip: str = None, per_user: str = None, per_account: str = None):
+    """Decorator to limit calls to a route per client IP, per authenticated user and/or
+    per account named in the request body (for login, where there is no token yet)"""
+    ip_limit = parse_limit(per_ip) if per_ip else None
+    user_limit = parse_limit(per_user) if per_user else None
+    account_limit = parse_limit(per_account) if per_account else None
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config['RATELIMIT_ENABLED']:
+                return f(*args, **kwargs)
+
+            backend = current_app.extensions['ratelimit']
+            wait = 0.0
+            if ip_limit:
+                wait = backend.take(f'{scope}:ip:{request.remote_addr}', *ip_limit)
+            if not wait and user_limit:
+                user_id = _token_user_id()
+                if user_id:
+                    wait = backend.take(f'{scope}:user:{user_id}', *user_limit)
+            if not wait and account_limit:
+                account = _body_account()
+                if account:
+                    wait = backend.take(f'{scope}:account:{account}', *account_limit)
+
+            if wait:
+                retry_after = str(max(1, math.ceil(wait)))
+                return jsonify({'error': 'Too many requests'}), 429, {'Retry-After': retry_after}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,57 @@
+from app.models import db, User, Feedback
+from app.utils.ranking import refresh_user_rank
+
+
+def rating_summary(rating_count, rating_sum) -> dict:
+    """Rating fields for a profile, from the user's running aggregates"""
+    rating_count = rating_count or 0
+    return {
+        'rating_count': rating_count,
+        'rating_average': round((rating_sum or 0) / rating_count, 2) if rating_count else None
+    }
+
+
+def adjust_rating(user_id: str, count_delta: int, sum_delta: int):
+    """Apply a change to a user's rating aggregates in the current transaction.
+
+    The increment is done by the database, so concurrent feedback for the same
+    user is never lost; updated_at moves so cached profiles and listings refresh.
+    """
+    db.session.execute(
+        db.update(User).where(User.id == user_id).values(
+            rating_count=User.rating_count + count_delta,
+            rating_sum=User.rating_sum + sum_delta,
+        )
+    )
+    refresh_user_rank(user_id)
+
+
+def record_feedback(request_data, from_user_id: str, rating: int, comment: str = None):
+    """Create or replace a participant's feedback on a swap request; returns (feedback, created).
+
+    The caller commits, so the feedback and the aggregates change together.
+    """
+    to_user_id = request_data.to_user_id if from_user_id == request_data.from_user_id else request_data.from_user_id
+    feedback = Feedback.query.filter_by(request_id=request_data.id, from_user_id=from_user_id).first()
+    created = feedback is None
+    if created:
+        feedback = Feedback(request_id=request_data.id, from_user_id=from_user_id, to_user_id=to_user_id, rating=rating)
+        db.session.add(feedback)
+        adjust_rating(to_user_id, 1, rating)
+    elif feedback.rating is None:
+        # Legacy feedback without a rating isn't counted in the aggregates yet
+        adjust_rating(to_user_id, 1, rating)
+        feedback.rating = rating
+    else:
+        adjust_rating(to_user_id, 0, rating - feedback.rating)
+        feedback.rating = rating
+    feedback.comment = comment
+    return feedback, created
+
+
+def remove_request_feedback(request_id: str):
+    """Delete the feedback left on a request and take it out of the users' aggregates"""
+    for feedback in Feedback.query.filter_by(request_id=request_id).all():
+        if feedback.rating is not None:
+            adjust_rating(feedback.to_user_id, -1, -feedback.rating)
+        db.session.delete(feedback)
@@ -0,0 +1,130 @@
+from app.models import db, User, ChatRoom, ChatRead, Message, Feedback, SchemaVersion
+from app.utils.search import ensure_search_index
+from app.utils.skills import backfill_user_skills
+from app.utils.geo import backfill_user_locations
+from app.utils.availability import backfill_user_availability
+from app.utils.inbox import backfill_room_activity
+from app.utils.ranking import backfill_user_rank
+from sqlalchemy.schema import CreateColumn
+
+# Bump whenever init_database has new work to do (tables, columns, indexes, backfills),
+# so servers started on an older database ask for init-db.py to be run
+SCHEMA_VERSION = 1
+
+
+def merge_duplicate_chat_rooms(conn):
+    """Keep the oldest chat room of each request, moving the others' messages into it"""
+    rooms = ChatRoom.__table__
+    duplicated = db.select(rooms.c.request_id).group_by(rooms.c.request_id).having(db.func.count() > 1)
+    rows = conn.execute(
+        db.select(rooms.c.id, rooms.c.request_id).where(rooms.c.request_id.in_(duplicated))
+        .order_by(rooms.c.request_id, rooms.c.created_at, rooms.c.id)
+    ).all()
+    kept = {}
+    for room_id, request_id in rows:
+        if request_id not in kept:
+            kept[request_id] = room_id
+            continue
+        conn.execute(db.update(Message.__table__).where(Message.chat_room_id == room_id).values(chat_room_id=kept[request_id]))
+        conn.execute(db.delete(ChatRead.__table__).where(ChatRead.chat_room_id == room_id))
+        conn.execute(db.delete(rooms).where(rooms.c.id == room_id))
+        # Recomputed by the inbox backfill
+        conn.execute(db.update(rooms).where(rooms.c.id == kept[request_id]).values(last_message_id=None, last_activity_at=None))
+        print(f"🔧 Merged duplicate chat room {room_id} into {kept[request_id]}")
+
+
+def recount_user_ratings(conn):
+    """Compute rating aggregates from the feedback recorded before they were maintained"""
+    feedback = Feedback.__table__
+    rated = db.and_(feedback.c.to_user_id == User.__table__.c.id, feedback.c.rating.isnot(None))
+    conn.execute(db.update(User.__table__).values(
+        rating_count=db.select(db.func.count()).where(rated).scalar_subquery(),
+        rating_sum=db.select(db.func.coalesce(db.func.sum(feedback.c.rating), 0)).where(rated).scalar_subquery(),
+    ))
+    print("🔧 Recounted user ratings")
+
+
+def dedupe_feedback(conn):
+    """Keep the latest feedback of each participant on a request"""
+    feedback = Feedback.__table__
+    rows = conn.execute(
+        db.select(feedback.c.id, feedback.c.request_id, feedback.c.from_user_id)
+        .order_by(feedback.c.request_id, feedback.c.from_user_id, feedback.c.created_at.desc(), feedback.c.id)
+    ).all()
+    seen = set()
+    duplicates = []
+    for feedback_id, request_id, from_user_id in rows:
+        if (request_id, from_user_id) in seen:
+            duplicates.append(feedback_id)
+        seen.add((request_id, from_user_id))
+    if duplicates:
+        conn.execute(db.delete(feedback).where(feedback.c.id.in_(duplicates)))
+        print(f"🔧 Removed {len(duplicates)} duplicate feedback entries")
+
+
+# Data fixes that must run before an index can be created on an existing table
+INDEX_FIXUPS = {
+    'ix_chat_rooms_request_id': merge_duplicate_chat_rooms,
+    'ux_feedback_request_from_user': dedupe_feedback,
+}
+
+# Data fixes that fill a column just added to an existing table (run after all tables are upgraded)
+COLUMN_FIXUPS = {
+    'users.rating_count': recount_user_ratings,
+}
+
+
+def upgrade_schema():
+    """Add columns and indexes that are in the models but missing from existing tables.
+
+    db.create_all() only creates missing tables. New columns on existing tables
+    (nullable, or with a server default) are added with ALTER TABLE so older
+    databases keep working.
+    """
+    with db.engine.begin() as conn:
+        inspector = db.inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        added = []
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}')
+                added.append(f'{table.name}.{column.name}')
+                print(f"🔧 Added column {table.name}.{column.name}")
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.name in INDEX_FIXUPS:
+                    INDEX_FIXUPS[index.name](conn)
+                index.create(conn)
+        for name in added:
+            if name in COLUMN_FIXUPS:
+                COLUMN_FIXUPS[name](conn)
+
+
+def init_database():
+    """Create missing tables, upgrade existing ones and fill derived columns (run by init-db.py on deploy)"""
+    db.create_all()
+    upgrade_schema()
+    ensure_search_index()
+    backfill_user_skills()
+    backfill_user_locations()
+    backfill_user_availability()
+    backfill_room_activity()
+    backfill_user_rank()
+    db.session.execute(db.delete(SchemaVersion))
+    db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+    db.session.commit()
+
+
+def schema_version():
+    """The schema version init_database last brought the database to, or None if it never ran"""
+    if not db.inspect(db.engine).has_table(SchemaVersion.__tablename__):
+        return None
+    return db.session.scalar(db.select(db.func.max(SchemaVersion.version)))
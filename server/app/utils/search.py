@@ -0,0 +1,97 @@
+from app.models import db
+import re
+
+SEARCH_COLUMNS = ('name', 'location', 'availability', 'skills_offered', 'skills_wanted')
+
+# Contentless FTS5 index over users, kept in sync by triggers. users has a VARCHAR primary key, so its
+# implicit rowid can be renumbered by VACUUM; FTS rows are keyed on users_search_ids.id instead, an
+# INTEGER PRIMARY KEY that never changes
+SEARCH_ID = "(SELECT id FROM users_search_ids WHERE user_id = {}.id)"
+
+SQLITE_DDL = [
+    """CREATE TABLE users_search_ids (
+        id INTEGER PRIMARY KEY,
+        user_id VARCHAR(36) NOT NULL UNIQUE
+    )""",
+    f"""CREATE VIRTUAL TABLE users_fts USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, content='', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_search_ids(user_id) VALUES (new.id);
+        INSERT INTO users_fts(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ({SEARCH_ID.format('new')}, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', {SEARCH_ID.format('old')}, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+        DELETE FROM users_search_ids WHERE user_id = old.id;
+    END""",
+    f"""CREATE TRIGGER users_fts_au AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', {SEARCH_ID.format('old')}, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+        INSERT INTO users_fts(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ({SEARCH_ID.format('new')}, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    "INSERT INTO users_search_ids(user_id) SELECT id FROM users",
+    f"""INSERT INTO users_fts(rowid, {', '.join(SEARCH_COLUMNS)})
+        SELECT users_search_ids.id, {', '.join('users.' + c for c in SEARCH_COLUMNS)}
+        FROM users JOIN users_search_ids ON users_search_ids.user_id = users.id""",
+]
+
+# The first version was an external-content index on users.rowid
+SQLITE_DROP_ROWID_INDEX = [
+    "DROP TRIGGER IF EXISTS users_fts_ai",
+    "DROP TRIGGER IF EXISTS users_fts_ad",
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+# Postgres keeps a generated tsvector column in sync instead of triggers
+POSTGRES_DDL = [
+    f"""ALTER TABLE users ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', {" || ' ' || ".join(f"coalesce({c}, '')" for c in SEARCH_COLUMNS)})
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_users_search_vector ON users USING gin (search_vector)",
+]
+
+
+def ensure_search_index():
+    """Create the full-text index for the current database if it doesn't exist yet"""
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == 'sqlite':
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_search_ids'"
+            ).first()
+            if not exists:
+                for statement in SQLITE_DROP_ROWID_INDEX + SQLITE_DDL:
+                    conn.exec_driver_sql(statement)
+        elif dialect == 'postgresql':
+            for statement in POSTGRES_DDL:
+                conn.exec_driver_sql(statement)
+
+
+def search_terms(q: str) -> list:
+    """Split free text into plain word tokens (no query syntax from user input)"""
+    return re.findall(r'\w+', q.lower())
+
+
+def apply_text_search(query, q: str):
+    """Restrict a User query to full-text matches for q, best matches first"""
+    terms = search_terms(q)
+    if not terms:
+        return query
+    if db.engine.dialect.name == 'postgresql':
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        vector = db.literal_column('users.search_vector')
+        return query.filter(vector.op('@@')(tsquery)).order_by(db.func.ts_rank(vector, tsquery).desc())
+
+    # Every term must match, each as a prefix so partial words ("pyth") still find results
+    fts = db.table('users_fts', db.column('rowid'))
+    search_ids = db.table('users_search_ids', db.column('id'), db.column('user_id'))
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return query.join(search_ids, search_ids.c.user_id == db.literal_column('users.id')).join(
+        fts, fts.c.rowid == search_ids.c.id
+    ).filter(
+        db.literal_column('users_fts').match(match)
+    ).order_by(db.func.bm25(db.literal_column('users_fts')))
@@ -0,0 +1,221 @@
+from app.models import db, User, Skill, SkillAlias, UserSkill
+from app.utils.fastjson import loads, dumps
+from bisect import bisect_left, insort
+from sqlalchemy.exc import IntegrityError
+import heapq
+import threading
+import time
+
+# Common spellings mapped to a canonical skill name (extend per deployment with skill_aliases rows)
+DEFAULT_ALIASES = {
+    'reactjs': 'React',
+    'react.js': 'React',
+    'js': 'JavaScript',
+    'nodejs': 'Node.js',
+    'node': 'Node.js',
+    'py': 'Python',
+    'ml': 'Machine Learning',
+    'ai': 'Artificial Intelligence',
+    'ui/ux': 'UI/UX Design',
+    'seo': 'SEO',
+}
+
+
+def skill_key(name: str) -> str:
+    """Normalized lookup key: trimmed, single-spaced, lowercase"""
+    return ' '.join(name.split()).lower()
+
+
+def canonical_skill_key(name: str) -> str:
+    """Lookup key after applying the built-in aliases"""
+    key = skill_key(name)
+    alias = DEFAULT_ALIASES.get(key)
+    return skill_key(alias) if alias else key
+
+
+def canonical_skill_name(name: str) -> str:
+    """Display name for a new skill, using the built-in alias target when there is one"""
+    key = skill_key(name)
+    return DEFAULT_ALIASES.get(key) or ' '.join(name.split())
+
+
+def lookup_skills(names) -> dict:
+    """Map normalized keys to existing Skill rows, following aliases (no rows are created)"""
+    keys = {canonical_skill_key(name) for name in names if name and name.strip()}
+    if not keys:
+        return {}
+    found = {skill.key: skill for skill in Skill.query.filter(Skill.key.in_(keys)).all()}
+    missing = keys - found.keys()
+    if missing:
+        for alias in SkillAlias.query.filter(SkillAlias.alias.in_(missing)).all():
+            found[alias.alias] = alias.skill
+    return found
+
+
+def resolve_skills(names) -> list:
+    """Resolve skill names to canonical Skill rows, creating unknown skills; keeps order, drops duplicates"""
+    found = lookup_skills(names)
+    skills = []
+    for name in names:
+        if not name or not name.strip():
+            continue
+        key = canonical_skill_key(name)
+        skill = found.get(key)
+        if skill is None:
+            try:
+                # Savepoint so a concurrent insert of the same skill doesn't abort the outer transaction
+                with db.session.begin_nested():
+                    skill = Skill(name=canonical_skill_name(name), key=key)
+                    db.session.add(skill)
+            except IntegrityError:
+                skill = Skill.query.filter_by(key=key).one()
+            found[key] = skill
+        if skill not in skills:
+            skills.append(skill)
+    return skills
+
+
+def check_skill_names(names) -> list:
+    """The skill names unchanged, or ValueError unless they are a list of non-blank strings"""
+    if not isinstance(names, list) or not all(isinstance(name, str) and name.strip() for name in names):
+        raise ValueError('Skills must be a list of non-blank skill names')
+    return names
+
+
+def set_user_skills(user, skills_offered=None, skills_wanted=None):
+    """Store a user's skills as canonical names (JSON) and skill ids (user_skills); None leaves a side unchanged"""
+    if user.id is None:
+        db.session.add(user)
+        db.session.flush()
+    for kind, names in (('offered', skills_offered), ('wanted', skills_wanted)):
+        if names is None:
+            continue
+        skills = resolve_skills(names)
+        setattr(user, f'skills_{kind}', dumps([skill.name for skill in skills]).decode())
+        UserSkill.query.filter_by(user_id=user.id, kind=kind).delete()
+        db.session.add_all([UserSkill(user_id=user.id, skill_id=skill.id, kind=kind) for skill in skills])
+
+
+def skill_user_ids(names):
+    """Subquery of user ids having any of the named skills (offered or wanted), or None if no skill is known"""
+    skill_ids = {skill.id for skill in lookup_skills(names).values()}
+    if not skill_ids:
+        return None
+    return db.select(UserSkill.user_id).where(UserSkill.skill_id.in_(skill_ids))
+
+
+def backfill_user_skills():
+    """Populate skills/user_skills from the JSON skill columns of users that have no user_skills rows yet"""
+    users = User.query.filter(~User.id.in_(db.select(UserSkill.user_id).distinct())).all()
+    users = [user for user in users if user.skills_offered not in (None, '', '[]') or user.skills_wanted not in (None, '', '[]')]
+    for user in users:
+        set_user_skills(user, skill_names_list(user.skills_offered), skill_names_list(user.skills_wanted))
+    if users:
+        db.session.commit()
+        print(f"🔧 Backfilled skill ids for {len(users)} users")
+
+
+def skill_names_list(skills_json) -> list:
+    """Skill names from a JSON skill column, in order"""
+    return [name for name in (loads(skills_json) if skills_json else []) if isinstance(name, str)]
+
+
+def skill_names(skills_json) -> set:
+    """Distinct normalized skill names from a JSON skill column"""
+    return {name.strip() for name in (loads(skills_json) if skills_json else []) if name.strip()}
+
+
+class SkillSuggester:
+    """Distinct skills with popularity counts, kept as a sorted array for prefix lookups.
+
+    Built from the skill dictionary on first use and updated in place on profile
+    writes, so suggestions never touch the database. Writes made by other
+    workers are picked up when the index is rebuilt after max_age seconds.
+    """
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.keys = []       # sorted lowercased names
+        self.entries = {}    # lowercased name -> [display name, user count]
+        self.cache = {}      # (prefix, limit) -> suggestions, cleared per affected prefix
+        self.built_at = None
+
+    def _add(self, names, delta):
+        for name in names:
+            key = name.lower()
+            entry = self.entries.get(key)
+            if entry is None:
+                if delta < 0:
+                    continue
+                entry = self.entries[key] = [name, 0]
+                insort(self.keys, key)
+            entry[1] += delta
+            if entry[1] <= 0:
+                del self.entries[key]
+                del self.keys[bisect_left(self.keys, key)]
+
+    def _user_skills(self, skills_offered, skills_wanted) -> set:
+        # A user counts once per skill, whether offered or wanted (case-insensitively)
+        names = {}
+        for name in skill_names(skills_offered) | skill_names(skills_wanted):
+            names.setdefault(name.lower(), name)
+        return set(names.values())
+
+    def rebuild(self):
+        """Reload the skills and their user counts from user_skills (admins excluded)"""
+        rows = db.session.query(
+            Skill.name, db.func.count(db.distinct(UserSkill.user_id))
+        ).join(UserSkill, UserSkill.skill_id == Skill.id
+        ).join(User, User.id == UserSkill.user_id
+        ).filter(User.role != 'admin').group_by(Skill.id, Skill.name).all()
+        with self.lock:
+            counts = {name.lower(): [name, count] for name, count in rows}
+            self.cache = {}
+            self.entries = counts
+            self.keys = sorted(counts)
+            self.built_at = time.monotonic()
+
+    def update(self, old_offered, old_wanted, new_offered, new_wanted):
+        """Apply one user's skill change (JSON columns before and after)"""
+        if self.built_at is None:
+            return
+        old = self._user_skills(old_offered, old_wanted)
+        new = self._user_skills(new_offered, new_wanted)
+        old_keys = {name.lower() for name in old}
+        new_keys = {name.lower() for name in new}
+        removed = [name for name in old if name.lower() not in new_keys]
+        added = [name for name in new if name.lower() not in old_keys]
+        if not removed and not added:
+            return
+        changed = [name.lower() for name in removed + added]
+        with self.lock:
+            self._add(removed, -1)
+            self._add(added, 1)
+            # Only drop cached results for prefixes of the skills that changed
+            self.cache = {
+                cache_key: suggestions for cache_key, suggestions in self.cache.items()
+                if not any(key.startswith(cache_key[0]) for key in changed)
+            }
+
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        """Most popular skills starting with prefix (case-insensitive)"""
+        if self.built_at is None or time.monotonic() - self.built_at > self.max_age:
+            self.rebuild()
+        prefix = prefix.strip().lower()
+        cache_key = (prefix, limit)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        with self.lock:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + '\uffff', lo=start)
+            top = heapq.nsmallest(limit, self.keys[start:end], key=lambda key: (-self.entries[key][1], key))
+            suggestions = [{'name': self.entries[key][0], 'count': self.entries[key][1]} for key in top]
+            if len(self.cache) >= 10000:
+                self.cache = {}
+            self.cache[cache_key] = suggestions
+        return suggestions
+
+
+skill_suggester = SkillSuggester()
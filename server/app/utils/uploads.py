@@ -0,0 +1,181 @@
+from flask import current_app, request, send_from_directory, abort
+from app.models import User
+from app.utils.jobs import task, enqueue
+from werkzeug.utils import secure_filename
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+# Content-addressed originals look like '<sha256>.<ext>', variants like '<sha256>_<size>.<format>'
+PHOTO_URL_RE = re.compile(r'^(?P<prefix>.*/)(?P<digest>[0-9a-f]{64})\.(?P<ext>[a-z]+)$')
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{64}(_\d+)?\.[a-z]+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def upload_folder() -> str:
+    """Absolute path of the uploads directory"""
+    return os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+
+
+def store_upload(file, folder: str, ext: str) -> str:
+    """Stream an upload to disk in chunks and store it under its content hash; returns the filename"""
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        filename = f'{digest.hexdigest()}.{ext}'
+        final_path = os.path.join(folder, filename)
+        if os.path.exists(final_path):
+            # Same content already stored, keep the existing copy
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return filename
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def variant_filename(digest: str, size: int, fmt: str) -> str:
+    """Filename of a resized variant"""
+    return f'{digest}_{size}.{fmt.lower()}'
+
+
+def variant_url(photo_url: str, size: int, fmt: str) -> str:
+    """URL of a resized variant of a content-addressed photo (other URLs are returned unchanged)"""
+    if not photo_url:
+        return photo_url
+    match = PHOTO_URL_RE.match(photo_url)
+    if not match:
+        return photo_url
+    return match.group('prefix') + variant_filename(match.group('digest'), size, fmt)
+
+
+def photo_urls(photo_url: str) -> dict:
+    """Sized URLs for a stored photo: photo_url for profiles, photo_thumbnail_url for small avatars"""
+    sizes = current_app.config['THUMBNAIL_SIZES']
+    fmt = current_app.config['THUMBNAIL_FORMAT']
+    return {
+        'photo_url': variant_url(photo_url, max(sizes), fmt),
+        'photo_thumbnail_url': variant_url(photo_url, min(sizes), fmt),
+    }
+
+
+def original_for_variant(folder: str, filename: str):
+    """Find the original file for a variant filename that hasn't been generated yet"""
+    digest = filename.split('_', 1)[0]
+    if not re.fullmatch(r'[0-9a-f]{64}', digest):
+        return None
+    # Originals are stored as <digest>.<ext>, so probe those names instead of listing the folder
+    for ext in sorted(current_app.config['ALLOWED_EXTENSIONS']):
+        name = f'{digest}.{ext}'
+        if os.path.exists(os.path.join(folder, name)):
+            return name
+    return None
+
+
+def serve_upload(filename: str):
+    """Serve an uploaded file with cache validators, letting a reverse proxy stream it when configured"""
+    folder = upload_folder()
+    filename = secure_filename(filename)
+    immutable = bool(CONTENT_ADDRESSED_RE.match(filename))
+    if immutable and not os.path.exists(os.path.join(folder, filename)):
+        # Thumbnail not generated yet, serve the original meanwhile but don't let it be cached as the variant
+        original = original_for_variant(folder, filename)
+        if original:
+            filename, immutable = original, False
+
+    # Content-addressed names never change content, so the name itself is a strong validator
+    etag = filename.rsplit('.', 1)[0] if immutable else True
+    accel_prefix = current_app.config['UPLOADS_ACCEL_REDIRECT']
+    if accel_prefix:
+        path = os.path.join(folder, filename)
+        if not os.path.isfile(path):
+            abort(404)
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        if immutable:
+            response.set_etag(etag)
+        else:
+            stat = os.stat(path)
+            response.set_etag(f'{int(stat.st_mtime)}-{stat.st_size}')
+    else:
+        # send_file answers If-None-Match/Range itself and uses sendfile via wsgi.file_wrapper
+        response = send_from_directory(folder, filename, etag=etag, max_age=0)
+
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request) if accel_prefix else response
+
+
+def generate_thumbnails(folder: str, filename: str, sizes, fmt: str):
+    """Write resized variants of an original"""
+    from PIL import Image, ImageOps
+
+    digest = filename.rsplit('.', 1)[0]
+    with Image.open(os.path.join(folder, filename)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if fmt.upper() == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+        for size in sizes:
+            target = os.path.join(folder, variant_filename(digest, size, fmt))
+            if os.path.exists(target):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size))
+            tmp_path = f'{target}.tmp'
+            thumbnail.save(tmp_path, format=fmt.upper(), quality=82)
+            os.replace(tmp_path, target)
+    print(f"🖼️  Generated thumbnails for {filename}")
+
+
+def delete_photo_files(folder: str, filename: str):
+    """Remove an original and all of its variants"""
+    digest = filename.rsplit('.', 1)[0]
+    for name in os.listdir(folder):
+        if name == filename or name.startswith(digest + '_'):
+            os.remove(os.path.join(folder, name))
+    print(f"🗑️  Removed photo files for {digest}")
+
+
+@task('uploads.thumbnails', queue='media')
+def thumbnails_task(filename: str):
+    generate_thumbnails(upload_folder(), filename,
+                        current_app.config['THUMBNAIL_SIZES'], current_app.config['THUMBNAIL_FORMAT'])
+
+
+@task('uploads.cleanup', queue='media')
+def cleanup_task(filename: str):
+    # Another user may have uploaded the same content since the job was queued
+    if User.query.filter(User.photo_url.endswith('/' + filename)).count():
+        return
+    delete_photo_files(upload_folder(), filename)
+
+
+def schedule_thumbnails(filename: str):
+    """Queue thumbnail generation for a stored original (runs once the session commits)"""
+    enqueue('uploads.thumbnails', filename=filename)
+
+
+def schedule_photo_cleanup(filename: str):
+    """Queue removal of a photo that is no longer referenced (runs once the session commits)"""
+    enqueue('uploads.cleanup', filename=filename)
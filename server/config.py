@@ -18,6 +18,80 @@ class Config:
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB max file size
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    THUMBNAIL_SIZES = (64, 256)  # px, longest edge
+    THUMBNAIL_FORMAT = 'WEBP'  # or 'JPEG'
+    # Internal location that streams uploads when running behind nginx (e.g. '/protected-uploads');
+    # Flask's USE_X_SENDFILE does the same for Apache/lighttpd
+    UPLOADS_ACCEL_REDIRECT = os.getenv('UPLOADS_ACCEL_REDIRECT')
+    
+    # Password hashing settings
+    # Method and cost in werkzeug's format; stored in every hash so old hashes
+    # keep verifying and are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 16))
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+    
+    # Response compression settings ('zstd' and 'br' are used when zstandard/brotli are installed)
+    COMPRESS_ENCODINGS = ('zstd', 'br', 'gzip')
+    COMPRESS_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+    
+    # Chat archive settings: old messages move from the messages table to per-room segment files
+    CHAT_ARCHIVE_FOLDER = 'archive'
+    CHAT_ARCHIVE_AGE_DAYS = int(os.getenv('CHAT_ARCHIVE_AGE_DAYS', 90))  # archive messages older than this
+    CHAT_ARCHIVE_INACTIVE_DAYS = int(os.getenv('CHAT_ARCHIVE_INACTIVE_DAYS', 30))  # archive whole rooms idle this long
+    
+    # Outbox settings: side effects recorded in the request transaction are handled by outbox.drain jobs
+    OUTBOX_MAX_ATTEMPTS = 5  # failed events are retried with exponential backoff, then left for inspection
+    OUTBOX_RETENTION_DAYS = 7  # processed events are deleted after this
+    
+    # Import the route modules on the first request instead of in create_app; turn off to import them
+    # up front, e.g. in a preforking server's master process so workers share the loaded modules
+    LAZY_BLUEPRINTS = os.getenv('LAZY_BLUEPRINTS', 'true').lower() == 'true'
+    
+    # Cache settings: 'local' (LRU per process), 'redis' (shared by all workers, needs the redis package)
+    # or 'tiered' (local L1 in front of redis, kept coherent across workers through pub/sub)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')
+    CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/1')
+    CACHE_KEY_PREFIX = 'skillswap:'
+    CACHE_DEFAULT_TTL = 300  # seconds
+    CACHE_LOCAL_MAX_ENTRIES = 10000
+    CACHE_L1_TTL = 5  # seconds an L1 entry may be served without checking redis (bounds staleness if pub/sub drops)
+    
+    # Background job settings
+    # Start the queue workers and scheduler in create_app (scripts opt out with create_app(workers=False)).
+    # They also handle outbox events, so only turn this off for processes that must never run jobs
+    JOBS_START_WORKERS = os.getenv('JOBS_START_WORKERS', 'true').lower() == 'true'
+    JOB_QUEUES = {'default': 2, 'media': 1, 'maintenance': 1}  # worker threads per queue, per process
+    JOB_POLL_INTERVAL = 1  # seconds between queue checks when no commit wakes the workers
+    JOB_LEASE = 300  # seconds a job is reserved for its worker (renewed while it runs) before another may retry it
+    JOB_RETRY_BACKOFF = 5  # seconds before the first retry, doubled for every further attempt
+    JOB_RETENTION_DAYS = 7  # finished jobs are deleted after this
+    JOB_PERIODIC = {  # task name -> interval in seconds
+        'jobs.purge': 3600,
+        'outbox.purge': 3600,
+        'outbox.drain': 60,  # events left over by a crashed worker
+        'chat.archive': 24 * 3600,
+    }
+    
+    # Readiness probe (/api/health/ready): seconds each check may take before it counts as failed
+    HEALTH_CHECK_BUDGETS = {'database': 0.5, 'pool': 0.05, 'queues': 0.5, 'cache': 0.25}
+    HEALTH_REQUIRED_CHECKS = ('database', 'pool', 'cache')  # failing any of these answers 503; others are only reported
+    HEALTH_QUEUE_MAX_WAIT = 300  # seconds the oldest due job or outbox event may wait before the queues are degraded
+    
+    # Profiles per batch fetch (GET/POST /api/users/batch)
+    USERS_BATCH_LIMIT = 100
+    
+    # Directory ranking (changing these only affects ranks computed afterwards)
+    USER_RANK_WEIGHTS = {'completeness': 1.0, 'rating': 2.0, 'acceptance': 1.0}
+    USER_RANK_ACTIVITY_DAYS = 7  # being active this much more recently outweighs one point of the weights above
+    
+    # Rate limiting settings
+    RATELIMIT_ENABLED = True
+    RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'memory')  # 'memory' or 'redis'
+    RATELIMIT_REDIS_URL = os.getenv('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -31,6 +105,9 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    PASSWORD_HASH_WORKERS = 0
+    RATELIMIT_ENABLED = False
+    JOBS_START_WORKERS = False
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,69 @@
+import importlib.util
+import os
+import sys
+import pytest
+
+server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, server_dir)
+
+# app.py is shadowed by the app package, so load it by path
+spec = importlib.util.spec_from_file_location('app_module', os.path.join(server_dir, 'app.py'))
+app_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app_module)
+
+import config  # noqa: E402
+from app.models import db, User, SwapRequest, ChatRoom  # noqa: E402
+from app.utils.schema import init_database  # noqa: E402
+from app.utils.auth import generate_token  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App on a fresh SQLite database (created by init_database), with its archive under tmp_path"""
+    monkeypatch.setattr(config.TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "test.db"}')
+    app = app_module.create_app('testing', workers=False)
+    app.config['CHAT_ARCHIVE_FOLDER'] = str(tmp_path / 'archive')
+    with app.app_context():
+        init_database()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create and commit a user; keyword arguments override the defaults"""
+    count = 0
+
+    def make_user(**columns):
+        nonlocal count
+        count += 1
+        user = User(**{'email': f'user{count}@example.com', 'password_hash': 'x', 'name': f'User {count}', **columns})
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_room(app, make_user):
+    """Create and commit a chat room for an accepted request between two new users"""
+    def make_room(**columns):
+        user1, user2 = make_user(), make_user()
+        request = SwapRequest(from_user_id=user1.id, to_user_id=user2.id,
+                              skill_offered='Python', skill_wanted='Guitar', status='accepted')
+        db.session.add(request)
+        db.session.flush()
+        room = ChatRoom(user1_id=user1.id, user2_id=user2.id, request_id=request.id, **columns)
+        db.session.add(room)
+        db.session.commit()
+        return room
+    return make_room
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Authorization headers carrying a token for the given user"""
+    def auth_headers(user):
+        return {'Authorization': f'Bearer {generate_token(user.id, user.email, user.role)}'}
+    return auth_headers
@@ -0,0 +1,23 @@
+from app.utils.http_cache import listing_cache
+
+
+def banned_flags(client):
+    response = client.get('/api/users/')
+    assert response.status_code == 200
+    return {user['id']: user['is_banned'] for user in response.get_json()['users']}
+
+
+def test_ban_and_unban_update_the_cached_directory(app, make_user, auth_headers):
+    listing_cache.clear()
+    admin = make_user(role='admin')
+    user, other = make_user(), make_user()
+    client = app.test_client()
+    assert banned_flags(client) == {user.id: False, other.id: False}
+
+    response = client.put(f'/api/admin/users/{user.id}/ban', headers=auth_headers(admin), json={'is_banned': True})
+    assert response.status_code == 200
+    assert banned_flags(client) == {user.id: True, other.id: False}
+
+    response = client.put(f'/api/admin/users/{user.id}/ban', headers=auth_headers(admin), json={'is_banned': False})
+    assert response.status_code == 200
+    assert banned_flags(client) == {user.id: False, other.id: False}
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from app.models import db, Message
+from app.utils import archive
+from app.utils.archive import (append_blocks, archive_messages, archive_room, message_page,
+                               read_archived, read_index, room_messages)
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def add_messages(room, count, start=START, step=timedelta(minutes=1), prefix='m'):
+    """Add count messages to a room, alternating senders, and make the last one the room's last message"""
+    messages = [Message(id=f'{prefix}{i:05d}', chat_room_id=room.id, sender_id=(room.user1_id, room.user2_id)[i % 2],
+                        text=f'Message {i}', created_at=start + step * i) for i in range(count)]
+    db.session.add_all(messages)
+    room.last_message_id = messages[-1].id
+    room.last_activity_at = messages[-1].created_at
+    db.session.commit()
+    return messages
+
+
+def test_segment_round_trip(make_room, monkeypatch):
+    monkeypatch.setattr(archive, 'BLOCK_MESSAGES', 4)
+    room = make_room()
+    messages = add_messages(room, 10)
+
+    append_blocks(room.id, messages)
+
+    assert [entry[2] for entry in read_index(room.id)] == [4, 4, 2]
+    archived = read_archived(room.id)
+    assert [m['id'] for m in archived] == [m.id for m in reversed(messages)]
+    assert archived[0] == {'id': 'm00009', 'chat_room_id': room.id, 'sender_id': room.user2_id,
+                           'text': 'Message 9', 'created_at': START + timedelta(minutes=9)}
+
+
+def test_read_archived_before_limit_and_since(make_room, monkeypatch):
+    monkeypatch.setattr(archive, 'BLOCK_MESSAGES', 4)
+    room = make_room()
+    messages = add_messages(room, 10)
+    append_blocks(room.id, messages)
+
+    before = (messages[6].created_at, messages[6].id)
+    assert [m['id'] for m in read_archived(room.id, before, limit=3)] == ['m00005', 'm00004', 'm00003']
+    assert [m['id'] for m in read_archived(room.id, since=messages[7].created_at)] == ['m00009', 'm00008', 'm00007']
+
+
+def test_torn_index_entry_is_ignored(make_room):
+    room = make_room()
+    append_blocks(room.id, add_messages(room, 3))
+    _, index_path = archive._paths(room.id)
+    with open(index_path, 'ab') as index:
+        index.write(b'\x01\x02\x03')
+
+    assert len(read_index(room.id)) == 1
+    assert len(read_archived(room.id)) == 3
+
+
+def test_archive_room_keeps_last_message(make_room):
+    room = make_room()
+    messages = add_messages(room, 5)
+
+    moved = archive_room(room, cutoff=START + timedelta(days=1))
+
+    assert moved == 4
+    assert [m.id for m in Message.query.filter_by(chat_room_id=room.id)] == [messages[-1].id]
+    assert [m['id'] for m in read_archived(room.id)] == ['m00003', 'm00002', 'm00001', 'm00000']
+
+
+def test_archive_room_removes_rows_left_by_an_interrupted_run(make_room):
+    room = make_room()
+    messages = add_messages(room, 5)
+    # Appended to the archive, but the rows were never deleted
+    append_blocks(room.id, messages[:2])
+
+    moved = archive_room(room, cutoff=START + timedelta(minutes=3))
+
+    assert moved == 1
+    assert [m['id'] for m in read_archived(room.id)] == ['m00002', 'm00001', 'm00000']
+    assert Message.query.filter_by(chat_room_id=room.id).count() == 2
+
+
+def test_message_page_merges_live_and_archived(make_room):
+    room = make_room()
+    add_messages(room, 10)
+    archive_room(room, cutoff=START + timedelta(minutes=6))
+
+    pages, before = [], None
+    while True:
+        page, before = message_page(room.id, limit=4, before=before)
+        pages.append([m['id'] for m in page])
+        if before is None:
+            break
+
+    assert Message.query.filter_by(chat_room_id=room.id).count() == 4
+    assert pages == [['m00006', 'm00007', 'm00008', 'm00009'],
+                     ['m00002', 'm00003', 'm00004', 'm00005'],
+                     ['m00000', 'm00001']]
+    # Archived messages carry their sender like live ones
+    assert message_page(room.id, limit=10)[0][0]['sender']['id'] == room.user1_id
+
+
+def test_room_messages_lists_archived_then_live(make_room):
+    room = make_room()
+    add_messages(room, 6)
+    archive_room(room, cutoff=START + timedelta(minutes=3))
+
+    assert [m['id'] for m in room_messages(room.id)] == [f'm{i:05d}' for i in range(6)]
+
+
+def test_archive_messages_by_age_and_inactivity(make_room):
+    now = START + timedelta(days=100)
+    active, idle, unknown = make_room(), make_room(), make_room()
+    # Old messages, but the room was active an hour ago: only the age cutoff applies
+    add_messages(active, 3, start=START, prefix='a')
+    add_messages(active, 1, start=now - timedelta(hours=1), prefix='b')
+    # Idle for 40 days: everything before the last message goes, although none is 90 days old
+    add_messages(idle, 3, start=now - timedelta(days=40), prefix='i')
+    # Without last_activity_at (rooms from before it was backfilled) only the age cutoff applies
+    add_messages(unknown, 2, start=START, prefix='u')
+    unknown.last_activity_at = None
+    db.session.commit()
+
+    moved = archive_messages(age_days=90, inactive_days=30, now=now)
+
+    assert moved == 3 + 2 + 1
+    assert [m['id'] for m in read_archived(active.id)] == ['a00002', 'a00001', 'a00000']
+    assert [m['id'] for m in read_archived(idle.id)] == ['i00001', 'i00000']
+    assert [m['id'] for m in read_archived(unknown.id)] == ['u00000']
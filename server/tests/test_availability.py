@@ -0,0 +1,117 @@
+import pytest
+from app.models import db, User
+from app.utils.availability import (HOURS_PER_WEEK, AvailabilityIndex, mask_from_bytes, mask_to_bytes, mask_to_slots,
+                                    parse_availability, set_user_availability, slots_to_mask)
+
+WEEKDAYS, WEEKEND, EVERY_DAY = range(5), range(5, 7), range(7)
+
+
+def slots(days, start, end):
+    return [{'day': day, 'start': start, 'end': end} for day in days]
+
+
+def parsed(text):
+    return sorted(mask_to_slots(parse_availability(text)), key=lambda slot: (slot['day'], slot['start']))
+
+
+@pytest.mark.parametrize('text', [None, '', 'ask me', '...'])
+def test_unrecognized_text_is_no_availability(text):
+    assert parse_availability(text) == 0
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Weekends', slots(WEEKEND, 8, 22)),
+    ('Flexible schedule', slots(EVERY_DAY, 8, 22)),
+    ('Weekdays 6-9 PM', slots(WEEKDAYS, 18, 21)),
+    ('weekday evenings', slots(WEEKDAYS, 17, 22)),
+    ('Mon-Wed mornings', slots(range(3), 8, 12)),
+    ('Saturday 10am to 2pm', slots([5], 10, 14)),
+    ('after 7 PM', slots(EVERY_DAY, 19, 22)),
+    ('Sundays before 11am', slots([6], 8, 11)),
+    ('11-1 PM', slots(EVERY_DAY, 11, 13)),
+    ('Weekdays 6-8:30 PM', slots(WEEKDAYS, 18, 21)),
+])
+def test_days_and_hours(text, expected):
+    assert parsed(text) == expected
+
+
+def test_segments_are_combined():
+    assert parsed('Weekdays 6-8 PM, Weekends') == sorted(
+        slots(WEEKDAYS, 18, 20) + slots(WEEKEND, 8, 22), key=lambda slot: (slot['day'], slot['start']))
+
+
+def test_a_bare_day_list_shares_the_hours_that_follow():
+    assert parsed('Tuesday and Thursday 6-8 PM') == slots([1, 3], 18, 20)
+
+
+def test_day_ranges_wrap_around_the_week():
+    assert [slot['day'] for slot in parsed('Fri-Mon')] == [0, 4, 5, 6]
+
+
+def test_hours_past_midnight_continue_into_the_next_day():
+    assert parsed('Saturday 10 PM - 2 AM') == [{'day': 5, 'start': 22, 'end': 24}, {'day': 6, 'start': 0, 'end': 2}]
+    # Sunday night wraps into Monday morning
+    assert parsed('Sunday 11pm-1am') == [{'day': 0, 'start': 0, 'end': 1}, {'day': 6, 'start': 23, 'end': 24}]
+
+
+def test_slots_and_bytes_round_trip():
+    mask = parse_availability('Weekdays 6-9 PM, Weekends')
+    assert slots_to_mask(mask_to_slots(mask)) == mask
+    assert len(mask_to_bytes(mask)) == HOURS_PER_WEEK // 8
+    assert mask_from_bytes(mask_to_bytes(mask)) == mask
+
+
+@pytest.mark.parametrize('bad', ['mon', [{'day': 7, 'start': 1, 'end': 2}], [{'day': 'monday', 'start': 5, 'end': 5}]])
+def test_invalid_slots_are_rejected(bad):
+    with pytest.raises(ValueError):
+        slots_to_mask(bad)
+
+
+@pytest.fixture
+def make_available(make_user):
+    """Create a user with the given availability text (parsed to a bitmask like the API does)"""
+    def make_available(availability, **columns):
+        user = make_user(**columns)
+        set_user_availability(user, availability)
+        db.session.commit()
+        return user
+    return make_available
+
+
+def ranked(index, user, limit=20):
+    index.refresh()
+    return [(match['user_id'], match['overlap_hours']) for match in index.matches(user.id, limit)]
+
+
+def test_index_ranks_by_shared_hours(make_available):
+    me = make_available('Weekdays 6-9 PM')
+    most = make_available('Mon-Fri 6-10 PM')
+    some = make_available('Monday 8-9 PM')
+    make_available('Weekends')
+    make_available('Weekdays 6-9 PM', is_public=False)
+    index = AvailabilityIndex()
+
+    assert ranked(index, me) == [(most.id, 15), (some.id, 1)]
+    assert ranked(index, me, limit=1) == [(most.id, 15)]
+
+
+def test_deleted_and_hidden_users_are_dropped_before_a_rebuild(make_available):
+    me = make_available('Weekdays 6-9 PM')
+    deleted = make_available('Weekdays 6-9 PM')
+    hidden = make_available('Weekdays 6-8 PM')
+    kept = make_available('Monday 6-7 PM')
+    index = AvailabilityIndex()
+    assert len(ranked(index, me)) == 3
+
+    db.session.execute(db.delete(User).where(User.id == deleted.id))
+    # Writes that leave updated_at alone are invisible to the incremental refresh
+    db.session.execute(db.update(User).where(User.id == hidden.id).values(is_public=False, updated_at=User.updated_at))
+    db.session.commit()
+
+    # Stale results are replaced, so a limited page stays full
+    assert ranked(index, me, limit=1) == [(kept.id, 1)]
+    assert deleted.id in index.rows
+
+    index.max_age = 0
+    assert ranked(index, me) == [(kept.id, 1)]
+    assert deleted.id not in index.rows
@@ -0,0 +1,61 @@
+def batch(client, ids, headers=None, method='GET'):
+    if method == 'GET':
+        return client.get(f"/api/users/batch?ids={','.join(ids)}", headers=headers)
+    return client.post('/api/users/batch', json={'ids': ids}, headers=headers)
+
+
+def test_private_profiles_are_visible_only_to_their_owner(app, make_user, auth_headers):
+    public, hidden = make_user(), make_user(is_public=False)
+    client = app.test_client()
+
+    for method in ('GET', 'POST'):
+        body = batch(client, [hidden.id, 'missing', public.id], method=method).get_json()
+        assert set(body['users']) == {public.id}
+        assert (body['private'], body['not_found']) == ([hidden.id], ['missing'])
+
+        body = batch(client, [hidden.id, public.id], auth_headers(hidden), method).get_json()
+        assert set(body['users']) == {hidden.id, public.id}
+        assert body['private'] == []
+
+        body = batch(client, [hidden.id], auth_headers(public), method).get_json()
+        assert (body['users'], body['private']) == ({}, [hidden.id])
+
+
+def test_ids_are_deduplicated_in_order(app, make_user):
+    user = make_user()
+    body = batch(app.test_client(), ['b-missing', ' ', user.id, 'a-missing', 'b-missing', user.id]).get_json()
+    assert set(body['users']) == {user.id}
+    assert body['not_found'] == ['b-missing', 'a-missing']
+
+
+def test_id_limit(app, make_user):
+    app.config['USERS_BATCH_LIMIT'] = 3
+    users = [make_user() for _ in range(4)]
+    client = app.test_client()
+
+    assert batch(client, [user.id for user in users[:3]]).status_code == 200
+    # Repeats don't count against the limit
+    assert batch(client, [user.id for user in users[:3]] + [users[0].id]).status_code == 200
+    for method in ('GET', 'POST'):
+        response = batch(client, [user.id for user in users], method=method)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'At most 3 ids per request'
+
+
+def test_invalid_ids_are_rejected(app):
+    client = app.test_client()
+    assert client.get('/api/users/batch').status_code == 400
+    assert client.post('/api/users/batch', json={'ids': 'a,b'}).status_code == 400
+    assert client.post('/api/users/batch', json={'ids': [1, 2]}).status_code == 400
+
+
+def test_etag_changes_when_visibility_changes(app, make_user, auth_headers):
+    user, viewer = make_user(), make_user()
+    client = app.test_client()
+    etag = batch(client, [user.id]).headers['ETag']
+    assert client.get(f'/api/users/batch?ids={user.id}', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.put(f'/api/users/{user.id}', headers=auth_headers(user), json={'is_public': False}).status_code == 200
+    response = client.get(f'/api/users/batch?ids={user.id}', headers={'If-None-Match': etag, **auth_headers(viewer)})
+    assert response.status_code == 200
+    assert response.get_json()['private'] == [user.id]
@@ -0,0 +1,110 @@
+import time
+import pytest
+from app.utils.cache import LocalCache, RedisCache, TieredCache
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_local_entries_expire_after_their_ttl():
+    cache = LocalCache(default_ttl=60)
+    cache.set('short', 1, ttl=0.05)
+    cache.set('long', 2)
+
+    assert cache.get_many(['short', 'long']) == {'short': 1, 'long': 2}
+    time.sleep(0.1)
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    assert 'short' not in cache.entries
+
+
+def test_local_evicts_the_least_recently_used_entry():
+    cache = LocalCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'c': 3}
+    assert 'b' not in cache.tagged['*']
+
+
+def test_local_invalidates_by_tag():
+    cache = LocalCache()
+    cache.set('user:1', 'one', tags=['users', 'user:1'])
+    cache.set('user:2', 'two', tags=['users'])
+    cache.set('skill:1', 'python', tags=['skills'])
+
+    cache.invalidate_tags('user:1')
+    assert cache.get_many(['user:1', 'user:2', 'skill:1']) == {'user:2': 'two', 'skill:1': 'python'}
+    cache.invalidate_tags('users')
+    assert cache.get_many(['user:2', 'skill:1']) == {'skill:1': 'python'}
+    assert 'users' not in cache.tagged
+    cache.clear()
+    assert cache.get('skill:1') is None
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeServer(), fakeredis
+
+
+def redis_cache(redis_server, **kwargs):
+    server, fakeredis = redis_server
+    cache = RedisCache('redis://localhost:6379/0', prefix='test:', **kwargs)
+    cache.client = fakeredis.FakeRedis(server=server)
+    return cache
+
+
+def test_redis_tag_versions_invalidate_entries(redis_server):
+    cache = redis_cache(redis_server)
+    other = redis_cache(redis_server)
+    cache.set('user:1', {'name': 'One'}, tags=['users'])
+    cache.set('skill:1', 'Python', tags=['skills'])
+
+    assert other.get('user:1') == {'name': 'One'}
+    other.invalidate_tags('users')
+    assert cache.get('user:1') is None
+    assert cache.get('skill:1') == 'Python'
+    # Entries written after the invalidation are current again
+    cache.set('user:1', {'name': 'Renamed'}, tags=['users'])
+    assert other.get('user:1') == {'name': 'Renamed'}
+    other.clear()
+    assert cache.get_many(['user:1', 'skill:1']) == {}
+
+
+def test_tiered_nodes_drop_each_others_l1_copies(redis_server):
+    node1 = TieredCache(LocalCache(), redis_cache(redis_server), l1_ttl=60)
+    node2 = TieredCache(LocalCache(), redis_cache(redis_server), l1_ttl=60)
+    # Both subscribers are listening before anything is announced
+    shared = node1.shared
+    assert wait_for(lambda: shared.client.pubsub_numsub(shared.channel)[0][1] == 2)
+    node1.set('user:1', 'v1', tags=['users'])
+    assert node2.get('user:1') == 'v1'
+    assert node2.local.get('user:1') == 'v1'
+
+    # A write on one node evicts the key from the other's L1, which then reads the new value from L2
+    node1.set('user:1', 'v2', tags=['users'])
+    assert wait_for(lambda: node2.local.get('user:1') is None)
+    assert node2.get('user:1') == 'v2'
+
+    # Tag invalidations and deletes are announced the same way
+    node1.get('user:1')
+    node2.invalidate_tags('users')
+    assert wait_for(lambda: node1.local.get('user:1') is None)
+    assert node1.get('user:1') is None
+    node2.set('skill:1', 'Python')
+    node1.get('skill:1')
+    node2.delete('skill:1')
+    assert wait_for(lambda: node1.local.get('skill:1') is None)
+    # A node ignores its own announcements, keeping what it just wrote
+    node1.set('skill:2', 'Go')
+    time.sleep(0.1)
+    assert node1.local.get('skill:2') == 'Go'
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+from app.models import db, SwapRequest
+from app.utils.fields import FieldError, parse_fields
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements executed while the test runs"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def selects_from(statements, table):
+    return [statement for statement in statements if statement.startswith('SELECT') and f'FROM {table}' in statement]
+
+
+def test_parse_fields(app):
+    with app.test_request_context('/?fields=id, name&fields=email&fields[requests]=status&fields[messages]='):
+        fields = parse_fields('users')
+    assert fields.of('users') == {'id', 'name', 'email'}
+    assert fields.of('requests') == {'status'}
+    assert fields.of('messages') is None
+    assert fields.wants('chat_rooms', 'id')
+    assert fields.key() == (('requests', ('status',)), ('users', ('email', 'id', 'name')))
+
+    for query in ('/?fields=id,password_hash', '/?fields[bogus]=id', '/?fields[requests]=name'):
+        with app.test_request_context(query), pytest.raises(FieldError):
+            parse_fields('users')
+
+
+@pytest.mark.parametrize('url', [
+    '/api/users/?fields=password_hash',
+    '/api/users/{id}?fields=id,secret',
+    '/api/users/batch?ids={id}&fields[nope]=id',
+    '/api/requests/?fields[users]=password_hash',
+])
+def test_unknown_fields_are_rejected(app, make_user, auth_headers, url):
+    user = make_user()
+    response = app.test_client().get(url.format(id=user.id), headers=auth_headers(user))
+    assert response.status_code == 400
+    assert 'Unknown' in response.get_json()['error']
+
+
+def test_profile_output_and_columns_are_limited(app, make_user, statements):
+    user = make_user(location='Leeds', skills_offered='["Python"]')
+    user_id, name = user.id, user.name
+    # Requests share the test's session, so start it empty to see what the endpoint loads
+    db.session.expunge_all()
+    del statements[:]
+
+    response = app.test_client().get(f'/api/users/{user_id}?fields=name,rating_average')
+    assert response.status_code == 200
+    assert response.get_json()['user'] == {'name': name, 'rating_average': None}
+    [profile_select] = [statement for statement in selects_from(statements, 'users') if 'users.name' in statement]
+    assert 'users.rating_sum' in profile_select
+    for column in ('email', 'location', 'skills_offered', 'password_hash', 'availability_mask'):
+        assert f'users.{column}' not in profile_select
+
+
+def test_requests_limit_the_embedded_users(app, make_user, auth_headers, statements):
+    sender, receiver = make_user(), make_user()
+    sender_name, headers = sender.name, auth_headers(receiver)
+    db.session.add(SwapRequest(from_user_id=sender.id, to_user_id=receiver.id,
+                               skill_offered='Python', skill_wanted='Guitar', message='Hello'))
+    db.session.commit()
+    db.session.expunge_all()
+    del statements[:]
+
+    response = app.test_client().get('/api/requests/?fields=status,from_user&fields[users]=name', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['requests'] == [{'status': 'pending', 'from_user': {'name': sender_name}}]
+    loads = [statement for statement in selects_from(statements, 'swap_requests') if 'count(' not in statement]
+    assert loads
+    for statement in loads:
+        assert 'swap_requests.message' not in statement
+        assert 'swap_requests.skill_offered' not in statement
+        assert 'users_1.email' not in statement
+        assert 'users_2' not in statement  # to_user isn't selected, so it isn't joined
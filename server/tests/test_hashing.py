@@ -0,0 +1,69 @@
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from app.models import db, User
+from app.utils import hashing
+from app.utils.auth import password_needs_rehash
+from app.utils.hashing import HashingPoolSaturated, hash_method
+
+
+@pytest.fixture
+def pool(app):
+    """A one-process hashing pool with room for one queued job"""
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=1)
+    hashing.shutdown_pool()
+    yield hashing._get_pool()
+    hashing.shutdown_pool()
+
+
+def login(app, email, password):
+    return app.test_client().post('/api/auth/login', json={'email': email, 'password': password})
+
+
+def test_hash_method_fills_in_werkzeug_defaults():
+    assert hash_method('scrypt') == ('scrypt', '32768', '8', '1')
+    assert hash_method('pbkdf2:sha256') == hash_method('pbkdf2')
+    assert hash_method('scrypt:16384') == ('scrypt', '16384', '8', '1')
+
+
+def test_login_returns_503_when_the_pool_is_saturated(app, make_user, pool):
+    make_user(email='busy@example.com', password_hash=generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert hashing._slots.acquire(blocking=False)
+    try:
+        response = login(app, 'busy@example.com', 'secret')
+    finally:
+        hashing._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert login(app, 'busy@example.com', 'secret').status_code == 200
+
+
+def test_a_timed_out_job_keeps_its_slot_until_it_finishes(app, pool):
+    app.config['PASSWORD_HASH_TIMEOUT'] = 0.1
+    hashing._run(time.sleep, 0)  # wait for the worker process to start
+
+    with pytest.raises(HashingPoolSaturated, match='timed out'):
+        hashing._run(time.sleep, 0.5)
+    with pytest.raises(HashingPoolSaturated, match='full'):
+        hashing._run(time.sleep, 0)
+    time.sleep(0.6)
+    hashing._run(time.sleep, 0)
+
+
+def test_login_rehashes_passwords_made_with_an_older_cost(app, make_user):
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    user = make_user(email='old@example.com', password_hash=generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert password_needs_rehash(user.password_hash)
+
+    assert login(app, 'old@example.com', 'secret').status_code == 200
+    db.session.expire_all()
+    upgraded = db.session.get(User, user.id).password_hash
+    assert upgraded.startswith('pbkdf2:sha256:2000$')
+    assert not password_needs_rehash(upgraded)
+
+    # Current hashes are left alone, and the upgraded one still verifies
+    assert login(app, 'old@example.com', 'secret').status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, user.id).password_hash == upgraded
+    assert login(app, 'old@example.com', 'wrong').status_code == 401
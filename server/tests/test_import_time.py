@@ -0,0 +1,19 @@
+import importlib.util
+import os
+
+# check-import-time.py lives in the repository root and isn't importable by name
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'check-import-time.py')
+spec = importlib.util.spec_from_file_location('check_import_time', script)
+check_import_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(check_import_time)
+
+
+def test_create_app_imports_stay_within_budget():
+    modules = check_import_time.measure('testing')
+    total_ms, app_ms, eager = check_import_time.summarize(modules)
+
+    assert eager == [], f'imported at startup but should load on demand: {eager}'
+    assert total_ms <= check_import_time.DEFAULT_BUDGET_MS
+    assert app_ms <= check_import_time.DEFAULT_APP_BUDGET_MS
+    # The probe really measured create_app, not an early failure
+    assert 'flask' in {name for name, _, _, _ in modules}
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import db, SwapRequest, ChatRoom, Message
+from app.utils.inbox import decode_cursor, encode_cursor, inbox_page, mark_read, record_message
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def open_room(make_user):
+    """Create and commit a chat room between user and a new counterpart"""
+    def open_room(user, created_at=START):
+        other = make_user()
+        request = SwapRequest(from_user_id=other.id, to_user_id=user.id,
+                              skill_offered='Python', skill_wanted='Guitar', status='accepted')
+        db.session.add(request)
+        db.session.flush()
+        room = ChatRoom(user1_id=other.id, user2_id=user.id, request_id=request.id,
+                        created_at=created_at, last_activity_at=created_at)
+        db.session.add(room)
+        db.session.commit()
+        return room
+    return open_room
+
+
+def send(room, sender, text, created_at, message_id=None):
+    message = Message(chat_room_id=room.id, sender_id=sender.id, text=text, created_at=created_at,
+                      **({'id': message_id} if message_id else {}))
+    db.session.add(message)
+    db.session.flush()
+    record_message(room, message)
+    db.session.commit()
+    return message
+
+
+def unread(user):
+    return {room['id']: room['unread_count'] for room in inbox_page(user.id, 100)[0]}
+
+
+def test_unread_counts_follow_the_read_marker(make_user, open_room):
+    me = make_user()
+    room = open_room(me)
+    other = db.session.get(type(me), room.user1_id)
+    # Sending marks the room read for the sender, own messages never count
+    send(room, me, 'Mine', START - timedelta(minutes=1))
+    messages = [send(room, other, f'Hi {i}', START + timedelta(minutes=i)) for i in range(3)]
+    # Same timestamp as the last one, ordered after it by id
+    tied = send(room, other, 'Tied', messages[-1].created_at, message_id='zzzzzzzz')
+    assert unread(me) == {room.id: 4}
+    assert unread(other) == {room.id: 0}
+
+    mark_read(me.id, messages[1])
+    db.session.commit()
+    assert unread(me) == {room.id: 2}
+
+    mark_read(me.id, messages[2])
+    db.session.commit()
+    assert unread(me) == {room.id: 1}
+
+    # The marker never moves backwards
+    mark_read(me.id, messages[0])
+    db.session.commit()
+    assert unread(me) == {room.id: 1}
+
+    mark_read(me.id, tied)
+    db.session.commit()
+    assert unread(me) == {room.id: 0}
+
+    page = inbox_page(me.id)[0][0]
+    assert page['last_message']['id'] == tied.id
+    assert page['last_read_message_id'] == tied.id
+    assert page['counterpart']['id'] == other.id
+    assert page['swap_request']['status'] == 'accepted'
+
+
+def test_cursor_pages_through_every_room_once(make_user, open_room):
+    me = make_user()
+    stranger_room = open_room(make_user())
+    rooms = [open_room(me, START + timedelta(minutes=i // 2)) for i in range(7)]  # pairs share a timestamp
+    expected = [room.id for room in sorted(rooms, key=lambda room: (room.last_activity_at, room.id), reverse=True)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = inbox_page(me.id, 3, cursor)
+        assert len(page) <= 3
+        seen.extend(room['id'] for room in page)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert stranger_room.id not in seen
+
+    # New activity moves a room to the front
+    send(rooms[0], me, 'Hello again', START + timedelta(hours=1))
+    assert inbox_page(me.id, 1)[0][0]['id'] == rooms[0].id
+
+
+def test_cursor_round_trip_and_malformed_cursors():
+    assert decode_cursor(encode_cursor(START, 'room-1')) == (START, 'room-1')
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+
+def test_inbox_route(app, make_user, open_room, auth_headers):
+    me = make_user()
+    for i in range(3):
+        open_room(me, START + timedelta(minutes=i))
+    client = app.test_client()
+
+    response = client.get('/api/chat/inbox?limit=2', headers=auth_headers(me))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['chat_rooms']) == 2
+    response = client.get(f"/api/chat/inbox?limit=2&cursor={body['next_cursor']}", headers=auth_headers(me))
+    assert len(response.get_json()['chat_rooms']) == 1
+    assert response.get_json()['next_cursor'] is None
+    assert client.get('/api/chat/inbox?cursor=bogus', headers=auth_headers(me)).status_code == 400
@@ -0,0 +1,157 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models import db, Job
+from app.utils import jobs
+from app.utils.jobs import claim, enqueue, run_job, schedule_periodic, task
+
+calls = []
+
+
+@task('tests.record')
+def record(**payload):
+    calls.append(payload)
+
+
+@task('tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+def enqueue_committed(name, **kwargs):
+    job = enqueue(name, **kwargs)
+    db.session.commit()
+    return job.id
+
+
+def test_claim_reserves_a_due_job_once(app):
+    job_id = enqueue_committed('tests.record', n=1)
+
+    assert claim('default') == job_id
+    assert claim('default') is None
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('running', 1)
+    assert job.locked_until > datetime.utcnow() + timedelta(seconds=app.config['JOB_LEASE'] - 5)
+
+
+def test_claim_skips_jobs_not_yet_due_and_other_queues(app):
+    enqueue_committed('tests.record', delay=60)
+    enqueue_committed('outbox.purge')  # maintenance queue
+
+    assert claim('default') is None
+
+
+def test_claim_takes_jobs_in_run_at_order(app):
+    later = enqueue_committed('tests.record', n='later')
+    earlier = enqueue_committed('tests.record', n='earlier')
+    db.session.get(Job, earlier).run_at -= timedelta(minutes=1)
+    db.session.commit()
+
+    assert [claim('default'), claim('default')] == [earlier, later]
+
+
+def test_expired_lease_is_claimed_again(app):
+    job_id = enqueue_committed('tests.record')
+    claim('default')
+    db.session.get(Job, job_id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert claim('default') == job_id
+    assert db.session.get(Job, job_id).attempts == 2
+
+
+def test_run_job_calls_the_task_with_its_payload(app):
+    calls.clear()
+    job_id = enqueue_committed('tests.record', n=3, text='hi')
+    run_job(claim('default'))
+
+    job = db.session.get(Job, job_id)
+    assert calls == [{'n': 3, 'text': 'hi'}]
+    assert (job.status, job.locked_until, job.last_error) == ('done', None, None)
+
+
+def test_failed_job_is_retried_with_backoff_then_fails(app):
+    job_id = enqueue_committed('tests.fail')
+
+    run_job(claim('default'))
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.last_error) == ('queued', 'boom')
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=app.config['JOB_RETRY_BACKOFF'] - 1)
+    assert claim('default') is None  # backing off
+
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+    run_job(claim('default'))
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('failed', 2)
+
+
+def test_schedule_periodic_queues_each_interval_once(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_PERIODIC', {'tests.record': 60})
+    monkeypatch.setattr(jobs, '_scheduled', {})
+    now = 600 * 60.0
+    monkeypatch.setattr(jobs.time, 'time', lambda: now)
+
+    schedule_periodic()
+    schedule_periodic()
+    # Another process already queued this interval
+    monkeypatch.setattr(jobs, '_scheduled', {})
+    schedule_periodic()
+    assert Job.query.filter_by(name='tests.record').count() == 1
+
+    now += 60
+    schedule_periodic()
+    assert [job.unique_key for job in Job.query.filter_by(name='tests.record').order_by(Job.id)] == \
+        ['tests.record:600', 'tests.record:601']
+
+
+@task('tests.slow')
+def slow(seconds):
+    time.sleep(seconds)
+    calls.append(_claim_from_another_worker())
+
+
+@task('tests.taken_over')
+def taken_over():
+    # Another worker reclaimed the job after this one stalled past its lease
+    db.session.execute(db.update(Job).where(Job.name == 'tests.taken_over').values(
+        attempts=Job.attempts + 1, locked_until=datetime.utcnow() + timedelta(minutes=5)))
+    db.session.commit()
+    calls.append('ran')
+
+
+def _claim_from_another_worker():
+    app = current_app._get_current_object()
+    claimed = []
+
+    def other_worker():
+        with app.app_context():
+            claimed.append(claim('default'))
+    thread = threading.Thread(target=other_worker)
+    thread.start()
+    thread.join()
+    return claimed[0]
+
+
+def test_lease_is_extended_while_a_job_runs_past_it(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_LEASE', 0.6)
+    calls.clear()
+    job_id = enqueue_committed('tests.slow', seconds=1.5)
+
+    run_job(claim('default'))
+
+    job = db.session.get(Job, job_id)
+    assert calls == [None]  # the other worker found nothing to claim
+    assert (job.status, job.attempts) == ('done', 1)
+
+
+def test_outcome_is_dropped_when_the_job_was_taken_over(app):
+    calls.clear()
+    job_id = enqueue_committed('tests.taken_over')
+
+    run_job(claim('default'))
+
+    job = db.session.get(Job, job_id)
+    assert calls == ['ran']
+    assert (job.status, job.attempts, job.finished_at) == ('running', 2, None)
@@ -0,0 +1,105 @@
+import pytest
+from app.models import db, User, UserSkill
+from app.utils.matching import SkillMatchIndex
+from app.utils.skills import set_user_skills
+
+
+@pytest.fixture
+def make_profile(make_user):
+    """Create a user with offered and wanted skills (resolved to skill ids like the API does)"""
+    def make_profile(offered, wanted, **columns):
+        user = make_user(**columns)
+        set_user_skills(user, offered, wanted)
+        db.session.commit()
+        return user
+    return make_profile
+
+
+def ranked(index, user, limit=20):
+    index.refresh()
+    return [(match['user_id'], match['score']) for match in index.matches(user.id, limit)]
+
+
+def test_mutual_matches_rank_before_one_sided_ones(make_profile):
+    me = make_profile(['Python', 'Cooking'], ['Guitar', 'Spanish'])
+    gives = make_profile(['Guitar', 'Spanish'], ['Yoga'])
+    mutual = make_profile(['Guitar'], ['Python'])
+    make_profile(['Yoga'], ['Baking'])
+    index = SkillMatchIndex()
+
+    assert ranked(index, me) == [(mutual.id, 1000 + 2), (gives.id, 2)]
+    best = index.matches(me.id)[0]
+    assert best['reciprocal'] is True
+    assert (best['they_offer'], best['they_want']) == (['Guitar'], ['Python'])
+
+
+def test_skills_match_by_id_whatever_their_spelling(make_profile):
+    me = make_profile(['Python'], ['Guitar'])
+    other = make_profile(['  GUITAR'], ['python'])
+
+    index = SkillMatchIndex()
+    index.refresh()
+    match, = index.matches(me.id)
+    assert match['user_id'] == other.id
+    assert (match['they_offer'], match['they_want']) == (['Guitar'], ['Python'])
+
+
+def test_bitsets_span_several_words(make_profile):
+    many = [f'Skill {i}' for i in range(130)]
+    me = make_profile(many[:-1], ['Skill 129'])
+    other = make_profile(['Skill 129'], ['Skill 0', 'Skill 64', 'Skill 128'])
+    index = SkillMatchIndex()
+
+    # Mutual once (they give one skill), overlapping on four
+    assert ranked(index, me) == [(other.id, 1000 + 1 + 3)]
+    assert index.offered.shape[1] == 3
+
+
+def test_private_banned_admin_and_self_are_not_candidates(make_profile):
+    me = make_profile(['Python'], ['Guitar'])
+    make_profile(['Guitar'], ['Python'], is_public=False)
+    make_profile(['Guitar'], ['Python'], is_banned=True)
+    make_profile(['Guitar'], ['Python'], role='admin')
+
+    assert ranked(SkillMatchIndex(), me) == []
+
+
+def test_limit_keeps_the_best_scores(make_profile):
+    me = make_profile(['Python', 'Cooking'], ['Guitar', 'Spanish'])
+    users = [make_profile(['Guitar'], []), make_profile(['Guitar', 'Spanish'], ['Python']),
+             make_profile(['Guitar', 'Spanish'], [])]
+
+    assert ranked(SkillMatchIndex(), me, limit=2) == [(users[1].id, 1000 + 3), (users[2].id, 2)]
+
+
+def test_refresh_applies_profile_changes(make_profile):
+    me = make_profile(['Python'], ['Guitar'])
+    other = make_profile(['Yoga'], ['Baking'])
+    index = SkillMatchIndex()
+    assert ranked(index, me) == []
+
+    set_user_skills(other, ['Guitar'], None)
+    db.session.commit()
+    assert ranked(index, me) == [(other.id, 1)]
+
+
+def test_deleted_and_hidden_users_are_dropped_before_a_rebuild(make_profile):
+    me = make_profile(['Python'], ['Guitar'])
+    deleted = make_profile(['Guitar'], ['Python'])
+    hidden = make_profile(['Guitar'], [])
+    kept = make_profile(['Guitar'], [])
+    index = SkillMatchIndex()
+    assert len(ranked(index, me)) == 3
+
+    db.session.execute(db.delete(UserSkill).where(UserSkill.user_id == deleted.id))
+    db.session.execute(db.delete(User).where(User.id == deleted.id))
+    # Writes that leave updated_at alone are invisible to the incremental refresh
+    db.session.execute(db.update(User).where(User.id == hidden.id).values(is_public=False, updated_at=User.updated_at))
+    db.session.commit()
+
+    assert ranked(index, me) == [(kept.id, 1)]
+    assert deleted.id in index.rows
+
+    index.max_age = 0
+    assert ranked(index, me) == [(kept.id, 1)]
+    assert deleted.id not in index.rows
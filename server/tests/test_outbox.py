@@ -0,0 +1,121 @@
+from datetime import datetime
+from sqlalchemy import event
+from app.models import db, User, SwapRequest, ChatRoom, Message, OutboxEvent, Job
+from app.utils import outbox
+from app.utils.outbox import drain, emit
+
+
+def make_request(make_user, **columns):
+    sender, receiver = make_user(), make_user()
+    request = SwapRequest(from_user_id=sender.id, to_user_id=receiver.id,
+                          skill_offered='Python', skill_wanted='Guitar', **columns)
+    db.session.add(request)
+    db.session.commit()
+    return request.id, sender, receiver
+
+
+def set_status(app, auth_headers, user, request_id, status):
+    return app.test_client().put(f'/api/requests/{request_id}', headers=auth_headers(user), json={'status': status})
+
+
+def drain_all():
+    # Handlers may emit follow-up events (users.listing_changed), handled by the next pass
+    while drain():
+        pass
+
+
+def counters(user_id):
+    db.session.expire_all()
+    user = db.session.get(User, user_id)
+    return user.requests_accepted, user.requests_rejected
+
+
+def test_accepting_commits_exactly_one_room_with_the_status(app, make_user, auth_headers):
+    request_id, sender, receiver = make_request(make_user)
+
+    assert set_status(app, auth_headers, receiver, request_id, 'accepted').status_code == 200
+    # The room is there before any outbox event has been handled
+    room = ChatRoom.query.filter_by(request_id=request_id).one()
+    assert (room.user1_id, room.user2_id) == (sender.id, receiver.id)
+    event_row = OutboxEvent.query.filter_by(topic='request.status_changed').one()
+    assert event_row.processed_at is None
+
+    # Accepting again after a rejection reuses the room
+    assert set_status(app, auth_headers, receiver, request_id, 'rejected').status_code == 200
+    assert set_status(app, auth_headers, receiver, request_id, 'accepted').status_code == 200
+    assert ChatRoom.query.filter_by(request_id=request_id).count() == 1
+
+
+def test_concurrent_status_change_returns_409(app, make_user, auth_headers):
+    request_id, sender, receiver = make_request(make_user)
+
+    def rejected_elsewhere(target, context):
+        # Another request rejects it between this one loading and updating the row
+        with db.engine.begin() as connection:
+            connection.execute(db.update(SwapRequest).where(SwapRequest.id == request_id).values(status='rejected'))
+
+    event.listen(SwapRequest, 'load', rejected_elsewhere, once=True)
+    response = set_status(app, auth_headers, receiver, request_id, 'accepted')
+
+    assert response.status_code == 409
+    db.session.expire_all()
+    assert db.session.get(SwapRequest, request_id).status == 'rejected'
+    assert ChatRoom.query.count() == 0
+    assert OutboxEvent.query.count() == 0
+
+
+def test_failing_handler_rolls_back_and_is_retried(app, make_user, monkeypatch):
+    user = make_user(name='Before')
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        db.session.execute(db.update(User).where(User.id == payload['user_id']).values(name='After'))
+        if len(attempts) == 1:
+            raise RuntimeError('handler failed')
+
+    monkeypatch.setitem(outbox._handlers, 'tests.flaky', [flaky])
+    emit('tests.flaky', user_id=user.id)
+    db.session.commit()
+
+    assert drain() == 1
+    db.session.expire_all()
+    event_row = OutboxEvent.query.filter_by(topic='tests.flaky').one()
+    assert (event_row.attempts, event_row.last_error, event_row.processed_at) == (1, 'handler failed', None)
+    assert event_row.locked_until > datetime.utcnow()
+    assert db.session.get(User, user.id).name == 'Before'
+    retry = Job.query.filter_by(name='outbox.drain').order_by(Job.run_at.desc()).first()
+    assert retry.run_at > datetime.utcnow()
+
+    # Not retried while backing off, then handled once the backoff has passed
+    assert drain() == 0
+    event_row.locked_until = datetime.utcnow()
+    db.session.commit()
+    assert drain() == 1
+    db.session.expire_all()
+    assert OutboxEvent.query.filter_by(topic='tests.flaky').one().processed_at is not None
+    assert db.session.get(User, user.id).name == 'After'
+    assert len(attempts) == 2
+
+
+def test_counters_follow_accepted_rejected_deleted(app, make_user, auth_headers):
+    request_id, sender, receiver = make_request(make_user)
+    admin = make_user(role='admin')
+
+    assert set_status(app, auth_headers, receiver, request_id, 'accepted').status_code == 200
+    drain_all()
+    assert counters(receiver.id) == (1, 0)
+
+    assert set_status(app, auth_headers, receiver, request_id, 'rejected').status_code == 200
+    drain_all()
+    assert counters(receiver.id) == (0, 1)
+
+    # A room can't outlive its request, so clear it away before deleting
+    Message.query.delete()
+    ChatRoom.query.filter_by(request_id=request_id).delete()
+    db.session.commit()
+    response = app.test_client().delete(f'/api/requests/{request_id}', headers=auth_headers(admin))
+    assert response.status_code == 200
+    drain_all()
+    assert counters(receiver.id) == (0, 0)
+    assert OutboxEvent.query.filter(OutboxEvent.processed_at.is_(None)).count() == 0
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+from app.models import db, User
+from app.utils.ranking import (RANK_EPOCH, after_rank, decode_rank_cursor, encode_rank_cursor,
+                               rank_score, record_profile_change)
+
+
+def profile(**columns):
+    """A rank_score input with an empty profile, no ratings or requests, last active at RANK_EPOCH"""
+    defaults = dict(photo_url=None, location=None, availability_mask=None, skills_offered='[]', skills_wanted='[]',
+                    rating_count=0, rating_sum=0, requests_accepted=0, requests_rejected=0, last_active_at=RANK_EPOCH)
+    return SimpleNamespace(**{**defaults, **columns})
+
+
+def test_rank_score_of_an_empty_profile_is_the_priors(app):
+    # completeness 0, rating prior 3/5 (weight 2), acceptance prior 1/2 (weight 1)
+    assert rank_score(profile()) == pytest.approx(2 * 0.6 + 0.5)
+    assert rank_score(profile(last_active_at=None)) == rank_score(profile())
+
+
+def test_rank_score_counts_completeness_rating_and_acceptance(app):
+    base = rank_score(profile())
+    complete = profile(photo_url='/uploads/a.png', location='Delhi', availability_mask=b'\x01',
+                       skills_offered='["Python"]', skills_wanted='["Guitar"]')
+    assert rank_score(complete) - base == pytest.approx(1.0)
+    assert rank_score(profile(location='Delhi')) - base == pytest.approx(0.2)
+    # Five 5-star ratings on top of five neutral 3-star priors: (25 + 15) / 10 / 5
+    assert rank_score(profile(rating_count=5, rating_sum=25)) - base == pytest.approx(2 * (0.8 - 0.6))
+    # One accepted request: (1 + 1) / (1 + 2)
+    assert rank_score(profile(requests_accepted=1)) - base == pytest.approx(2 / 3 - 0.5)
+    assert rank_score(profile(requests_rejected=3)) < base
+
+
+def test_rank_score_trades_quality_against_recent_activity(app):
+    days = app.config['USER_RANK_ACTIVITY_DAYS']
+    later = profile(last_active_at=RANK_EPOCH + timedelta(days=days))
+    assert rank_score(later) - rank_score(profile()) == pytest.approx(1.0)
+
+
+def test_record_profile_change_stores_the_rank(app, make_user):
+    user = make_user(location='Delhi')
+    record_profile_change(user)
+    db.session.commit()
+    assert user.user_rank == pytest.approx(rank_score(user))
+
+
+def test_rank_cursor_round_trip():
+    cursor = encode_rank_cursor(1234.5678901234567, 'b1c2-user')
+    assert decode_rank_cursor(cursor) == (1234.5678901234567, 'b1c2-user')
+    with pytest.raises(ValueError):
+        decode_rank_cursor('not a cursor')
+
+
+def test_keyset_pages_follow_rank_then_id_without_gaps(app, make_user):
+    for rank in (5.0, 3.0, 3.0, 3.0, 1.0, 4.0, 3.0):
+        make_user(user_rank=rank)
+    expected = [user.id for user in User.query.order_by(User.user_rank.desc(), User.id.desc())]
+
+    listed, after = [], None
+    while True:
+        query = User.query.order_by(User.user_rank.desc(), User.id.desc())
+        page = (query.filter(after_rank(*after)) if after else query).limit(2).all()
+        if not page:
+            break
+        listed += [user.id for user in page]
+        after = decode_rank_cursor(encode_rank_cursor(page[-1].user_rank, page[-1].id))
+
+    assert listed == expected
+
+
+def test_directory_endpoint_pages_with_next_cursor(app, make_user):
+    for rank in (2.0, 9.0, 4.0, 4.0, 7.0):
+        make_user(user_rank=rank)
+    make_user(user_rank=8.0, is_public=False)
+    client = app.test_client()
+
+    ranks, cursor = [], ''
+    while True:
+        body = client.get(f'/api/users?limit=2&fields=id&cursor={cursor}').get_json()
+        ranks += [db.session.get(User, user['id']).user_rank for user in body['users']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert ranks == [9.0, 7.0, 4.0, 4.0, 2.0]
+    assert client.get('/api/users?cursor=@@@').status_code == 400
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+import pytest
+from app.utils import ratelimit
+from app.utils.ratelimit import MemoryBackend, parse_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for the rate limiter; advance it by setting clock.now"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(ratelimit, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('5 / second') == (5, 5)
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(clock):
+    backend = MemoryBackend()
+    capacity, rate = parse_limit('3/minute')
+
+    assert [backend.take('k', capacity, rate) for _ in range(3)] == [0, 0, 0]
+    assert backend.take('k', capacity, rate) == pytest.approx(20)
+    clock.now += 10
+    assert backend.take('k', capacity, rate) == pytest.approx(10)
+    clock.now += 10
+    assert backend.take('k', capacity, rate) == 0
+    # A long idle period refills to capacity, not beyond
+    clock.now += 3600
+    assert [backend.take('k', capacity, rate) for _ in range(4)][-1] == pytest.approx(20)
+    assert backend.take('other', capacity, rate) == 0
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    backend = MemoryBackend(max_keys=2)
+    for key in ('a', 'b', 'a', 'c'):
+        backend.take(key, 1, 1)
+    assert list(backend.buckets) == ['a', 'c']
+
+
+def test_login_is_limited_per_account_across_ips(app, clock):
+    app.config['RATELIMIT_ENABLED'] = True
+    client = app.test_client()
+
+    def login(email, ip):
+        return client.post('/api/auth/login', json={'email': email, 'password': 'guess'},
+                           environ_base={'REMOTE_ADDR': ip})
+
+    # 5/minute per account: every attempt from a new address still counts against the account
+    statuses = [login('victim@example.com', f'10.0.0.{i}').status_code for i in range(5)]
+    assert statuses == [401] * 5
+    response = login(' Victim@Example.com ', '10.0.0.99')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '12'
+
+    # Other accounts from the same addresses are unaffected, and the account refills
+    assert login('someone@example.com', '10.0.0.1').status_code == 401
+    clock.now += 12
+    assert login('victim@example.com', '10.0.0.1').status_code == 401
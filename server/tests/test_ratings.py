@@ -0,0 +1,83 @@
+from app.models import db, User, SwapRequest, Feedback
+from app.utils.ratings import rating_summary
+
+
+def accepted_request(sender, receiver):
+    request = SwapRequest(from_user_id=sender.id, to_user_id=receiver.id,
+                          skill_offered='Python', skill_wanted='Guitar', status='accepted')
+    db.session.add(request)
+    db.session.commit()
+    return request.id
+
+
+def aggregates(user_id):
+    db.session.expire_all()
+    user = db.session.get(User, user_id)
+    return user.rating_count, user.rating_sum
+
+
+def rate(app, auth_headers, user, request_id, rating):
+    return app.test_client().post(f'/api/requests/{request_id}/feedback', headers=auth_headers(user),
+                                  json={'rating': rating, 'comment': f'{rating} stars'})
+
+
+def test_rating_summary():
+    assert rating_summary(0, 0) == {'rating_count': 0, 'rating_average': None}
+    assert rating_summary(None, None) == {'rating_count': 0, 'rating_average': None}
+    assert rating_summary(3, 11) == {'rating_count': 3, 'rating_average': 3.67}
+
+
+def test_replacing_a_rating_moves_only_the_sum(app, make_user, auth_headers):
+    sender, receiver = make_user(), make_user()
+    first, second = accepted_request(sender, receiver), accepted_request(sender, receiver)
+
+    assert rate(app, auth_headers, sender, first, 2).status_code == 201
+    assert rate(app, auth_headers, sender, second, 4).status_code == 201
+    assert aggregates(receiver.id) == (2, 6)
+
+    response = rate(app, auth_headers, sender, first, 5)
+    assert response.status_code == 200
+    assert response.get_json()['feedback']['comment'] == '5 stars'
+    assert aggregates(receiver.id) == (2, 9)
+    assert Feedback.query.filter_by(request_id=first).count() == 1
+
+    # Each participant rates the other
+    assert rate(app, auth_headers, receiver, first, 3).status_code == 201
+    assert aggregates(sender.id) == (1, 3)
+    assert aggregates(receiver.id) == (2, 9)
+
+
+def test_legacy_feedback_without_a_rating_is_counted_once_rated(app, make_user, auth_headers):
+    sender, receiver = make_user(), make_user()
+    request_id = accepted_request(sender, receiver)
+    db.session.add(Feedback(request_id=request_id, from_user_id=sender.id, to_user_id=receiver.id, rating=None))
+    db.session.commit()
+
+    assert rate(app, auth_headers, sender, request_id, 4).status_code == 200
+    assert aggregates(receiver.id) == (1, 4)
+
+
+def test_deleting_a_request_removes_its_ratings(app, make_user, auth_headers):
+    sender, receiver, admin = make_user(), make_user(), make_user(role='admin')
+    kept, removed = accepted_request(sender, receiver), accepted_request(sender, receiver)
+    rate(app, auth_headers, sender, kept, 5)
+    rate(app, auth_headers, sender, removed, 1)
+    rate(app, auth_headers, receiver, removed, 2)
+    # Legacy unrated feedback goes too, without touching the aggregates
+    db.session.add(Feedback(request_id=removed, from_user_id=admin.id, to_user_id=receiver.id, rating=None))
+    db.session.commit()
+    assert aggregates(receiver.id) == (2, 6)
+
+    response = app.test_client().delete(f'/api/admin/requests/{removed}', headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert aggregates(receiver.id) == (1, 5)
+    assert aggregates(sender.id) == (0, 0)
+    assert Feedback.query.filter_by(request_id=removed).count() == 0
+
+
+def test_invalid_ratings_are_rejected(app, make_user, auth_headers):
+    sender, receiver = make_user(), make_user()
+    request_id = accepted_request(sender, receiver)
+    for rating in (0, 6, 4.5, True, '5', None):
+        assert rate(app, auth_headers, sender, request_id, rating).status_code == 400
+    assert aggregates(receiver.id) == (0, 0)
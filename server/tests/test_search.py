@@ -0,0 +1,57 @@
+from app.models import db, User
+from app.utils.search import apply_text_search, search_terms
+
+
+def found(q):
+    return [user.id for user in apply_text_search(User.query, q).all()]
+
+
+def test_search_terms_drop_query_syntax():
+    assert search_terms('Python AND "guitar*" -(x)') == ['python', 'and', 'guitar', 'x']
+
+
+def test_terms_match_as_prefixes_across_columns_and_diacritics(make_user):
+    jose = make_user(name='José Álvarez', location='Madrid', skills_offered='["Guitar"]')
+    make_user(name='Jo Smith', location='Madrid')
+
+    assert found('jose') == [jose.id]
+    assert found('alv madr') == [jose.id]
+    assert found('guit') == [jose.id]
+    assert found('madrid nobody') == []
+
+
+def test_index_follows_updates_and_deletes(make_user):
+    user = make_user(name='Ada', skills_offered='["Python"]')
+    other = make_user(name='Grace', skills_offered='["COBOL"]')
+
+    user.skills_offered = '["Rust"]'
+    user.location = 'London'
+    db.session.commit()
+    assert found('python') == []
+    assert found('rust london') == [user.id]
+
+    db.session.delete(user)
+    db.session.commit()
+    assert found('rust') == []
+    assert db.session.execute(db.text('SELECT user_id FROM users_search_ids')).scalars().all() == [other.id]
+    assert found('cobol') == [other.id]
+
+
+def test_index_survives_vacuum(make_user):
+    users = [make_user(name=f'Person {i}', location=f'City{i}') for i in range(5)]
+    db.session.delete(users[0])
+    db.session.commit()
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('VACUUM')
+
+    assert found('city3') == [users[3].id]
+
+
+def test_results_are_ordered_by_bm25(make_user):
+    passing = make_user(name='Sam', location='Leeds',
+                        availability='Weekends, mornings, evenings after work, and sometimes Python on Sundays',
+                        skills_offered='["Cooking", "Baking", "Gardening"]')
+    focused = make_user(name='Kim', skills_offered='["Python", "Python Testing"]', skills_wanted='["Python Packaging"]')
+    make_user(name='Lee', skills_offered='["Java"]')
+
+    assert found('python') == [focused.id, passing.id]
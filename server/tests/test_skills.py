@@ -0,0 +1,42 @@
+import pytest
+
+from app.models import SwapRequest, UserSkill
+
+
+@pytest.mark.parametrize('skill_offered', ['   ', 42, ['Python'], {'name': 'Python'}])
+def test_create_request_rejects_invalid_skill_names(app, make_user, auth_headers, skill_offered):
+    sender, receiver = make_user(), make_user()
+    response = app.test_client().post('/api/requests/', headers=auth_headers(sender), json={
+        'to_user': receiver.id, 'skill_offered': skill_offered, 'skill_wanted': 'Guitar'})
+    assert response.status_code == 400
+    assert 'skill_offered' in response.get_json()['error']
+    assert SwapRequest.query.count() == 0
+
+
+def test_create_request_resolves_skill_names(app, make_user, auth_headers):
+    sender, receiver = make_user(), make_user()
+    response = app.test_client().post('/api/requests/', headers=auth_headers(sender), json={
+        'to_user': receiver.id, 'skill_offered': ' reactjs ', 'skill_wanted': 'Guitar'})
+    assert response.status_code == 201
+    assert response.get_json()['request']['skill_offered'] == 'React'
+
+
+@pytest.mark.parametrize('skills', [['Python', 7], ['Python', '  '], 'not json', 3, '["Python", ""]'])
+def test_update_user_rejects_invalid_skill_lists(app, make_user, auth_headers, skills):
+    user = make_user()
+    response = app.test_client().put(f'/api/users/{user.id}', headers=auth_headers(user),
+                                     json={'name': 'Renamed', 'skills_offered': skills})
+    assert response.status_code == 400
+    assert 'skills_offered' in response.get_json()['error']
+    assert user.name != 'Renamed'
+    assert UserSkill.query.count() == 0
+
+
+@pytest.mark.parametrize('skills', [['py', 'Guitar'], '["py", "Guitar"]'])
+def test_update_user_accepts_lists_and_json_strings(app, make_user, auth_headers, skills):
+    user = make_user()
+    response = app.test_client().put(f'/api/users/{user.id}', headers=auth_headers(user),
+                                     json={'skills_offered': skills})
+    assert response.status_code == 200
+    assert response.get_json()['user']['skills_offered'] == ['Python', 'Guitar']
+    assert UserSkill.query.filter_by(user_id=user.id, kind='offered').count() == 2
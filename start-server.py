@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 """
 Startup Script for Skill Swap Platform
-This script checks the database and starts the Flask server.
+This script checks the database and starts the Flask server, building the
+app once and serving it from the same process.
+
+It refuses to start on a database that init-db.py hasn't brought up to the
+current schema; pass --init-db to run the migration first:
+
+    python start-server.py --init-db
 """
 
 import os
 import sys
-import subprocess
 import time
+import argparse
 
-def check_and_start():
+def check_and_start(args):
     """Check database and start server"""
     try:
         print("🚀 Skill Swap Platform - Server Startup")
@@ -26,18 +32,21 @@ def check_and_start():
         spec.loader.exec_module(app_module)
         
         from app.models import db, User
+        from app.utils.schema import init_database, schema_version, SCHEMA_VERSION
         
-        app_instance = app_module.create_app()
+        app_instance = app_module.create_app(workers=False)
         
         with app_instance.app_context():
-            # Check if database file exists
-            db_path = os.path.join(server_dir, 'skill_swap.db')
-            if not os.path.exists(db_path):
-                print("📊 Creating database...")
-                db.create_all()
-                print("✅ Database created successfully!")
-            else:
-                print(f"✅ Database exists: {os.path.getsize(db_path)} bytes")
+            version = schema_version()
+            if version != SCHEMA_VERSION and args.init_db:
+                print("📊 Upgrading database schema...")
+                init_database()
+            elif version != SCHEMA_VERSION:
+                found = 'not initialized' if version is None else f'version {version}'
+                print(f"❌ Database schema is out of date ({found}, expected version {SCHEMA_VERSION})")
+                print("   Run: python init-db.py  (or start with --init-db)")
+                sys.exit(1)
+            print(f"✅ Database ready (schema version {SCHEMA_VERSION})")
             
             # Check if users exist
             user_count = User.query.count()
@@ -69,9 +78,10 @@ def check_and_start():
         print("\nPress Ctrl+C to stop the server")
         print("=" * 50)
         
-        # Start the Flask server
+        # Serve the app built above (no second interpreter; run server/app.py for auto-reload)
         os.chdir(server_dir)
-        subprocess.run([sys.executable, "app.py"])
+        app_module.start_workers(app_instance)
+        app_instance.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
         
     except KeyboardInterrupt:
         print("\n\n🛑 Server stopped by user")
@@ -82,4 +92,7 @@ def check_and_start():
         sys.exit(1)
 
 if __name__ == "__main__":
-    check_and_start() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Start the Skill Swap server')
+    parser.add_argument('--init-db', action='store_true',
+                        help='Create or upgrade the database schema first (same as init-db.py)')
+    check_and_start(parser.parse_args())
\ No newline at end of file